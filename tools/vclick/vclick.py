@@ -24,8 +24,16 @@ Examples:
   vclick -c 500 300 --click-type double  # Double-click
   vclick -t button.png                   # Find button.png on screen, click center
   vclick -t button.png --no-click        # Find but don't click (just report coords)
+  vclick -t tab.png -w Chrome --all-windows --all-hits  # Search every Chrome window at once
   vclick "the blue Submit button"        # Output screenshot for AI to analyze
+  vclick "Submit" --max-edge 1024 --image-format jpeg
+                                         # Downscaled image for the vision model
+  vclick -c 512 300 --scale 0.533333     # Click coords read from that image
+  vclick --screenshot --since f18c2a9b3e0  # Only regions changed since that capture
+  vclick --marks                         # Number likely interactive elements
+  vclick --click-mark 17                 # Click element 17 from --marks
   vclick --screenshot -w "Firefox"       # Screenshot of Firefox window only
+  vclick --screenshot --cdp              # Chrome page viewport over DevTools (port 9222)
 """
 
 import argparse
@@ -50,16 +58,88 @@ pyautogui.PAUSE = 0.1      # Small pause between actions
 
 SCREENSHOT_DIR = Path("/tmp/vclick")
 SCREENSHOT_DIR.mkdir(exist_ok=True)
+MARKS_FILE = SCREENSHOT_DIR / "marks.json"
+FRAMES_DIR = SCREENSHOT_DIR / "frames"
+FRAMES_KEEP = 20  # Retained frames available to --since
+
+# Shared-memory frame ring written by `zoomclick --capture-service` (same layout)
+RING_PREFIX = "zoomclick_frames_"
+RING_HEADER = ("magic", "width", "height", "slots", "latest_seq", "verified_ns",
+               "wanted_ns", "captured", "dropped", "idle_skips", "interval_us", "pid", "started_ns")
+RING_HEADER_SIZE = 128
+RING_MAGIC = 0x7A636672  # "zcfr"
+RING_MAX_AGE_MS = 250
+RING_WAIT_MS = 500
+RING_STALL_INTERVALS = 3  # verified_ns older than this many service intervals: the service stopped verifying
+RING_OPEN = {}  # One mapping per ring, kept for the life of the process
+
+# --deadline: stages get a share of the total budget; external calls never outlive their stage
+CALL_TIMEOUT_S = 30.0  # Cap for any single external command or DevTools call
+STAGE_SHARES = {"capture": 0.5, "match": 0.5, "input": 0.3}
+INPUT_MIN_MS = 500     # One pointer job: moveTo(duration=0.25) plus pyautogui.PAUSE after each call
+DEADLINE = {"end": None, "total_ms": 0, "stage": "command", "stage_start": None, "stage_end": None,
+            "input_sent": False}  # After input was sent, a timeout must not ask for a retry
+
+class StageTimeout(RuntimeError):
+    """A stage ran past its share of the --deadline budget (or an external call hung)."""
+    def __init__(self, stage, budget_ms, elapsed_ms, command=None):
+        self.stage, self.command = stage, command
+        self.budget_ms, self.elapsed_ms = round(budget_ms, 1), round(elapsed_ms, 1)
+        self.retryable = not DEADLINE["input_sent"]
+        what = f" waiting for {command}" if command else ""
+        super().__init__(f"Timed out in stage '{stage}'{what} after {self.elapsed_ms} ms (budget {self.budget_ms} ms)")
+    
+    def to_dict(self):
+        return {"success": False, "error": "timeout", "stage": self.stage, "command": self.command,
+                "budget_ms": self.budget_ms, "elapsed_ms": self.elapsed_ms,
+                "deadline_ms": DEADLINE["total_ms"] or None, "retryable": self.retryable, "message": str(self)}
+
+def begin_stage(name):
+    """End the current stage (raising StageTimeout if it overran) and start the next one."""
+    now = time.monotonic()
+    if DEADLINE["end"] is None:
+        DEADLINE.update(stage=name, stage_start=now)
+        return
+    if now > DEADLINE["stage_end"]:
+        raise StageTimeout(DEADLINE["stage"], (DEADLINE["stage_end"] - DEADLINE["stage_start"]) * 1000,
+                           (now - DEADLINE["stage_start"]) * 1000)
+    share = STAGE_SHARES.get(name, 1.0) * DEADLINE["total_ms"] / 1000
+    if name == "input":
+        share = max(share, INPUT_MIN_MS / 1000)
+    end = min(DEADLINE["end"], now + share)
+    if name == "input" and end - now < INPUT_MIN_MS / 1000:
+        raise StageTimeout(name, (end - now) * 1000, 0.0)  # Not enough left to click: fail before clicking
+    DEADLINE.update(stage=name, stage_start=now, stage_end=end)
+
+def call_timeout():
+    """Timeout for the next external call: what is left of the stage, at most CALL_TIMEOUT_S."""
+    if DEADLINE["end"] is None:
+        return CALL_TIMEOUT_S
+    left = DEADLINE["stage_end"] - time.monotonic()
+    if left <= 0:
+        begin_stage(DEADLINE["stage"])  # Raises for the overrun stage
+    return min(CALL_TIMEOUT_S, left)
+
+def run_cmd(cmd, **kwargs):
+    """subprocess.run bounded by call_timeout(); a hung process is killed and reported as StageTimeout."""
+    timeout = call_timeout()
+    started = time.monotonic()
+    try:
+        return subprocess.run(cmd, timeout=timeout, **kwargs)
+    except subprocess.TimeoutExpired:
+        raise StageTimeout(DEADLINE["stage"], timeout * 1000, (time.monotonic() - started) * 1000, cmd[0])
 
 def find_window_by_name(name: str) -> list:
     """Find window IDs by title (substring match)."""
     try:
-        result = subprocess.run(
+        result = run_cmd(
             ['xdotool', 'search', '--name', name],
             capture_output=True, text=True
         )
         if result.returncode == 0 and result.stdout.strip():
             return [int(wid) for wid in result.stdout.strip().split('\n') if wid]
+    except StageTimeout:
+        raise
     except Exception:
         pass
     return []
@@ -67,12 +147,14 @@ def find_window_by_name(name: str) -> list:
 def find_window_by_class(class_name: str) -> list:
     """Find window IDs by class."""
     try:
-        result = subprocess.run(
+        result = run_cmd(
             ['xdotool', 'search', '--class', class_name],
             capture_output=True, text=True
         )
         if result.returncode == 0 and result.stdout.strip():
             return [int(wid) for wid in result.stdout.strip().split('\n') if wid]
+    except StageTimeout:
+        raise
     except Exception:
         pass
     return []
@@ -80,7 +162,7 @@ def find_window_by_class(class_name: str) -> list:
 def get_window_geometry(window_id: int) -> dict:
     """Get window position and size."""
     try:
-        result = subprocess.run(
+        result = run_cmd(
             ['xdotool', 'getwindowgeometry', '--shell', str(window_id)],
             capture_output=True, text=True
         )
@@ -91,6 +173,8 @@ def get_window_geometry(window_id: int) -> dict:
                     key, val = line.split('=', 1)
                     geo[key] = int(val) if val.isdigit() else val
             return geo
+    except StageTimeout:
+        raise
     except Exception:
         pass
     return {}
@@ -100,7 +184,7 @@ def list_windows() -> list:
     windows = []
     try:
         # Get all window IDs
-        result = subprocess.run(
+        result = run_cmd(
             ['xdotool', 'search', '--onlyvisible', '--name', ''],
             capture_output=True, text=True
         )
@@ -110,7 +194,7 @@ def list_windows() -> list:
                     continue
                 wid = int(wid)
                 # Get window name
-                name_result = subprocess.run(
+                name_result = run_cmd(
                     ['xdotool', 'getwindowname', str(wid)],
                     capture_output=True, text=True
                 )
@@ -127,7 +211,9 @@ def list_windows() -> list:
                     "width": geo.get("WIDTH", 0),
                     "height": geo.get("HEIGHT", 0)
                 })
-    except Exception as e:
+    except StageTimeout:
+        raise
+    except Exception:
         pass
     return windows
 
@@ -137,7 +223,7 @@ def take_screenshot_window(window_id: int, name="window") -> Path:
     path = SCREENSHOT_DIR / f"{name}_{timestamp}.png"
     
     display = os.environ.get('DISPLAY', ':99')
-    result = subprocess.run(
+    result = run_cmd(
         ['import', '-window', str(window_id), str(path)],
         env={**os.environ, 'DISPLAY': display},
         capture_output=True
@@ -148,6 +234,24 @@ def take_screenshot_window(window_id: int, name="window") -> Path:
     
     return path
 
+def list_screens() -> list:
+    """Connected monitors from xrandr (width, height, x, y)."""
+    import re
+    result = run_cmd(['xrandr'], capture_output=True, text=True)
+    screens = []
+    for line in result.stdout.split('\n'):
+        if ' connected' in line:
+            # Parse geometry like "1920x1080+0+0"
+            match = re.search(r'(\d+)x(\d+)\+(\d+)\+(\d+)', line)
+            if match:
+                screens.append({
+                    'width': int(match.group(1)),
+                    'height': int(match.group(2)),
+                    'x': int(match.group(3)),
+                    'y': int(match.group(4))
+                })
+    return screens
+
 def take_screenshot_screen(screen_num: int, name="screen") -> Path:
     """Take screenshot of a specific screen (multi-monitor)."""
     timestamp = int(time.time())
@@ -155,22 +259,8 @@ def take_screenshot_screen(screen_num: int, name="screen") -> Path:
     
     display = os.environ.get('DISPLAY', ':99')
     
-    # Get screen geometry using xrandr
     try:
-        result = subprocess.run(['xrandr'], capture_output=True, text=True)
-        screens = []
-        for line in result.stdout.split('\n'):
-            if ' connected' in line:
-                # Parse geometry like "1920x1080+0+0"
-                import re
-                match = re.search(r'(\d+)x(\d+)\+(\d+)\+(\d+)', line)
-                if match:
-                    screens.append({
-                        'width': int(match.group(1)),
-                        'height': int(match.group(2)),
-                        'x': int(match.group(3)),
-                        'y': int(match.group(4))
-                    })
+        screens = list_screens()
         
         if screen_num >= len(screens):
             raise RuntimeError(f"Screen {screen_num} not found. Available: 0-{len(screens)-1}")
@@ -178,10 +268,10 @@ def take_screenshot_screen(screen_num: int, name="screen") -> Path:
         s = screens[screen_num]
         # Use scrot to capture full screen, then crop
         full_path = SCREENSHOT_DIR / f"full_{timestamp}.png"
-        subprocess.run(['scrot', str(full_path)], env={**os.environ, 'DISPLAY': display}, check=True)
+        run_cmd(['scrot', str(full_path)], env={**os.environ, 'DISPLAY': display}, check=True)
         
         # Crop to specific screen using ImageMagick
-        subprocess.run([
+        run_cmd([
             'convert', str(full_path),
             '-crop', f"{s['width']}x{s['height']}+{s['x']}+{s['y']}",
             '+repage', str(path)
@@ -193,13 +283,76 @@ def take_screenshot_screen(screen_num: int, name="screen") -> Path:
     except subprocess.CalledProcessError as e:
         raise RuntimeError(f"Screen screenshot failed: {e}")
 
+def shared_frame():
+    """Latest frame from zoomclick --capture-service as a BGR copy, or None."""
+    from multiprocessing import shared_memory, resource_tracker
+    import numpy as np
+    display = os.environ.get('DISPLAY', ':99')
+    name = RING_PREFIX + "".join(ch if ch.isalnum() else "_" for ch in display)
+    shm = RING_OPEN.get(name)
+    if shm is None:
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            return None
+        resource_tracker.unregister(shm._name, "shared_memory")  # Never unlink the service's ring
+        RING_OPEN[name] = shm
+    if shm.size < RING_HEADER_SIZE:
+        return None
+    header = np.ndarray((len(RING_HEADER),), np.int64, shm.buf)
+    field = lambda n: int(header[RING_HEADER.index(n)])
+    slots, height, width = field("slots"), field("height"), field("width")
+    if field("magic") != RING_MAGIC or slots < 1 or shm.size < RING_HEADER_SIZE + slots * (16 + height * width * 3):
+        return None
+    try:
+        os.kill(field("pid"), 0)
+    except (ProcessLookupError, PermissionError):
+        del field, header
+        RING_OPEN.pop(name).close()  # A restarted service creates a new segment under the same name
+        return None
+    if field("verified_ns") < time.time_ns() - RING_MAX_AGE_MS * 1_000_000:
+        interval_ns = field("interval_us") * 1000
+        if interval_ns and field("verified_ns") < time.time_ns() - RING_STALL_INTERVALS * interval_ns - RING_WAIT_MS * 1_000_000:
+            return None  # Not verifying any more (e.g. the screen was resized): don't wait for it
+        requested = time.time_ns()
+        verified, dropped = field("verified_ns"), field("dropped")
+        header[RING_HEADER.index("wanted_ns")] = requested
+        wait_s = RING_WAIT_MS / 1000
+        if DEADLINE["end"] is not None:
+            wait_s = min(wait_s, max(0.0, (DEADLINE["stage_end"] - time.monotonic()) / 2))
+        deadline = time.monotonic() + wait_s
+        while field("verified_ns") < requested and time.monotonic() < deadline:
+            if field("dropped") > dropped and field("verified_ns") == verified:
+                return None  # The service ticked without verifying
+            time.sleep(0.005)
+        if field("verified_ns") < requested:
+            return None
+    seq = field("latest_seq")
+    table = np.ndarray((slots, 2), np.int64, shm.buf, offset=RING_HEADER_SIZE)
+    if seq == 0 or table[seq % slots, 0] != seq:
+        return None
+    frame = np.ndarray((height, width, 3), np.uint8, shm.buf,
+                       offset=RING_HEADER_SIZE + 16 * slots + (seq % slots) * height * width * 3).copy()
+    if table[seq % slots, 0] != seq:
+        return None  # The service wrapped around onto this slot while it was being copied
+    return frame
+
 def take_screenshot(name="screen"):
-    """Take a screenshot using scrot (pyautogui.screenshot needs gnome-screenshot on Linux)."""
+    """
+    Take a screenshot using scrot (pyautogui.screenshot needs gnome-screenshot on Linux).
+    Uses the latest frame of zoomclick --capture-service instead when it is running.
+    """
     timestamp = int(time.time())
     path = SCREENSHOT_DIR / f"{name}_{timestamp}.png"
     
+    frame = shared_frame()
+    if frame is not None:
+        import cv2
+        cv2.imwrite(str(path), frame, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        return path
+    
     display = os.environ.get('DISPLAY', ':99')
-    result = subprocess.run(
+    result = run_cmd(
         ['scrot', str(path)],
         env={**os.environ, 'DISPLAY': display},
         capture_output=True
@@ -210,6 +363,216 @@ def take_screenshot(name="screen"):
     
     return path
 
+CDP_CONNECTIONS = {}  # DevTools WebSocket per port, kept open for this process
+
+def cdp_call(port, method, params=None):
+    """Run one DevTools command on the current Chrome page (minimal stdlib WebSocket client)."""
+    import base64, socket, struct, urllib.request
+    conn = CDP_CONNECTIONS.get(port)
+    if conn is None:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/list", timeout=min(10, call_timeout())) as response:
+                targets = json.load(response)
+        except OSError as e:
+            raise RuntimeError(f"Chrome DevTools not reachable on port {port}: {e}")
+        pages = [t for t in targets if t.get("type") == "page" and t.get("webSocketDebuggerUrl")
+                 and not t.get("url", "").startswith(("devtools://", "chrome-extension://"))]
+        if not pages:
+            raise RuntimeError(f"No page target on DevTools port {port}")
+        url = pages[0]["webSocketDebuggerUrl"].split("//", 1)[1]
+        hostport, path = url.split("/", 1)
+        host, _, ws_port = hostport.partition(":")
+        sock = socket.create_connection((host, int(ws_port or 80)), timeout=min(10, call_timeout()))
+        key = base64.b64encode(os.urandom(16)).decode()
+        sock.sendall(f"GET /{path} HTTP/1.1\r\nHost: {hostport}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+        reply = b""
+        while b"\r\n\r\n" not in reply:
+            chunk = sock.recv(4096)
+            if not chunk:
+                raise RuntimeError("CDP WebSocket handshake failed")
+            reply += chunk
+        status = reply.split(b"\r\n", 1)[0].decode(errors="replace")
+        if " 101 " not in status + " ":
+            raise RuntimeError(f"CDP WebSocket handshake failed: {status}")
+        conn = CDP_CONNECTIONS[port] = {"sock": sock, "pending": reply.split(b"\r\n\r\n", 1)[1], "next_id": 0}
+    sock = conn["sock"]
+    timeout = min(10, call_timeout())
+    sock.settimeout(timeout)
+    started = time.monotonic()
+    
+    def read(n):
+        while len(conn["pending"]) < n:
+            try:
+                chunk = sock.recv(1 << 20)
+            except socket.timeout:
+                sock.close()
+                del CDP_CONNECTIONS[port]
+                raise StageTimeout(DEADLINE["stage"], timeout * 1000, (time.monotonic() - started) * 1000, method)
+            if not chunk:
+                raise RuntimeError("CDP connection closed")
+            conn["pending"] += chunk
+        data, conn["pending"] = conn["pending"][:n], conn["pending"][n:]
+        return data
+    
+    conn["next_id"] += 1
+    message_id = conn["next_id"]
+    payload = json.dumps({"id": message_id, "method": method, "params": params or {}}).encode()
+    n = len(payload)
+    if n < 126:
+        header = bytes([0x81, 0x80 | n])
+    elif n < 65536:
+        header = bytes([0x81, 0x80 | 126]) + struct.pack("!H", n)
+    else:
+        header = bytes([0x81, 0x80 | 127]) + struct.pack("!Q", n)
+    mask = os.urandom(4)
+    sock.sendall(header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload)))
+    parts = []
+    while True:
+        b0, b1 = read(2)
+        length = b1 & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", read(8))[0]
+        data = read(length)
+        if b0 & 0x0F == 0x8:
+            raise RuntimeError("CDP connection closed by browser")
+        if b0 & 0x0F in (0x9, 0xA):
+            continue  # ping/pong
+        parts.append(data)
+        if not b0 & 0x80:
+            continue
+        message = json.loads(b"".join(parts))
+        parts = []
+        if message.get("id") == message_id:
+            if "error" in message:
+                raise RuntimeError(f"CDP {method} failed: {message['error'].get('message')}")
+            return message.get("result", {})
+
+def take_screenshot_page(port, name="page"):
+    """
+    Capture the Chrome page viewport over DevTools (Page.captureScreenshot).
+    Returns (path, geometry) where geometry places the viewport on screen like a window.
+    """
+    import base64
+    path = SCREENSHOT_DIR / f"{name}_{int(time.time())}.png"
+    path.write_bytes(base64.b64decode(cdp_call(port, "Page.captureScreenshot", {"format": "png"})["data"]))
+    g = json.loads(cdp_call(port, "Runtime.evaluate", {
+        "expression": "JSON.stringify({sx: screenX, sy: screenY, ow: outerWidth, oh: outerHeight,"
+                      " iw: innerWidth, ih: innerHeight, dpr: devicePixelRatio})",
+        "returnByValue": True})["result"]["value"])
+    scale = g["dpr"] or 1
+    border = max(0, (g["ow"] - g["iw"]) // 2)
+    return path, {
+        "X": round((g["sx"] + border) * scale),
+        "Y": round((g["sy"] + max(0, g["oh"] - g["ih"] - border)) * scale),
+        "WIDTH": round(g["iw"] * scale),
+        "HEIGHT": round(g["ih"] * scale),
+    }
+
+# Input queue shared with zoomclick (same layout): one input job at a time per display
+INPUT_DIR = Path("/tmp/zoomclick/input")
+INPUT_MAX_HOLD_MS = 10000  # Checked between actions; a running action is not interrupted
+INPUT_TYPE_CHUNK = 20  # --type is sent in chunks of this many characters so the hold cap applies while typing
+INPUT_AGING_MS = 1000  # Queue wait that counts as one priority level
+
+def run_input(actions, priority=0, max_hold_ms=INPUT_MAX_HOLD_MS):
+    """
+    Run input actions (callables) as one job under the display's input lock.
+    Waits in the queue (priority first, then FIFO; tickets of dead processes are dropped).
+    No further action starts once the job has held the display for max_hold_ms.
+    Returns queue_wait_ms, exec_ms, ahead, priority.
+    """
+    import fcntl
+    display = os.environ.get('DISPLAY', ':99')
+    qdir = INPUT_DIR / "".join(ch if ch.isalnum() else "_" for ch in display)
+    qdir.mkdir(parents=True, exist_ok=True)
+    enqueued, enqueued_ns = time.monotonic(), time.time_ns()
+    ticket = qdir / f"{os.getpid()}_{enqueued_ns}.json"
+    ticket.with_suffix(".tmp").write_text(json.dumps({"priority": priority}))
+    ticket.with_suffix(".tmp").rename(ticket)
+    lock = open(qdir / "lock", "a+")
+    ahead = None
+    try:
+        wait_end = enqueued + call_timeout()
+        while True:
+            tickets = []
+            for path in qdir.glob("*_*.json"):
+                try:
+                    pid, t_ns = (int(part) for part in path.stem.split("_"))
+                    t_prio = json.loads(path.read_text())["priority"]
+                except (ValueError, KeyError, OSError):
+                    continue  # Being written or already gone
+                try:
+                    os.kill(pid, 0)
+                except ProcessLookupError:
+                    path.unlink(missing_ok=True)
+                    continue
+                except PermissionError:
+                    pass
+                now_ns = time.time_ns()
+                tickets.append((-(t_prio + (now_ns - t_ns) // (INPUT_AGING_MS * 1_000_000)), t_ns, path))
+            tickets.sort()
+            position = next((i for i, t in enumerate(tickets) if t[2] == ticket), 0)
+            ahead = position if ahead is None else ahead
+            if position == 0:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    pass
+            if time.monotonic() >= wait_end:
+                raise StageTimeout(DEADLINE["stage"], (wait_end - enqueued) * 1000,
+                                   (time.monotonic() - enqueued) * 1000, "input queue")
+            time.sleep(0.005)
+    finally:
+        ticket.unlink(missing_ok=True)
+    holder = qdir / "holder.json"
+    try:
+        acquired = time.monotonic()
+        holder.write_text(json.dumps({"pid": os.getpid(), "since_ns": time.time_ns(), "priority": priority}))
+        done = 0
+        for action in actions:
+            if (time.monotonic() - acquired) * 1000 > max_hold_ms:
+                break
+            DEADLINE["input_sent"] = True
+            action()
+            done += 1
+        metrics = {"queue_wait_ms": round((acquired - enqueued) * 1000, 1),
+                   "exec_ms": round((time.monotonic() - acquired) * 1000, 1), "ahead": ahead, "priority": priority}
+        stats_path = qdir / "stats.json"
+        try:
+            stats = json.loads(stats_path.read_text())
+        except (OSError, ValueError):
+            stats = {}
+        stats["jobs"] = stats.get("jobs", 0) + 1
+        stats["aborted"] = stats.get("aborted", 0) + (done < len(actions))
+        for key in ("queue_wait_ms", "exec_ms"):
+            stats[f"{key}_total"] = round(stats.get(f"{key}_total", 0) + metrics[key], 1)
+            stats[f"{key}_max"] = max(stats.get(f"{key}_max", 0), metrics[key])
+        stats["last_ns"] = time.time_ns()  # zoomclick --revalidate waits for the display to go idle
+        stats_path.write_text(json.dumps(stats))
+    finally:
+        holder.unlink(missing_ok=True)
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+    if done < len(actions):
+        raise RuntimeError(f"Input job held the display past {max_hold_ms} ms; {len(actions) - done} actions not run")
+    return metrics
+
+def click_actions(x, y, args):
+    """Click plus the optional --type/--key that follow it, as one input job's actions."""
+    actions = [lambda: click_at(x, y, args.click_type)]
+    if args.type_text:
+        text = args.type_text
+        actions.append(lambda: time.sleep(0.1))
+        actions += [lambda chunk=text[i:i + INPUT_TYPE_CHUNK]: type_text(chunk)
+                    for i in range(0, len(text), INPUT_TYPE_CHUNK)]
+    if args.key:
+        actions.append(lambda: (time.sleep(0.1), press_key(args.key)))
+    return actions
+
 def get_screen_size():
     """Get screen dimensions."""
     return pyautogui.size()
@@ -239,10 +602,53 @@ def hotkey(*keys):
     """Press a hotkey combination using PyAutoGUI."""
     pyautogui.hotkey(*keys)
 
-def find_template(screen_path, template_path, min_confidence=0.5):
+HITS_FILE = SCREENSHOT_DIR / "hits.json"  # Confirmed hit scores per template file hash
+HIT_HISTORY, MIN_HITS = 20, 5
+ACCEPT_MARGIN, EARLY_EXIT_MARGIN = 0.15, 0.02
+PROBE_MARGIN = 16  # Pixels searched around the last hit before the full frame
+
+def template_hits(template_path):
+    """(hash key, history) for a template file; history holds confirmed hit scores and the last hit."""
+    import hashlib
+    key = hashlib.blake2b(Path(template_path).read_bytes(), digest_size=16).hexdigest()
+    try:
+        return key, json.loads(HITS_FILE.read_text()).get(key, {})
+    except (OSError, ValueError):
+        return key, {}
+
+def learned_thresholds(history, roi):
+    """accept/early_exit from >= MIN_HITS confirmed hits (same rule as zoomclick's templatehealth)."""
+    scores = sorted(history.get("scores", []))
+    if len(scores) < MIN_HITS:
+        return None
+    median, low = scores[len(scores) // 2], scores[len(scores) // 10]
+    accept = min(0.95, max(0.5, median - max(ACCEPT_MARGIN, 2 * (median - low))))
+    learned = {"accept": round(accept, 3), "early_exit": round(min(0.99, max(accept, median - EARLY_EXIT_MARGIN)), 3),
+               "hits": len(scores)}
+    last = history.get("last_hit")
+    if last and last[2] == roi:
+        learned["last_hit"] = last[:2]
+    return learned
+
+def record_hit(key, score, x, y, roi):
+    try:
+        hits = json.loads(HITS_FILE.read_text())
+    except (OSError, ValueError):
+        hits = {}
+    history = hits.setdefault(key, {})
+    history["scores"] = (history.get("scores", []) + [round(float(score), 4)])[-HIT_HISTORY:]
+    history["last_hit"] = [int(x), int(y), roi]
+    staged = HITS_FILE.with_suffix(".tmp")
+    staged.write_text(json.dumps(hits))
+    staged.replace(HITS_FILE)
+
+def find_template(screen_path, template_path, min_confidence=0.5, learned=None):
     """
     Find a template image on screen using OpenCV template matching.
-    Like Control-Windows "x" action - decreases confidence until found.
+    Like Control-Windows "x" action - accepts the best match down to min_confidence
+    in 0.1 steps (one matchTemplate pass gives the same answer as repeating it).
+    With learned thresholds (learned_thresholds) the area around the last hit is
+    tried first, stopping at early_exit, and accept replaces the descent.
     Returns (x, y, confidence) or None.
     """
     try:
@@ -256,22 +662,317 @@ def find_template(screen_path, template_path, min_confidence=0.5):
     
     if screen is None or template is None:
         return None
+    return match_image(screen, template, min_confidence, learned)
+
+def match_image(screen, template, min_confidence=0.5, learned=None):
+    """find_template on decoded images (BGR arrays)."""
+    import cv2
+    h, w = template.shape[:2]
+    
+    def best(region, floor):
+        if region.shape[0] < h or region.shape[1] < w:
+            return None
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED))
+        return (max_loc[0] + w // 2, max_loc[1] + h // 2, max_val) if max_val >= floor else None
     
-    # Adaptive confidence matching (like Control-Windows)
-    confidence = 1.0
+    if learned and learned.get("last_hit"):
+        lx, ly = learned["last_hit"]
+        x0, y0 = max(0, lx - w // 2 - PROBE_MARGIN), max(0, ly - h // 2 - PROBE_MARGIN)
+        found = best(screen[y0:ly + h - h // 2 + PROBE_MARGIN, x0:lx + w - w // 2 + PROBE_MARGIN], learned["early_exit"])
+        if found:
+            return (found[0] + x0, found[1] + y0, found[2])
+    
+    if learned:
+        return best(screen, learned["accept"])
+    # Adaptive confidence (like Control-Windows): the lowest step of 1.0, 0.9, ... still >= min_confidence
+    confidence, floor = 1.0, None
     while confidence >= min_confidence:
-        result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-        
-        if max_val >= confidence:
-            h, w = template.shape[:2]
-            center_x = max_loc[0] + w // 2
-            center_y = max_loc[1] + h // 2
-            return (center_x, center_y, max_val)
-        
+        floor = confidence
         confidence -= 0.1
+    return best(screen, floor) if floor is not None else None
+
+def find_template_across(args):
+    """
+    --template with --all-windows/--all-screens: search every window matching
+    --window/--window-class and/or every monitor in parallel (windows captured
+    concurrently, monitors sliced from one capture), map hits to screen
+    coordinates and click the best. --all-hits lists every target's hit.
+    """
+    import cv2
+    from concurrent.futures import ThreadPoolExecutor
     
-    return None
+    template = cv2.imread(str(args.template))
+    if template is None:
+        return {"success": False, "error": f"Template not found: {args.template}"}
+    hits_key, history = template_hits(args.template)
+    learned = learned_thresholds(history, None) if args.confidence is None else None
+    min_confidence = 0.5 if args.confidence is None else args.confidence
+    started = time.perf_counter()
+    
+    begin_stage("capture")
+    targets = []
+    if args.all_windows:
+        window_ids = find_window_by_name(args.window) if args.window else []
+        if args.window_class:
+            window_ids += [w for w in find_window_by_class(args.window_class) if w not in window_ids]
+        targets += [{"window_id": w} for w in window_ids]
+    if args.all_screens:
+        full_path = take_screenshot("full")
+        full = cv2.imread(str(full_path))
+        for number, s in enumerate(list_screens()):
+            targets.append({"screen": number, "origin": (s["x"], s["y"]),
+                            "frame": full[s["y"]:s["y"] + s["height"], s["x"]:s["x"] + s["width"]]})
+    if not targets:
+        return {"success": False, "error": "No targets: use --window/--window-class with --all-windows, or --all-screens"}
+    
+    def search(target):
+        t0 = time.perf_counter()
+        if "window_id" in target:
+            geo = get_window_geometry(target["window_id"])
+            if not geo:
+                return {**target, "error": "window not found"}
+            try:
+                frame = cv2.imread(str(take_screenshot_window(target["window_id"], f"window_{target['window_id']}")))
+            except RuntimeError as e:
+                return {**target, "error": str(e)}
+            origin = (geo.get("X", 0), geo.get("Y", 0))
+        else:
+            frame, origin = target.pop("frame"), target.pop("origin")
+        t1 = time.perf_counter()
+        found = match_image(frame, template, min_confidence, learned) if frame is not None else None
+        hit = {**target, "capture_ms": round((t1 - t0) * 1000, 1), "match_ms": round((time.perf_counter() - t1) * 1000, 1)}
+        if found:
+            # Where the hit is in the frame --template would capture for that roi (window or root)
+            local = (found[0], found[1]) if "window_id" in target else (found[0] + origin[0], found[1] + origin[1])
+            hit.update(x=found[0] + origin[0], y=found[1] + origin[1], confidence=round(found[2], 3), local=local)
+        return hit
+    
+    begin_stage("match")
+    with ThreadPoolExecutor(max_workers=min(len(targets), os.cpu_count() or 2)) as pool:
+        results = list(pool.map(search, targets))
+    hits = sorted((r for r in results if "confidence" in r), key=lambda r: r["confidence"], reverse=True)
+    timing = {"wall_ms": round((time.perf_counter() - started) * 1000, 1), "targets": len(results)}
+    if not hits:
+        return {"success": False, "error": f"Template not found in any target: {args.template}",
+                "searched": results, "timing": timing}
+    
+    best = hits[0]
+    input_metrics = None
+    if not args.no_click:
+        begin_stage("input")
+        input_metrics = run_input(click_actions(best["x"], best["y"], args), args.priority, args.max_hold)
+        roi = f"window:{best['window_id']}" if "window_id" in best else "root"
+        record_hit(hits_key, best["confidence"], *best["local"], roi)
+    for hit in hits:
+        del hit["local"]
+    result = {
+        "success": True,
+        "action": "click" if input_metrics else "locate",
+        "x": best["x"],
+        "y": best["y"],
+        "confidence": best["confidence"],
+        "template": args.template,
+        "target": {k: v for k, v in best.items() if k in ("window_id", "screen")},
+        "timing": timing
+    }
+    if args.all_hits:
+        result["hits"] = hits
+        result["misses"] = [r for r in results if "confidence" not in r]
+    if input_metrics:
+        result["input"] = input_metrics
+    return result
+
+RECORDING_DIR = Path("/tmp/zoomclick/recording")  # Opened by zoomclick --record-start
+
+def record_match(screen_path, template_path, min_confidence, match, match_ms, roi):
+    """Append this lookup to the open zoomclick recording (frames/templates deduped by pixel hash)."""
+    import cv2, hashlib, shutil
+    if not (RECORDING_DIR / "session.json").exists():
+        return
+    keys = []
+    for kind, path in (("frames", screen_path), ("templates", template_path)):
+        image = cv2.imread(str(path))
+        if image is None:
+            return
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(image.shape).encode())
+        digest.update(image.tobytes())
+        keys.append(digest.hexdigest())
+        target = RECORDING_DIR / kind / f"{keys[-1]}.png"
+        if not target.exists():
+            if Path(path).suffix == ".png":
+                shutil.copyfile(path, target)
+            else:
+                cv2.imwrite(str(target), image)
+    event = {"t": round(time.time(), 3), "tool": "vclick", "name": Path(template_path).stem,
+             "frame": keys[0], "template": keys[1], "chain": [], "roi": roi, "min_confidence": min_confidence,
+             "match": [int(match[0]), int(match[1]), round(float(match[2]), 4)] if match else None,
+             "search": "full", "timing": {"match_ms": match_ms}}
+    with open(RECORDING_DIR / "events.jsonl", "a") as f:
+        f.write(json.dumps(event) + "\n")
+
+def encode_for_model(src_path, max_edge=0, image_format="png", quality=85, max_bytes=0):
+    """
+    Downscale/re-encode a screenshot for vision-model consumption.
+    max_edge caps the long side; max_bytes is a byte budget (quality drops first, then size).
+    Returns (path, info) where info["scale"] maps back as: screen = image / scale.
+    """
+    info = {"format": "png", "scale": 1.0}
+    if not max_edge and image_format == "png" and not max_bytes:
+        return src_path, info
+    try:
+        import cv2
+    except ImportError:
+        return src_path, info
+    
+    img = cv2.imread(str(src_path))
+    if img is None:
+        return src_path, info
+    src_h, src_w = img.shape[:2]
+    scale = min(1.0, max_edge / max(src_w, src_h)) if max_edge else 1.0
+    ext = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}[image_format]
+    
+    while True:
+        width, height = max(1, round(src_w * scale)), max(1, round(src_h * scale))
+        resized = img if scale == 1.0 else cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+        params = {"jpeg": [cv2.IMWRITE_JPEG_QUALITY, quality], "webp": [cv2.IMWRITE_WEBP_QUALITY, quality]}.get(image_format, [])
+        ok, data = cv2.imencode(ext, resized, params)
+        if not ok:
+            raise RuntimeError(f"Could not encode {src_path} as {image_format}")
+        if not max_bytes or len(data) <= max_bytes or max(width, height) <= 64:
+            break
+        if image_format != "png" and quality > 40:
+            quality -= 15
+        else:
+            scale *= 0.8
+    
+    dst_path = Path(src_path).with_name(f"{Path(src_path).stem}_model{ext}")
+    dst_path.write_bytes(data.tobytes())
+    info = {"format": image_format, "scale": round(width / src_w, 6), "width": width, "height": height,
+            "source_width": src_w, "source_height": src_h, "bytes": len(data)}
+    if image_format != "png":
+        info["quality"] = quality
+    return dst_path, info
+
+def retain_frame(path):
+    """Keep a raw capture for later --since diffs. Returns its artifact ID."""
+    import shutil
+    FRAMES_DIR.mkdir(exist_ok=True)
+    artifact_id = f"f{time.time_ns() // 1_000_000:x}"
+    shutil.copyfile(path, FRAMES_DIR / f"{artifact_id}.png")
+    for old in sorted(FRAMES_DIR.glob("f*.png"))[:-FRAMES_KEEP]:
+        old.unlink()
+    return artifact_id
+
+def diff_frames(artifact_id, new_path):
+    """
+    Diff a new capture against a retained frame and crop only the changed regions.
+    Returns change_ratio, no_visible_change and regions (box + cropped image path),
+    or full_frame=True when too much changed for crops to help.
+    """
+    import cv2
+    
+    old_path = FRAMES_DIR / f"{artifact_id}.png"
+    if not old_path.exists():
+        raise ValueError(f"Unknown or expired artifact: {artifact_id} (only the last {FRAMES_KEEP} are kept)")
+    old = cv2.imread(str(old_path))
+    new = cv2.imread(str(new_path))
+    if old is None or new is None or old.shape != new.shape:
+        return {"since": artifact_id, "full_frame": True, "reason": "frame size changed"}
+    
+    changed = cv2.absdiff(old, new).max(axis=2) > 16
+    ratio = float(changed.mean())
+    if ratio < 0.0005:
+        return {"since": artifact_id, "change_ratio": round(ratio, 5), "no_visible_change": True,
+                "regions": [], "message": "No visible change"}
+    
+    mask = cv2.dilate(changed.astype("uint8"), cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = sorted((tuple(int(v) for v in s[:4]) for s in stats[1:count]), key=lambda b: b[2] * b[3], reverse=True)
+    if ratio > 0.5 or len(boxes) > 8:
+        return {"since": artifact_id, "change_ratio": round(ratio, 5), "full_frame": True, "reason": "large change"}
+    
+    height, width = new.shape[:2]
+    regions = []
+    stamp = time.time_ns() // 1_000_000
+    for i, (x, y, w, h) in enumerate(boxes):
+        x0, y0, x1, y1 = max(0, x - 4), max(0, y - 4), min(width, x + w + 4), min(height, y + h + 4)
+        crop_path = SCREENSHOT_DIR / f"delta_{stamp}_{i}.png"
+        cv2.imwrite(str(crop_path), new[y0:y1, x0:x1])
+        regions.append({"box": [x0, y0, x1 - x0, y1 - y0], "image": str(crop_path)})
+    return {"since": artifact_id, "change_ratio": round(ratio, 5), "no_visible_change": False, "regions": regions}
+
+def detect_marks(image):
+    """
+    Detect likely interactive elements (buttons, icons, fields) in a BGR image.
+    Single pass of edges + connected components, same approach as zoomclick --marks.
+    Returns boxes (x, y, width, height) in reading order.
+    """
+    import cv2
+    
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 50, 150)
+    merged = cv2.dilate(edges, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 5)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(merged, connectivity=8)
+    
+    img_h, img_w = gray.shape
+    boxes = []
+    for x, y, w, h, area in stats[1:count]:
+        if w < 8 or h < 8 or w > img_w / 2 or h > img_h / 2 or area < 0.15 * w * h:
+            continue
+        boxes.append((int(x), int(y), int(w), int(h)))
+    
+    # Drop labels nested inside their (not much bigger) button
+    boxes.sort(key=lambda b: b[2] * b[3], reverse=True)
+    kept = []
+    for x, y, w, h in boxes:
+        if not any(kx <= x and ky <= y and x + w <= kx + kw and y + h <= ky + kh and kw * kh <= 4 * w * h
+                   for kx, ky, kw, kh in kept):
+            kept.append((x, y, w, h))
+    kept.sort(key=lambda b: (b[1] // 10, b[0]))
+    return kept[:200]
+
+def find_marks(screenshot_path, offset_x=0, offset_y=0):
+    """
+    Detect and number marks in a screenshot, drawing them to a new image.
+    Detection is cached in MARKS_FILE and reused while the frame is unchanged.
+    Returns (marks, marks_image_path, detect_ms) with detect_ms None on a cache hit.
+    """
+    import cv2
+    import hashlib
+    
+    image = cv2.imread(str(screenshot_path))
+    if image is None:
+        raise RuntimeError(f"Could not read screenshot: {screenshot_path}")
+    frame_hash = hashlib.blake2b(image.tobytes(), digest_size=16).hexdigest()
+    
+    cached = {}
+    if MARKS_FILE.exists():
+        with open(MARKS_FILE) as f:
+            cached = json.load(f)
+    if cached.get("frame_hash") == frame_hash and cached.get("offset") == [offset_x, offset_y]:
+        marks = cached["marks"]
+        detect_ms = None
+    else:
+        start = time.perf_counter()
+        marks = [
+            {"id": i + 1, "box": list(box),
+             "screen_x": offset_x + box[0] + box[2] // 2, "screen_y": offset_y + box[1] + box[3] // 2}
+            for i, box in enumerate(detect_marks(image))
+        ]
+        detect_ms = round((time.perf_counter() - start) * 1000, 1)
+        with open(MARKS_FILE, 'w') as f:
+            json.dump({"frame_hash": frame_hash, "offset": [offset_x, offset_y],
+                       "created": time.time(), "marks": marks}, f)
+    
+    for mark in marks:
+        x, y, w, h = mark["box"]
+        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 0, 255), 1)
+        cv2.putText(image, str(mark["id"]), (x + 1, max(y - 2, 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 255), 1)
+    marks_path = SCREENSHOT_DIR / f"marks_{int(time.time())}.png"
+    cv2.imwrite(str(marks_path), image)
+    
+    return marks, marks_path, detect_ms
 
 def main():
     parser = argparse.ArgumentParser(
@@ -283,24 +984,53 @@ def main():
     parser.add_argument("--screenshot", "-s", action="store_true", help="Just take screenshot")
     parser.add_argument("--coords", "-c", nargs=2, type=int, metavar=("X", "Y"), help="Click at coordinates")
     parser.add_argument("--template", "-t", help="Template image to find and click")
+    parser.add_argument("--marks", action="store_true", help="Detect and number interactive elements")
+    parser.add_argument("--click-mark", type=int, metavar="N", help="Click numbered element N from the last --marks")
     parser.add_argument("--click-type", choices=["single", "double", "right"], default="single")
     parser.add_argument("--no-click", action="store_true", help="Find but don't click")
-    parser.add_argument("--confidence", type=float, default=0.5, help="Min confidence for template (0.0-1.0)")
+    parser.add_argument("--all-windows", action="store_true",
+                        help="With --template, search every window matching --window/--window-class in parallel")
+    parser.add_argument("--all-screens", action="store_true", help="With --template, search every monitor in parallel")
+    parser.add_argument("--all-hits", action="store_true", help="With --all-windows/--all-screens, list every hit")
+    parser.add_argument("--confidence", type=float,
+                        help="Min confidence for template (0.0-1.0; default: learned from past hits, else 0.5)")
     parser.add_argument("--type", dest="type_text", help="Type text after clicking")
     parser.add_argument("--key", help="Press key after clicking (e.g., 'enter', 'tab')")
     parser.add_argument("--display", "-d", default=":99", help="X display (default :99)")
     
+    # Output image policy (screenshot and description modes)
+    parser.add_argument("--max-edge", type=int, default=0, help="Downscale output image to this long edge (px)")
+    parser.add_argument("--image-format", choices=["png", "jpeg", "webp"], default="png", help="Output image format")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG/WebP quality (1-100)")
+    parser.add_argument("--max-bytes", type=int, default=0, help="Output image byte budget")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="With --coords, image scale the coordinates were read at (from image.scale)")
+    
     # Window/screen targeting options
     parser.add_argument("--window", "-w", help="Capture window by title (substring match)")
     parser.add_argument("--window-class", help="Capture window by class name")
     parser.add_argument("--window-id", type=int, help="Capture specific window ID")
     parser.add_argument("--screen", type=int, help="Capture specific screen number (0-indexed)")
     parser.add_argument("--list-windows", action="store_true", help="List all visible windows")
+    parser.add_argument("--cdp", type=int, nargs="?", const=9222, metavar="PORT",
+                        help="Capture the Chrome page viewport over DevTools (default port 9222)")
+    parser.add_argument("--since", metavar="ARTIFACT_ID",
+                        help="With --screenshot, return only regions changed since that capture")
+    parser.add_argument("--priority", type=int, default=0,
+                        help="Input queue priority when agents share the display (higher goes first)")
+    parser.add_argument("--max-hold", type=int, default=INPUT_MAX_HOLD_MS, metavar="MS",
+                        help="Stop an input job once it has held the display this long (checked between actions)")
+    parser.add_argument("--deadline", type=int, metavar="MS",
+                        help="Total time budget; a stage that overruns its share exits 124 with a timeout error")
     
     args = parser.parse_args()
     
     # Set display
     os.environ['DISPLAY'] = args.display
+    if args.deadline:
+        now = time.monotonic()
+        DEADLINE.update(end=now + args.deadline / 1000, total_ms=args.deadline, stage_start=now,
+                        stage_end=now + args.deadline / 1000)
     
     # Handle list-windows first
     if args.list_windows:
@@ -314,6 +1044,39 @@ def main():
         print(json.dumps(result, indent=2))
         return 0
     
+    # Click a mark from the last --marks run (no new screenshot needed)
+    if args.click_mark is not None:
+        marks = []
+        if MARKS_FILE.exists():
+            with open(MARKS_FILE) as f:
+                marks = json.load(f).get("marks", [])
+        mark = next((m for m in marks if m["id"] == args.click_mark), None)
+        if not mark:
+            print(json.dumps({"success": False, "error": f"Mark {args.click_mark} not found. Run: vclick --marks"}))
+            return 1
+        x, y = mark["screen_x"], mark["screen_y"]
+        input_metrics = None
+        if not args.no_click:
+            begin_stage("input")
+            input_metrics = run_input(click_actions(x, y, args), args.priority, args.max_hold)
+        result = {
+            "success": True,
+            "action": "click" if input_metrics else "locate",
+            "mark": args.click_mark,
+            "x": x,
+            "y": y,
+            "box": mark["box"]
+        }
+        if input_metrics:
+            result["input"] = input_metrics
+        print(json.dumps(result, indent=2))
+        return 0
+    
+    if args.template and (args.all_windows or args.all_screens):
+        result = find_template_across(args)
+        print(json.dumps(result, indent=2))
+        return 0 if result["success"] else 1
+    
     screen_width, screen_height = get_screen_size()
     
     # Determine screenshot mode
@@ -336,7 +1099,16 @@ def main():
         window_id = windows[0]  # Take first match
     
     # Take screenshot based on mode
-    if window_id:
+    begin_stage("capture")
+    if args.cdp:
+        try:
+            screenshot_path, window_geometry = take_screenshot_page(args.cdp)
+        except StageTimeout:
+            raise
+        except (RuntimeError, OSError) as e:
+            print(json.dumps({"success": False, "error": str(e)}))
+            return 1
+    elif window_id:
         window_geometry = get_window_geometry(window_id)
         screenshot_path = take_screenshot_window(window_id)
     elif args.screen is not None:
@@ -345,76 +1117,148 @@ def main():
         screenshot_path = take_screenshot()
     
     if args.screenshot:
+        artifact_id = retain_frame(screenshot_path)
+        changes = None
+        if args.since:
+            try:
+                changes = diff_frames(args.since, screenshot_path)
+            except ValueError as e:
+                print(json.dumps({"success": False, "error": str(e)}))
+                return 1
+        if changes and not changes.get("full_frame"):
+            result = {
+                "success": True,
+                "artifact_id": artifact_id,
+                "changes": changes,
+                "screen_size": {"width": screen_width, "height": screen_height}
+            }
+            if window_id:
+                result["window_id"] = window_id
+                result["window_geometry"] = window_geometry
+                result["note"] = "Region boxes are relative to window, not screen"
+            if args.cdp:
+                result["page_origin"] = {"x": window_geometry["X"], "y": window_geometry["Y"]}
+                result["note"] = "Region boxes are relative to the page viewport (screen = page_origin + box)"
+            print(json.dumps(result, indent=2))
+            return 0
+        
+        image_path, image_info = encode_for_model(screenshot_path, args.max_edge, args.image_format,
+                                                  args.quality, args.max_bytes)
         result = {
             "success": True,
-            "screenshot": str(screenshot_path),
+            "screenshot": str(image_path),
+            "artifact_id": artifact_id,
+            "image": image_info,
             "screen_size": {"width": screen_width, "height": screen_height}
         }
+        if changes:
+            result["changes"] = changes
         if window_id:
             result["window_id"] = window_id
             result["window_geometry"] = window_geometry
             result["note"] = "Coordinates are relative to window, not screen"
+        if args.cdp:
+            result["page_origin"] = {"x": window_geometry["X"], "y": window_geometry["Y"]}
+            result["note"] = "Coordinates are relative to the page viewport; click them with --cdp -c X Y"
         if args.screen is not None:
             result["screen"] = args.screen
         print(json.dumps(result, indent=2))
         return 0
     
+    if args.marks:
+        offset_x = offset_y = 0
+        if window_geometry:
+            offset_x = window_geometry.get("X", 0)
+            offset_y = window_geometry.get("Y", 0)
+        begin_stage("match")
+        marks, marks_path, detect_ms = find_marks(screenshot_path, offset_x, offset_y)
+        begin_stage("output")
+        result = {
+            "success": True,
+            "action": "marks",
+            "screenshot": str(marks_path),
+            "count": len(marks),
+            "cached": detect_ms is None,
+            "detect_ms": detect_ms,
+            "marks": [{"id": m["id"], "box": m["box"], "screen_coords": {"x": m["screen_x"], "y": m["screen_y"]}}
+                      for m in marks],
+            "instructions": "Each numbered red box is a likely interactive element. Click one with: vclick --click-mark N"
+        }
+        if window_id:
+            result["window_id"] = window_id
+        print(json.dumps(result, indent=2))
+        return 0
+    
     if args.coords:
         x, y = args.coords
+        # Coordinates read from a downscaled image map back by dividing by its scale
+        if args.scale != 1.0:
+            x, y = round(x / args.scale), round(y / args.scale)
         # If window mode, coordinates are relative to window - translate to screen
         screen_x, screen_y = x, y
-        if window_id and window_geometry:
+        if window_geometry:
             screen_x = x + window_geometry.get("X", 0)
             screen_y = y + window_geometry.get("Y", 0)
         
-        clicked = False
+        input_metrics = None
         if not args.no_click:
-            clicked = click_at(screen_x, screen_y, args.click_type)
-            if args.type_text:
-                time.sleep(0.1)
-                type_text(args.type_text)
-            if args.key:
-                time.sleep(0.1)
-                press_key(args.key)
+            begin_stage("input")
+            input_metrics = run_input(click_actions(screen_x, screen_y, args), args.priority, args.max_hold)
         
         result = {
             "success": True,
-            "action": "click" if clicked else "locate",
+            "action": "click" if input_metrics else "locate",
             "x": x,
             "y": y,
             "click_type": args.click_type,
             "screenshot": str(screenshot_path)
         }
+        if window_geometry or args.scale != 1.0:
+            result["screen_coords"] = {"x": screen_x, "y": screen_y}
         if window_id:
             result["window_id"] = window_id
-            result["screen_coords"] = {"x": screen_x, "y": screen_y}
+        if input_metrics:
+            result["input"] = input_metrics
         print(json.dumps(result, indent=2))
         return 0
     
     if args.template:
-        match = find_template(screenshot_path, args.template, args.confidence)
+        begin_stage("match")
+        match_started = time.perf_counter()
+        roi = f"cdp:{args.cdp}" if args.cdp else f"window:{window_id}" if window_id else "root"
+        hits_key, history = template_hits(args.template) if Path(args.template).exists() else (None, {})
+        # An explicit --confidence wins over thresholds learned from this template's hits
+        learned = learned_thresholds(history, roi) if args.confidence is None else None
+        min_confidence = 0.5 if args.confidence is None else args.confidence
+        match = find_template(screenshot_path, args.template, min_confidence, learned)
+        match_ms = round((time.perf_counter() - match_started) * 1000, 1)
+        record_match(screenshot_path, args.template, learned["accept"] if learned else min_confidence,
+                     match, match_ms, roi)
+        begin_stage("input")
         
         if match:
             x, y, conf = match
-            clicked = False
+            if args.cdp:
+                # Matched in the page image: move to screen coordinates
+                x, y = x + window_geometry["X"], y + window_geometry["Y"]
+            input_metrics = None
             if not args.no_click:
-                clicked = click_at(x, y, args.click_type)
-                if args.type_text:
-                    time.sleep(0.1)
-                    type_text(args.type_text)
-                if args.key:
-                    time.sleep(0.1)
-                    press_key(args.key)
+                input_metrics = run_input(click_actions(x, y, args), args.priority, args.max_hold)
+                record_hit(hits_key, conf, match[0], match[1], roi)
             
             result = {
                 "success": True,
-                "action": "click" if clicked else "locate",
+                "action": "click" if input_metrics else "locate",
                 "x": x,
                 "y": y,
                 "confidence": round(conf, 3),
                 "template": args.template,
                 "screenshot": str(screenshot_path)
             }
+            if input_metrics:
+                result["input"] = input_metrics
+            if learned:
+                result["thresholds"] = {k: v for k, v in learned.items() if k != "last_hit"}
         else:
             result = {
                 "success": False,
@@ -427,13 +1271,18 @@ def main():
     
     if args.description:
         # Vision mode - output for AI analysis
+        image_path, image_info = encode_for_model(screenshot_path, args.max_edge, args.image_format,
+                                                  args.quality, args.max_bytes)
         result = {
             "action": "vision_find",
             "description": args.description,
-            "screenshot": str(screenshot_path),
+            "screenshot": str(image_path),
+            "image": image_info,
             "screen_size": {"width": screen_width, "height": screen_height},
             "instructions": "Analyze the screenshot and return the center coordinates of the described element as JSON: {\"x\": N, \"y\": N}"
         }
+        if image_info["scale"] != 1.0:
+            result["instructions"] += f". The image is scaled by {image_info['scale']}: click with vclick -c X Y --scale {image_info['scale']}"
         print(json.dumps(result, indent=2))
         return 0
     
@@ -453,4 +1302,8 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    sys.exit(main())
+    try:
+        sys.exit(main())
+    except StageTimeout as e:
+        print(json.dumps(e.to_dict()))
+        sys.exit(124)
@@ -0,0 +1,257 @@
+"""
+Chrome DevTools Protocol capture backend for zoomclick.
+
+scripts/start-chrome-automation.sh starts Chrome with
+--remote-debugging-port=9222. Instead of screenshotting the X root window and
+cropping, the page viewport can be pulled straight from the renderer with
+Page.captureScreenshot (optionally clipped, PNG/JPEG/WebP).
+
+Only the standard library is used: a minimal WebSocket client speaks to the
+page target, and one connection per port is kept open for the life of the
+process, so repeated captures (zoom steps, --verify polls) skip the handshake.
+
+Page coordinates map to the screen with the browser window geometry:
+screen = origin + page_css * device_pixel_ratio (see page_geometry).
+"""
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+import time
+import urllib.parse
+import urllib.request
+
+from helpers import WORK_DIR, StageTimeout, DEADLINE, call_timeout_s
+
+DEFAULT_CDP_PORT = 9222
+CDP_HOST = "127.0.0.1"
+CDP_TIMEOUT_S = 10.0
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Connections opened by this process, keyed by port
+CONNECTIONS = {}
+
+
+class CDPConnection:
+    """Minimal WebSocket client for one DevTools target (text frames, JSON messages)."""
+
+    def __init__(self, ws_url: str, timeout: float = None):
+        parsed = urllib.parse.urlparse(ws_url)
+        host, port = parsed.hostname, parsed.port or 80
+        self.sock = socket.create_connection((host, port), timeout=timeout or min(CDP_TIMEOUT_S, call_timeout_s()))
+        self.buffer = bytearray()
+        self.next_id = 0
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((
+            f"GET {parsed.path or '/'} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode())
+        while b"\r\n\r\n" not in self.buffer:
+            self.fill()
+        head, _, rest = bytes(self.buffer).partition(b"\r\n\r\n")
+        self.buffer = bytearray(rest)
+        lines = head.decode(errors="replace").split("\r\n")
+        if " 101 " not in lines[0] + " ":
+            raise RuntimeError(f"CDP WebSocket handshake failed: {lines[0]}")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:])}
+        if headers.get("sec-websocket-accept") != accept:
+            raise RuntimeError("CDP WebSocket handshake failed: bad Sec-WebSocket-Accept")
+
+    def fill(self):
+        chunk = self.sock.recv(1 << 20)
+        if not chunk:
+            raise RuntimeError("CDP connection closed")
+        self.buffer += chunk
+
+    def read_exact(self, size: int) -> bytes:
+        while len(self.buffer) < size:
+            self.fill()
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def send_frame(self, payload: bytes, opcode: int = 0x1):
+        # Client frames are always masked (RFC 6455 5.3)
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header += bytes([0x80 | 126]) + struct.pack("!H", length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", length)
+        mask = os.urandom(4)
+        repeated = (mask * (length // 4 + 1))[:length]
+        masked = (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(length, "big")
+        self.sock.sendall(bytes(header) + mask + masked)
+
+    def recv_message(self) -> str:
+        """Next complete text message (control frames are handled inline)."""
+        parts = []
+        while True:
+            b0, b1 = self.read_exact(2)
+            fin, opcode = b0 & 0x80, b0 & 0x0F
+            length = b1 & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self.read_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self.read_exact(8))[0]
+            mask = self.read_exact(4) if b1 & 0x80 else None
+            payload = self.read_exact(length)
+            if mask:
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+            if opcode == 0x9:      # ping
+                self.send_frame(payload, 0xA)
+                continue
+            if opcode == 0xA:      # pong
+                continue
+            if opcode == 0x8:      # close
+                raise RuntimeError("CDP connection closed by browser")
+            parts.append(payload)
+            if fin:
+                return b"".join(parts).decode()
+
+    def call(self, method: str, params: dict = None) -> dict:
+        """
+        Send a command and wait for its result (events in between are dropped).
+        Bounded by call_timeout_s(); a browser that stops answering raises StageTimeout.
+        """
+        timeout = min(CDP_TIMEOUT_S, call_timeout_s())
+        self.sock.settimeout(timeout)
+        started = time.monotonic()
+        self.next_id += 1
+        message_id = self.next_id
+        self.send_frame(json.dumps({"id": message_id, "method": method, "params": params or {}}).encode())
+        while True:
+            try:
+                message = json.loads(self.recv_message())
+            except socket.timeout:
+                # The reply may still arrive mid-frame; drop the connection rather than resync
+                self.sock.close()
+                for port, conn in list(CONNECTIONS.items()):
+                    if conn is self:
+                        del CONNECTIONS[port]
+                raise StageTimeout(DEADLINE["stage"], timeout * 1000, (time.monotonic() - started) * 1000, method)
+            if message.get("id") != message_id:
+                continue
+            if "error" in message:
+                raise RuntimeError(f"CDP {method} failed: {message['error'].get('message', message['error'])}")
+            return message.get("result", {})
+
+    def close(self):
+        try:
+            self.send_frame(b"", 0x8)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def page_target(port: int = DEFAULT_CDP_PORT) -> dict:
+    """The first regular page target listed by the browser (the most recently active tab)."""
+    try:
+        timeout = min(CDP_TIMEOUT_S, call_timeout_s())
+        with urllib.request.urlopen(f"http://{CDP_HOST}:{port}/json/list", timeout=timeout) as response:
+            targets = json.load(response)
+    except OSError as e:
+        raise RuntimeError(f"Chrome DevTools not reachable on port {port}: {e}. "
+                           "Start Chrome with --remote-debugging-port (scripts/start-chrome-automation.sh)")
+    for target in targets:
+        if target.get("type") == "page" and target.get("webSocketDebuggerUrl") \
+                and not target.get("url", "").startswith(("devtools://", "chrome-extension://")):
+            return target
+    raise RuntimeError(f"No page target on DevTools port {port}")
+
+
+def connect(port: int = DEFAULT_CDP_PORT) -> CDPConnection:
+    """Persistent connection to the current page target (reused within this process)."""
+    conn = CONNECTIONS.get(port)
+    if conn is None:
+        conn = CDPConnection(page_target(port)["webSocketDebuggerUrl"])
+        CONNECTIONS[port] = conn
+    return conn
+
+
+def page_geometry(port: int = DEFAULT_CDP_PORT, window_geo: dict = None) -> dict:
+    """
+    Where the page viewport sits on screen.
+
+    Uses the browser window's position and outer/inner sizes. If window_geo
+    (xdotool geometry of the browser window, in screen px) is given, its
+    position wins over window.screenX/Y (CSS px), which some window managers
+    report as 0.
+    Returns origin_x/origin_y (screen px), width/height (CSS px) and scale
+    (device pixel ratio): screen = origin + page * scale.
+    """
+    result = connect(port).call("Runtime.evaluate", {
+        "expression": "JSON.stringify({sx: screenX, sy: screenY, ow: outerWidth, oh: outerHeight,"
+                      " iw: innerWidth, ih: innerHeight, dpr: devicePixelRatio})",
+        "returnByValue": True,
+    })
+    g = json.loads(result["result"]["value"])
+    scale = g["dpr"] or 1
+    border = max(0, (g["ow"] - g["iw"]) // 2)
+    toolbar = max(0, g["oh"] - g["ih"] - border)
+    if window_geo and "X" in window_geo and "Y" in window_geo:
+        # xdotool reports device px already: only the CSS-px frame insets need scaling
+        origin_x = window_geo["X"] + round(border * scale)
+        origin_y = window_geo["Y"] + round(toolbar * scale)
+    else:
+        origin_x = round((g["sx"] + border) * scale)
+        origin_y = round((g["sy"] + toolbar) * scale)
+    return {
+        "origin_x": origin_x,
+        "origin_y": origin_y,
+        "width": g["iw"],
+        "height": g["ih"],
+        "scale": scale,
+    }
+
+
+def capture_page(port: int = DEFAULT_CDP_PORT, clip: tuple = None, image_format: str = "png",
+                 quality: int = None) -> bytes:
+    """
+    Page.captureScreenshot of the viewport (or clip = (x, y, w, h) in document
+    CSS px, see viewport_clip).
+    Returns the encoded image bytes in image_format (png, jpeg or webp).
+    """
+    params = {"format": image_format, "fromSurface": True}
+    if quality is not None and image_format != "png":
+        params["quality"] = quality
+    if clip:
+        x, y, w, h = clip
+        params["clip"] = {"x": x, "y": y, "width": w, "height": h, "scale": 1}
+    return base64.b64decode(connect(port).call("Page.captureScreenshot", params)["data"])
+
+
+def viewport_clip(port: int, x: int, y: int, width: int, height: int) -> tuple:
+    """
+    Clip for capture_page of a viewport rectangle given in captured pixels (as
+    in take_screenshot_page frames): adds the scroll position, divides by the
+    device pixel ratio.
+    """
+    result = connect(port).call("Runtime.evaluate", {
+        "expression": "JSON.stringify({x: visualViewport.pageLeft, y: visualViewport.pageTop,"
+                      " dpr: devicePixelRatio})",
+        "returnByValue": True,
+    })
+    v = json.loads(result["result"]["value"])
+    dpr = v["dpr"] or 1
+    return (v["x"] + x / dpr, v["y"] + y / dpr, width / dpr, height / dpr)
+
+
+def take_screenshot_page(port: int = DEFAULT_CDP_PORT, name: str = "page", clip: tuple = None) -> tuple:
+    """Capture the page viewport (or a clip of it) to a PNG in WORK_DIR. Returns (path, capture_ms)."""
+    started = time.perf_counter()
+    data = capture_page(port, clip)
+    path = WORK_DIR / f"{name}_{int(time.time())}.png"
+    path.write_bytes(data)
+    return path, round((time.perf_counter() - started) * 1000, 1)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Stub DevTools endpoint for testing the CDP backend (cdp.py) without Chrome.
+
+Serves one page target over the same HTTP + WebSocket protocol Chrome uses
+and answers the calls zoomclick makes:
+
+- Runtime.evaluate: window geometry (screenX/Y, outer/inner size,
+  devicePixelRatio) and the visual viewport scroll position
+- Page.captureScreenshot: a fixed viewport image (device px), clipped like
+  Chrome does (clip in document CSS px, output scaled by the pixel ratio)
+
+Run it in place of Chrome:
+
+    python3 cdpstub.py page.png --port 9333 --dpr 2 --screen-x 100 --screen-y 50
+    zoomclick --start --cdp 9333
+
+or check cdp.py against it (page origin with and without xdotool geometry,
+clipped captures) at several pixel ratios:
+
+    python3 cdpstub.py --self-test
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import socket
+import struct
+import sys
+import threading
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class StubBrowser:
+    """One fake page target. image is the viewport in device px (BGR array)."""
+
+    def __init__(self, image, dpr: float = 1.0, screen_x: int = 0, screen_y: int = 0,
+                 border: int = 0, toolbar: int = 85, scroll_x: int = 0, scroll_y: int = 0, port: int = 0):
+        self.image = image
+        self.dpr = dpr
+        self.screen_x, self.screen_y = screen_x, screen_y  # CSS px, as window.screenX/Y
+        self.border, self.toolbar = border, toolbar        # CSS px around the viewport
+        self.scroll_x, self.scroll_y = scroll_x, scroll_y  # CSS px
+        self.calls = []
+        self.server = socket.socket()
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(("127.0.0.1", port))
+        self.server.listen()
+        self.port = self.server.getsockname()[1]
+
+    def start(self) -> "StubBrowser":
+        threading.Thread(target=self.serve, daemon=True).start()
+        return self
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return  # Closed
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def close(self):
+        self.server.close()
+
+    def geometry(self) -> dict:
+        inner_w = round(self.image.shape[1] / self.dpr)
+        inner_h = round(self.image.shape[0] / self.dpr)
+        return {"sx": self.screen_x, "sy": self.screen_y,
+                "ow": inner_w + 2 * self.border, "oh": inner_h + self.toolbar + self.border,
+                "iw": inner_w, "ih": inner_h, "dpr": self.dpr}
+
+    def evaluate(self, expression: str) -> dict:
+        if "visualViewport" in expression:
+            value = {"x": self.scroll_x, "y": self.scroll_y, "dpr": self.dpr}
+        else:
+            value = self.geometry()
+        return {"result": {"type": "string", "value": json.dumps(value)}}
+
+    def screenshot(self, params: dict) -> dict:
+        import cv2
+
+        image = self.image
+        clip = params.get("clip")
+        if clip:
+            # Document CSS px -> viewport device px
+            x0 = round((clip["x"] - self.scroll_x) * self.dpr)
+            y0 = round((clip["y"] - self.scroll_y) * self.dpr)
+            x1 = x0 + round(clip["width"] * self.dpr)
+            y1 = y0 + round(clip["height"] * self.dpr)
+            image = image[max(0, y0):y1, max(0, x0):x1]
+        ext = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}[params.get("format", "png")]
+        return {"data": base64.b64encode(cv2.imencode(ext, image)[1].tobytes()).decode()}
+
+    def handle(self, conn: socket.socket):
+        with conn:
+            data = b""
+            while b"\r\n\r\n" not in data:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                data += chunk
+            head = data.split(b"\r\n\r\n")[0].decode()
+            request_line = head.split("\r\n")[0]
+            if "/json" in request_line.split(" ")[1]:
+                body = json.dumps([{
+                    "type": "page", "url": "about:blank", "title": "stub",
+                    "webSocketDebuggerUrl": f"ws://127.0.0.1:{self.port}/devtools/page/stub",
+                }]).encode()
+                conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: %d\r\n\r\n" % len(body) + body)
+                return
+            key = next(line.split(":", 1)[1].strip() for line in head.split("\r\n")
+                       if line.lower().startswith("sec-websocket-key"))
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+            conn.sendall(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+            stream = conn.makefile("rb")
+            while True:
+                message = self.read_frame(stream)
+                if message is None:
+                    return
+                request = json.loads(message)
+                self.calls.append(request["method"])
+                if request["method"] == "Runtime.evaluate":
+                    reply = {"id": request["id"], "result": self.evaluate(request["params"]["expression"])}
+                elif request["method"] == "Page.captureScreenshot":
+                    reply = {"id": request["id"], "result": self.screenshot(request.get("params", {}))}
+                else:
+                    reply = {"id": request["id"], "error": {"code": -32601, "message": "method not found"}}
+                self.send_frame(conn, json.dumps(reply).encode())
+
+    @staticmethod
+    def read_frame(stream):
+        """One client text frame (masked), or None when the connection closes."""
+        header = stream.read(2)
+        if len(header) < 2 or header[0] & 0x0F == 8:
+            return None
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", stream.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", stream.read(8))[0]
+        mask = stream.read(4)
+        return bytes(b ^ mask[i % 4] for i, b in enumerate(stream.read(length)))
+
+    @staticmethod
+    def send_frame(conn: socket.socket, payload: bytes):
+        length = len(payload)
+        if length < 126:
+            header = bytes([0x81, length])
+        elif length < 65536:
+            header = bytes([0x81, 126]) + struct.pack("!H", length)
+        else:
+            header = bytes([0x81, 127]) + struct.pack("!Q", length)
+        conn.sendall(header + payload)
+
+
+def self_test() -> dict:
+    """Check cdp.py's page origin and clipped captures against the stub at several pixel ratios."""
+    import cv2
+    import numpy as np
+
+    import cdp
+
+    checks = []
+    rng = np.random.default_rng(0)
+    for dpr in (1, 1.5, 2):
+        image = rng.integers(0, 255, (round(600 * dpr), round(800 * dpr), 3), np.uint8)
+        stub = StubBrowser(image, dpr=dpr, screen_x=40, screen_y=30, border=4, toolbar=80,
+                           scroll_x=0, scroll_y=120).start()
+        try:
+            cdp.CONNECTIONS.pop(stub.port, None)
+            window_geo = {"X": round(40 * dpr), "Y": round(30 * dpr)}  # xdotool: device px
+            expected = (round((40 + 4) * dpr), round((30 + 80) * dpr))
+            for geo in (None, window_geo):
+                page = cdp.page_geometry(stub.port, geo)
+                checks.append({"check": "origin" + ("_window_geo" if geo else ""), "dpr": dpr,
+                               "ok": (page["origin_x"], page["origin_y"]) == expected,
+                               "got": [page["origin_x"], page["origin_y"]], "expected": list(expected)})
+            rect = (round(100 * dpr), round(60 * dpr), round(240 * dpr), round(135 * dpr))
+            path, _ = cdp.take_screenshot_page(stub.port, "stub_clip", clip=cdp.viewport_clip(stub.port, *rect))
+            captured = cv2.imread(str(path))
+            x, y, w, h = rect
+            checks.append({"check": "viewport_clip", "dpr": dpr,
+                           "ok": captured is not None and np.array_equal(captured, image[y:y + h, x:x + w])})
+        finally:
+            stub.close()
+            connection = cdp.CONNECTIONS.pop(stub.port, None)
+            if connection is not None:
+                connection.close()
+    return {"success": all(c["ok"] for c in checks), "action": "cdp_self_test", "checks": checks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub DevTools endpoint for testing zoomclick's CDP backend")
+    parser.add_argument("image", nargs="?", help="Viewport image (device px) to serve")
+    parser.add_argument("--port", type=int, default=9333)
+    parser.add_argument("--dpr", type=float, default=1.0, help="devicePixelRatio to report")
+    parser.add_argument("--screen-x", type=int, default=0, help="window.screenX (CSS px)")
+    parser.add_argument("--screen-y", type=int, default=0, help="window.screenY (CSS px)")
+    parser.add_argument("--toolbar", type=int, default=85, help="Browser chrome above the page (CSS px)")
+    parser.add_argument("--scroll-y", type=int, default=0, help="Page scroll position (CSS px)")
+    parser.add_argument("--self-test", action="store_true", help="Check cdp.py against the stub and exit")
+    args = parser.parse_args()
+
+    if args.self_test:
+        result = self_test()
+        print(json.dumps(result, indent=2))
+        return 0 if result["success"] else 1
+    if not args.image:
+        parser.error("an image is required unless --self-test is given")
+
+    import cv2
+    image = cv2.imread(args.image)
+    if image is None:
+        print(json.dumps({"success": False, "error": f"Could not read image: {args.image}"}))
+        return 1
+    stub = StubBrowser(image, dpr=args.dpr, screen_x=args.screen_x, screen_y=args.screen_y,
+                       toolbar=args.toolbar, scroll_y=args.scroll_y, port=args.port)
+    print(json.dumps({"success": True, "action": "cdp_stub", "port": stub.port}), flush=True)
+    try:
+        stub.serve()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
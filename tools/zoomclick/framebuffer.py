@@ -0,0 +1,317 @@
+"""
+Shared-memory frame ring for zoomclick and vclick.
+
+An optional capture service (zoomclick --capture-service) grabs the display
+continuously into a ring of frame slots in shared memory, so commands read the
+latest frame instead of paying for a capture on their critical path.
+
+Layout of the segment (one per X display):
+
+- Header: int64 fields (see HEADER_FIELDS)
+- Slot table: (seq, captured_ns) per slot; seq 0 marks a slot being written
+- Frames: SLOTS x height x width x 3 uint8 (BGR)
+
+The service writes slot seq % SLOTS, then publishes seq in the header.
+A slot is reused once the ring wraps (SLOTS publishes later), so readers copy
+the frame (or just the region they need) out of the slot and check it was not
+overwritten meanwhile (FrameRing.valid); shared_frame only hands out copies. When the screen is idle the service slows down
+to idle_rate but keeps refreshing verified_ns, the time the latest frame was
+last confirmed to still match the screen. Readers that need a fresher frame
+set wanted_ns and the service captures immediately; they give up at once when
+verified_ns has stopped advancing (the service no longer verifies after the
+screen is resized).
+"""
+
+import os
+import signal
+import time
+from multiprocessing import shared_memory
+
+HEADER_FIELDS = (
+    "magic", "width", "height", "slots", "latest_seq", "verified_ns",
+    "wanted_ns", "captured", "dropped", "idle_skips", "interval_us", "pid", "started_ns",
+)
+HEADER_SIZE = 128
+MAGIC = 0x7A636672  # "zcfr"
+
+SLOTS = 4
+DEFAULT_RATE = 10.0     # Frames per second while the screen changes
+DEFAULT_IDLE_RATE = 1.0  # Frames per second after IDLE_AFTER unchanged frames
+IDLE_AFTER = 5
+SHARED_MAX_AGE_MS = 250  # By default readers accept frames verified this recently
+SHARED_WAIT_MS = 500     # How long readers wait for a requested fresh frame
+COPY_ATTEMPTS = 3        # Copies retried when the service overwrote the slot mid-copy
+STALL_INTERVALS = 3      # verified_ns older than this many service intervals: the service stopped verifying
+
+
+def segment_name(display: str = None) -> str:
+    display = display or os.environ.get("DISPLAY", ":99")
+    return "zoomclick_frames_" + "".join(ch if ch.isalnum() else "_" for ch in display)
+
+
+class FrameRing:
+    """Shared-memory frame ring; create=True for the service, False for readers."""
+
+    def __init__(self, name: str, width: int = 0, height: int = 0, slots: int = SLOTS, create: bool = False):
+        import numpy as np
+
+        if create:
+            size = HEADER_SIZE + 16 * slots + slots * width * height * 3
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Readers must not unlink the segment when they exit (Python < 3.13)
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(self.shm._name, "shared_memory")
+            except Exception:
+                pass
+
+        buf = self.shm.buf
+        self.header = np.ndarray((len(HEADER_FIELDS),), dtype=np.int64, buffer=buf)
+        if create:
+            self.header[:] = 0
+            self.set(magic=MAGIC, width=width, height=height, slots=slots,
+                     pid=os.getpid(), started_ns=time.time_ns())
+        elif self.get("magic") != MAGIC:
+            self.close()
+            raise RuntimeError(f"Shared memory {name} is not a zoomclick frame ring")
+
+        slots, height, width = self.get("slots"), self.get("height"), self.get("width")
+        self.slots = slots
+        self.table = np.ndarray((slots, 2), dtype=np.int64, buffer=buf, offset=HEADER_SIZE)
+        self.frames = np.ndarray((slots, height, width, 3), dtype=np.uint8, buffer=buf,
+                                 offset=HEADER_SIZE + 16 * slots)
+        if create:
+            self.table[:] = 0
+
+    def get(self, field: str) -> int:
+        return int(self.header[HEADER_FIELDS.index(field)])
+
+    def set(self, **fields):
+        for field, value in fields.items():
+            self.header[HEADER_FIELDS.index(field)] = value
+
+    def alive(self) -> bool:
+        try:
+            os.kill(self.get("pid"), 0)
+        except (ProcessLookupError, PermissionError):
+            return False
+        return True
+
+    def publish(self, frame, captured_ns: int) -> int:
+        """Write a frame into the next slot and publish it. Returns its seq."""
+        seq = self.get("latest_seq") + 1
+        slot = seq % self.slots
+        self.table[slot, 0] = 0
+        self.frames[slot] = frame
+        self.table[slot, 1] = captured_ns
+        self.table[slot, 0] = seq
+        self.set(latest_seq=seq, verified_ns=captured_ns, captured=self.get("captured") + 1)
+        return seq
+
+    def latest(self):
+        """Latest frame as (read-only view, seq, captured_ns), or None if there is none yet."""
+        seq = self.get("latest_seq")
+        if seq == 0:
+            return None
+        slot = seq % self.slots
+        if self.table[slot, 0] != seq:
+            return None
+        view = self.frames[slot]
+        view.flags.writeable = False
+        return view, seq, int(self.table[slot, 1])
+
+    def stalled(self) -> bool:
+        """True when the service has stopped refreshing verified_ns (e.g. after a screen resize)."""
+        interval_ns = self.get("interval_us") * 1000
+        limit_ns = STALL_INTERVALS * interval_ns + SHARED_WAIT_MS * 1_000_000
+        return interval_ns > 0 and time.time_ns() - self.get("verified_ns") > limit_ns
+
+    def valid(self, seq: int) -> bool:
+        """True while the slot holding frame seq has not been overwritten."""
+        return self.table[seq % self.slots, 0] == seq
+
+    def close(self):
+        # Drop numpy views first; the buffer cannot close while they exist
+        self.header = self.table = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A caller still holds a frame view; the mapping goes away at exit
+
+
+# Rings attached by this process, kept open so returned views stay mapped
+READERS = {}
+
+
+def attach(display: str = None):
+    """Attach to the running capture service's ring, or None if there is none."""
+    try:
+        ring = FrameRing(segment_name(display))
+    except (FileNotFoundError, RuntimeError):
+        return None
+    if not ring.alive():
+        ring.close()
+        return None
+    return ring
+
+
+def shared_frame(newer_than_ns: int = None, wait_ms: int = SHARED_WAIT_MS, region: tuple = None):
+    """
+    Latest frame from the capture service, verified at or after newer_than_ns
+    (default: within the last SHARED_MAX_AGE_MS).
+
+    If the newest frame is older, asks the service for a fresh capture and
+    waits up to wait_ms, or not at all once the service has stopped
+    verifying frames. Returns (frame, info) with info {seq, age_ms,
+    source}, or None when no service is running or it did not answer in
+    time (callers then capture themselves). The frame is a copy (of just
+    region (x, y, width, height) when given) checked against the slot table
+    after copying, so it never mixes two captures.
+    """
+    name = segment_name()
+    ring = READERS.get(name)
+    if ring is None or not ring.alive():
+        ring = attach()
+        if ring is None:
+            return None
+        READERS[name] = ring
+
+    if newer_than_ns is None:
+        newer_than_ns = time.time_ns() - SHARED_MAX_AGE_MS * 1_000_000
+    if ring.get("verified_ns") < newer_than_ns:
+        from helpers import remaining_s
+
+        if ring.stalled():
+            return None
+        requested = time.time_ns()
+        verified, dropped = ring.get("verified_ns"), ring.get("dropped")
+        ring.set(wanted_ns=requested)
+        wait_s = wait_ms / 1000
+        left = remaining_s()
+        if left is not None:
+            # Leave the rest of the stage budget for capturing directly
+            wait_s = min(wait_s, max(0.0, left / 2))
+        deadline = time.monotonic() + wait_s
+        while ring.get("verified_ns") < requested and time.monotonic() < deadline:
+            if ring.get("dropped") > dropped and ring.get("verified_ns") == verified:
+                return None  # The service ticked without verifying
+            time.sleep(0.005)
+        if ring.get("verified_ns") < requested:
+            return None
+
+    for _ in range(COPY_ATTEMPTS):
+        latest = ring.latest()
+        if latest is None:
+            return None
+        view, seq, captured_ns = latest
+        if region is not None:
+            x, y, width, height = region
+            view = view[y:y + height, x:x + width]
+        frame = view.copy()
+        if ring.valid(seq):
+            break
+    else:
+        return None  # Overwritten during every copy: the caller captures directly
+    return frame, {
+        "seq": seq,
+        "age_ms": round((time.time_ns() - captured_ns) / 1e6, 1),
+        "source": "capture_service",
+    }
+
+
+def run_service(rate: float = DEFAULT_RATE, idle_rate: float = DEFAULT_IDLE_RATE, slots: int = SLOTS) -> dict:
+    """
+    Capture the display into the shared ring until SIGINT/SIGTERM.
+
+    Full rate while frames change; after IDLE_AFTER identical frames the
+    interval doubles per unchanged frame up to 1/idle_rate. A capture that
+    overruns its interval counts the missed ticks as dropped frames.
+    """
+    from helpers import grab_screen
+
+    name = segment_name()
+    existing = attach()
+    if existing is not None:
+        pid = existing.get("pid")
+        existing.close()
+        raise RuntimeError(f"Capture service already running (pid {pid})")
+    try:
+        # Left behind by a service that died without cleaning up
+        stale = shared_memory.SharedMemory(name=name)
+        stale.close()
+        stale.unlink()
+    except FileNotFoundError:
+        pass
+
+    first = grab_screen()
+    height, width = first.shape[:2]
+    ring = FrameRing(name, width, height, slots, create=True)
+    ring.publish(first, time.time_ns())
+
+    stopping = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopping.append(True))
+
+    base_interval = 1.0 / rate
+    idle_interval = 1.0 / idle_rate
+    interval = base_interval
+    unchanged = 0
+    next_tick = time.monotonic() + interval
+    try:
+        while not stopping:
+            # Sleep in short steps so reader requests are served promptly
+            while not stopping and time.monotonic() < next_tick:
+                if ring.get("wanted_ns") > ring.get("verified_ns"):
+                    interval = base_interval
+                    unchanged = 0
+                    break
+                time.sleep(0.005)
+            if stopping:
+                break
+
+            started = time.monotonic()
+            captured_ns = time.time_ns()
+            frame = grab_screen()
+            if frame.shape[:2] != (height, width):
+                ring.set(dropped=ring.get("dropped") + 1)  # Screen resized; restart the service
+            else:
+                latest = ring.latest()
+                if latest is not None and (latest[0] == frame).all():
+                    unchanged += 1
+                    ring.set(verified_ns=captured_ns, idle_skips=ring.get("idle_skips") + 1)
+                else:
+                    unchanged = 0
+                    ring.publish(frame, captured_ns)
+
+            interval = base_interval if unchanged < IDLE_AFTER else min(idle_interval, interval * 2)
+            ring.set(interval_us=int(interval * 1e6))
+            elapsed = time.monotonic() - started
+            if elapsed > interval:
+                ring.set(dropped=ring.get("dropped") + int(elapsed // interval))
+            next_tick = max(started + interval, time.monotonic())
+    finally:
+        stats = service_stats(ring)
+        ring.close()
+        ring.shm.unlink()
+    return stats
+
+
+def service_stats(ring: FrameRing) -> dict:
+    now = time.time_ns()
+    started_ns = ring.get("started_ns")
+    uptime_s = max(1e-9, (now - started_ns) / 1e9)
+    return {
+        "pid": ring.get("pid"),
+        "width": ring.get("width"),
+        "height": ring.get("height"),
+        "slots": ring.slots,
+        "latest_seq": ring.get("latest_seq"),
+        "frames_captured": ring.get("captured"),
+        "unchanged_checks": ring.get("idle_skips"),
+        "dropped_frames": ring.get("dropped"),
+        "current_rate": round(1e6 / max(1, ring.get("interval_us")), 2) if ring.get("interval_us") else None,
+        "verified_age_ms": round((now - ring.get("verified_ns")) / 1e6, 1),
+        "uptime_s": round(uptime_s, 1),
+    }
@@ -0,0 +1,135 @@
+"""
+Captured frames with lazily derived representations.
+
+Several lookups often run against one capture: the probe, zoom chain and
+full search of one --click, every template of --scan or --revalidate, and
+every event of a --replay that shares a frame. A Frame wraps the BGR image
+and computes each derived representation the first time it is asked for,
+then hands the same object to every later match:
+
+- gray, and its pyrDown pyramid levels
+- color downscales (INTER_AREA) for coarse matching
+- tile content hashes (matchcache) and tile color histograms (scanindex)
+
+Derived data is accounted in bytes. Each frame keeps at most
+FRAME_DERIVED_BYTES and all frames of the process together at most
+TOTAL_DERIVED_BYTES; least recently used representations are dropped first.
+One larger than a budget on its own is returned without being kept (and
+without evicting anything for it).
+
+The frame-side spectra OpenCV computes inside matchTemplate cannot be handed
+in from outside, so they are not cached here.
+"""
+
+from collections import OrderedDict
+
+FRAME_DERIVED_BYTES = 64 << 20
+TOTAL_DERIVED_BYTES = 256 << 20
+
+# Bytes of derived data held by all live frames of this process
+USAGE = {"bytes": 0}
+
+
+def size_of(value) -> int:
+    """Approximate memory held by a derived value (arrays exactly, hash grids estimated)."""
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, tuple):
+        return sum(size_of(v) for v in value)
+    if isinstance(value, list):
+        return sum(size_of(v) for v in value) + 8 * len(value)
+    if isinstance(value, str):
+        return 49 + len(value)
+    return 64
+
+
+class Frame:
+    """A BGR frame plus representations derived from it on first use."""
+
+    def __init__(self, image):
+        self.image = image
+        self.shape = image.shape
+        self.derived = OrderedDict()  # key -> (value, bytes), least recently used first
+        self.bytes = 0
+        self.computed = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def get(self, key, compute):
+        """Cached derived value for key, computing (and accounting) it on first use."""
+        if key in self.derived:
+            self.derived.move_to_end(key)
+            self.reused += 1
+            return self.derived[key][0]
+        value = compute()
+        self.computed += 1
+        size = size_of(value)
+        if size > FRAME_DERIVED_BYTES or size > TOTAL_DERIVED_BYTES:
+            return value  # Could never be kept: leave the cached representations alone
+        while self.derived and (self.bytes + size > FRAME_DERIVED_BYTES
+                                or USAGE["bytes"] + size > TOTAL_DERIVED_BYTES):
+            self.drop(next(iter(self.derived)))
+            self.evicted += 1
+        if self.bytes + size <= FRAME_DERIVED_BYTES and USAGE["bytes"] + size <= TOTAL_DERIVED_BYTES:
+            self.derived[key] = (value, size)
+            self.bytes += size
+            USAGE["bytes"] += size
+        return value
+
+    def drop(self, key):
+        _, size = self.derived.pop(key)
+        self.bytes -= size
+        USAGE["bytes"] -= size
+
+    def release(self):
+        """Drop all derived data (the image stays)."""
+        for key in list(self.derived):
+            self.drop(key)
+
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+
+    def gray(self):
+        import cv2
+        return self.get("gray", lambda: cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY))
+
+    def pyramid(self, level: int):
+        """Gray image after level pyrDown steps (level 0 is gray itself)."""
+        import cv2
+        if level == 0:
+            return self.gray()
+        return self.get(("pyramid", level), lambda: cv2.pyrDown(self.pyramid(level - 1)))
+
+    def scaled(self, scale: float):
+        """Color image resized by scale with INTER_AREA (sizes rounded like the callers always did)."""
+        import cv2
+        if scale == 1.0:
+            return self.image
+        height, width = self.shape[:2]
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return self.get(("scaled", scale), lambda: cv2.resize(self.image, size, interpolation=cv2.INTER_AREA))
+
+    def tile_hashes(self) -> list:
+        from matchcache import tile_hashes
+        return self.get("tile_hashes", lambda: tile_hashes(self.image))
+
+    def tile_histograms(self):
+        from scanindex import tile_histogram_integral
+        return self.get("tile_histograms", lambda: tile_histogram_integral(self.image))
+
+    def stats(self) -> dict:
+        return {"derived_bytes": self.bytes, "computed": self.computed, "reused": self.reused,
+                "evicted": self.evicted}
+
+
+def as_frame(image) -> Frame:
+    """Wrap a BGR array (a Frame is returned as is)."""
+    return image if isinstance(image, Frame) else Frame(image)
+
+
+def pixels(image):
+    """The BGR array of a Frame or array."""
+    return image.image if isinstance(image, Frame) else image
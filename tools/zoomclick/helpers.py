@@ -7,7 +7,9 @@ These are display-only utilities. Overlays are never captured or saved to templa
 import os
 import subprocess
 import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional, Tuple
 
 # Directories
 WORK_DIR = Path("/tmp/zoomclick")
@@ -17,16 +19,140 @@ STATE_FILE = WORK_DIR / "state.json"
 WORK_DIR.mkdir(exist_ok=True)
 TEMPLATES_DIR.mkdir(parents=True, exist_ok=True)
 
+# Deadlines: every external call is bounded, by CALL_TIMEOUT_S or by the
+# remaining --deadline budget of the current stage, whichever is shorter
+CALL_TIMEOUT_S = 30.0
+STAGE_SHARES = {      # Max fraction of the --deadline budget one stage may use
+    "capture": 0.5,
+    "match": 0.5,
+    "ocr": 0.8,
+    "input": 0.3,
+    "verify": 0.6,
+}
+# Input stages get at least the fixed cost of one pointer job: moveTo(duration=0.25)
+# plus pyautogui.PAUSE (0.1 s) after each of the two calls, with some slack
+INPUT_STAGES = ("input", "verify")
+INPUT_MIN_MS = 500
+# input_sent: an input action already ran, so a later overrun must not ask for a retry
+# (the click happened); such overruns are collected in warnings instead of raised
+DEADLINE = {"end": None, "total_ms": 0, "stage": "command", "stage_start": time.monotonic(), "stage_end": None,
+            "input_sent": False, "warnings": []}
+
+
+class StageTimeout(RuntimeError):
+    """A stage ran past its share of the --deadline budget (or an external call hung)."""
+
+    def __init__(self, stage: str, budget_ms: float, elapsed_ms: float, command: str = None):
+        self.stage = stage
+        self.budget_ms = round(budget_ms, 1)
+        self.elapsed_ms = round(elapsed_ms, 1)
+        self.command = command
+        self.retryable = not DEADLINE["input_sent"]
+        what = f" waiting for {command}" if command else ""
+        super().__init__(f"Timed out in stage '{stage}'{what} after {self.elapsed_ms} ms (budget {self.budget_ms} ms)")
+
+    def to_dict(self) -> dict:
+        return {
+            "success": False,
+            "error": "timeout",
+            "stage": self.stage,
+            "command": self.command,
+            "budget_ms": self.budget_ms,
+            "elapsed_ms": self.elapsed_ms,
+            "deadline_ms": DEADLINE["total_ms"] or None,
+            "retryable": self.retryable,
+            "message": str(self),
+        }
+
+
+def set_deadline(ms: int):
+    """Bound the whole command to ms milliseconds from now."""
+    now = time.monotonic()
+    DEADLINE.update(end=now + ms / 1000, total_ms=ms, stage="command", stage_start=now, stage_end=now + ms / 1000,
+                    input_sent=False, warnings=[])
+
+
+def remaining_s() -> Optional[float]:
+    """Seconds left in the current stage (None without --deadline)."""
+    if DEADLINE["stage_end"] is None:
+        return None
+    return DEADLINE["stage_end"] - time.monotonic()
+
+
+def check_deadline():
+    """Raise StageTimeout if the current stage has no time left."""
+    left = remaining_s()
+    if left is not None and left <= 0:
+        raise StageTimeout(DEADLINE["stage"], (DEADLINE["stage_end"] - DEADLINE["stage_start"]) * 1000,
+                           (time.monotonic() - DEADLINE["stage_start"]) * 1000)
+
+
+def call_timeout_s() -> float:
+    """Timeout for the next external call; raises StageTimeout if the stage is already out of time."""
+    check_deadline()
+    left = remaining_s()
+    return CALL_TIMEOUT_S if left is None else min(CALL_TIMEOUT_S, left)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Run a block as a named stage with its own budget: STAGE_SHARES[name] of the
+    --deadline (at least INPUT_MIN_MS for input stages), never past the
+    enclosing stage. Overrunning raises StageTimeout naming the stage
+    (in-process work is checked when the block ends).
+    
+    An input stage whose budget cannot fit one input job fails before anything
+    is sent. Once input was sent, an overrun is recorded in DEADLINE["warnings"]
+    instead of raised: the command already acted and must not be retried.
+    """
+    outer = (DEADLINE["stage"], DEADLINE["stage_start"], DEADLINE["stage_end"])
+    start = time.monotonic()
+    end = None
+    if DEADLINE["end"] is not None:
+        check_deadline()
+        share = STAGE_SHARES.get(name, 1.0) * DEADLINE["total_ms"] / 1000
+        if name in INPUT_STAGES:
+            share = max(share, INPUT_MIN_MS / 1000)
+        end = min(outer[2], start + share)
+        if name in INPUT_STAGES and not DEADLINE["input_sent"] and end - start < INPUT_MIN_MS / 1000:
+            raise StageTimeout(name, (end - start) * 1000, 0.0)
+    DEADLINE.update(stage=name, stage_start=start, stage_end=end)
+    try:
+        yield
+        overran = end is not None and time.monotonic() > end
+    finally:
+        DEADLINE.update(stage=outer[0], stage_start=outer[1], stage_end=outer[2])
+    if overran:
+        timeout = StageTimeout(name, (end - start) * 1000, (time.monotonic() - start) * 1000)
+        if DEADLINE["input_sent"]:
+            DEADLINE["warnings"].append({"stage": name, "budget_ms": timeout.budget_ms,
+                                         "elapsed_ms": timeout.elapsed_ms, "message": str(timeout)})
+        else:
+            raise timeout
+
+
+def run_command(cmd: list, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run bounded by call_timeout_s(); a hung process is killed and reported as StageTimeout."""
+    timeout = call_timeout_s()
+    started = time.monotonic()
+    try:
+        return subprocess.run(cmd, timeout=timeout, **kwargs)
+    except subprocess.TimeoutExpired:
+        raise StageTimeout(DEADLINE["stage"], timeout * 1000, (time.monotonic() - started) * 1000, cmd[0])
+
 
 def find_window_by_name(name: str) -> list:
     """Find window IDs by title (substring match)."""
     try:
-        result = subprocess.run(
+        result = run_command(
             ['xdotool', 'search', '--name', name],
             capture_output=True, text=True
         )
         if result.returncode == 0 and result.stdout.strip():
             return [int(wid) for wid in result.stdout.strip().split('\n') if wid]
+    except StageTimeout:
+        raise
     except Exception:
         pass
     return []
@@ -35,12 +161,14 @@ def find_window_by_name(name: str) -> list:
 def find_window_by_class(class_name: str) -> list:
     """Find window IDs by class."""
     try:
-        result = subprocess.run(
+        result = run_command(
             ['xdotool', 'search', '--class', class_name],
             capture_output=True, text=True
         )
         if result.returncode == 0 and result.stdout.strip():
             return [int(wid) for wid in result.stdout.strip().split('\n') if wid]
+    except StageTimeout:
+        raise
     except Exception:
         pass
     return []
@@ -49,7 +177,7 @@ def find_window_by_class(class_name: str) -> list:
 def get_window_geometry(window_id: int) -> dict:
     """Get window position and size."""
     try:
-        result = subprocess.run(
+        result = run_command(
             ['xdotool', 'getwindowgeometry', '--shell', str(window_id)],
             capture_output=True, text=True
         )
@@ -60,6 +188,8 @@ def get_window_geometry(window_id: int) -> dict:
                     key, val = line.split('=', 1)
                     geo[key] = int(val) if val.isdigit() else val
             return geo
+    except StageTimeout:
+        raise
     except Exception:
         pass
     return {}
@@ -69,7 +199,7 @@ def list_windows() -> list:
     """List all windows with IDs, names, and geometry."""
     windows = []
     try:
-        result = subprocess.run(
+        result = run_command(
             ['xdotool', 'search', '--onlyvisible', '--name', ''],
             capture_output=True, text=True
         )
@@ -78,7 +208,7 @@ def list_windows() -> list:
                 if not wid:
                     continue
                 wid = int(wid)
-                name_result = subprocess.run(
+                name_result = run_command(
                     ['xdotool', 'getwindowname', str(wid)],
                     capture_output=True, text=True
                 )
@@ -92,18 +222,32 @@ def list_windows() -> list:
                     "width": geo.get("WIDTH", 0),
                     "height": geo.get("HEIGHT", 0)
                 })
+    except StageTimeout:
+        raise
     except Exception:
         pass
     return windows
 
 
 def take_screenshot(name="screen") -> Path:
-    """Take a full screenshot using ImageMagick import (works better with Chrome on Xvfb)."""
+    """
+    Take a full screenshot using ImageMagick import (works better with Chrome on Xvfb).
+
+    If the capture service (zoomclick --capture-service) is running, its latest
+    frame is written out instead of capturing.
+    """
     timestamp = int(time.time())
     path = WORK_DIR / f"{name}_{timestamp}.png"
+
+    from framebuffer import shared_frame
+    shared = shared_frame()
+    if shared is not None:
+        import cv2
+        cv2.imwrite(str(path), shared[0], [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        return path
     
     display = os.environ.get('DISPLAY', ':99')
-    result = subprocess.run(
+    result = run_command(
         ['import', '-window', 'root', str(path)],
         env={**os.environ, 'DISPLAY': display},
         capture_output=True
@@ -121,7 +265,7 @@ def take_screenshot_window(window_id: int, name="window") -> Path:
     path = WORK_DIR / f"{name}_{timestamp}.png"
     
     display = os.environ.get('DISPLAY', ':99')
-    result = subprocess.run(
+    result = run_command(
         ['import', '-window', str(window_id), str(path)],
         env={**os.environ, 'DISPLAY': display},
         capture_output=True
@@ -133,15 +277,10 @@ def take_screenshot_window(window_id: int, name="window") -> Path:
     return path
 
 
-def take_screenshot_screen(screen_num: int, name="screen") -> Path:
-    """Take screenshot of a specific screen (multi-monitor)."""
+def list_screens() -> list:
+    """Connected monitors from xrandr as dicts of width, height, x, y (screen-absolute)."""
     import re
-    timestamp = int(time.time())
-    path = WORK_DIR / f"{name}_{timestamp}.png"
-    
-    display = os.environ.get('DISPLAY', ':99')
-    
-    result = subprocess.run(['xrandr'], capture_output=True, text=True)
+    result = run_command(['xrandr'], capture_output=True, text=True)
     screens = []
     for line in result.stdout.split('\n'):
         if ' connected' in line:
@@ -153,15 +292,25 @@ def take_screenshot_screen(screen_num: int, name="screen") -> Path:
                     'x': int(match.group(3)),
                     'y': int(match.group(4))
                 })
+    return screens
+
+
+def take_screenshot_screen(screen_num: int, name="screen") -> Path:
+    """Take screenshot of a specific screen (multi-monitor)."""
+    timestamp = int(time.time())
+    path = WORK_DIR / f"{name}_{timestamp}.png"
+    
+    display = os.environ.get('DISPLAY', ':99')
+    screens = list_screens()
     
     if screen_num >= len(screens):
         raise RuntimeError(f"Screen {screen_num} not found. Available: 0-{len(screens)-1}")
     
     s = screens[screen_num]
     full_path = WORK_DIR / f"full_{timestamp}.png"
-    subprocess.run(['scrot', str(full_path)], env={**os.environ, 'DISPLAY': display}, check=True)
+    run_command(['scrot', str(full_path)], env={**os.environ, 'DISPLAY': display}, check=True)
     
-    subprocess.run([
+    run_command([
         'convert', str(full_path),
         '-crop', f"{s['width']}x{s['height']}+{s['x']}+{s['y']}",
         '+repage', str(path)
@@ -171,9 +320,65 @@ def take_screenshot_screen(screen_num: int, name="screen") -> Path:
     return path
 
 
+def grab_screen():
+    """
+    Capture the whole root window into memory (BGR numpy array).
+
+    Streams uncompressed PPM from ImageMagick import, so there is no PNG
+    encode/decode; used by the capture service.
+    """
+    import cv2
+    import numpy as np
+
+    display = os.environ.get('DISPLAY', ':99')
+    result = run_command(
+        ['import', '-window', 'root', '-depth', '8', 'ppm:-'],
+        env={**os.environ, 'DISPLAY': display},
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Screenshot failed: {result.stderr.decode()}")
+
+    image = cv2.imdecode(np.frombuffer(result.stdout, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise RuntimeError("Screenshot failed: could not decode image")
+    return image
+
+
+def grab_region(x: int, y: int, width: int, height: int, newer_than_ns: int = None):
+    """
+    Capture a screen-absolute rectangle straight into memory (BGR numpy array).
+
+    Uses ImageMagick import with a crop and streams PNG over stdout, so no
+    full-screen file is written. With the capture service running, the region
+    is sliced from its latest frame (captured at or after newer_than_ns).
+    """
+    import cv2
+    import numpy as np
+
+    from framebuffer import shared_frame
+    shared = shared_frame(newer_than_ns, region=(x, y, width, height))
+    if shared is not None:
+        return shared[0]
+
+    display = os.environ.get('DISPLAY', ':99')
+    result = run_command(
+        ['import', '-window', 'root', '-crop', f'{width}x{height}+{x}+{y}', '+repage', 'png:-'],
+        env={**os.environ, 'DISPLAY': display},
+        capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Region screenshot failed: {result.stderr.decode()}")
+
+    image = cv2.imdecode(np.frombuffer(result.stdout, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise RuntimeError("Region screenshot failed: could not decode image")
+    return image
+
+
 def crop_image(src_path: Path, x: int, y: int, width: int, height: int, dst_path: Path):
     """Crop image using ImageMagick convert."""
-    subprocess.run([
+    run_command([
         'convert', str(src_path),
         '-crop', f'{width}x{height}+{x}+{y}',
         '+repage',
@@ -199,7 +404,7 @@ def add_quadrant_overlay(src_path: Path, dst_path: Path, width: int, height: int
     quarter_x = width // 4
     quarter_y = height // 4
     
-    subprocess.run([
+    run_command([
         'convert', str(src_path),
         # Vertical lines at 1/3 and 2/3 (red)
         '-stroke', 'rgba(255,0,0,0.4)', '-strokewidth', '1',
@@ -216,7 +421,256 @@ def add_quadrant_overlay(src_path: Path, dst_path: Path, width: int, height: int
     ], check=True, capture_output=True)
 
 
+def grid_column_label(col: int) -> str:
+    """Column index to letter label (0 -> A, 25 -> Z)."""
+    return chr(ord('A') + col)
+
+
+def add_grid_overlay(src_path: Path, dst_path: Path, width: int, height: int, cols: int, rows: int):
+    """
+    Add a labeled cols x rows addressing grid to image for AI visualization.
+
+    Shows:
+    - Red cell lines with a label (A1, B1, ... ) in each cell's top-left corner
+    - Faint sub-cell lines splitting each cell 3x3 (numbered 1-9 like a keypad)
+      when cells are large enough to read
+
+    Note: Overlays are ONLY added to the output image for navigation.
+    They never appear on the actual screen or in saved templates.
+    """
+    cell_w = width / cols
+    cell_h = height / rows
+    pointsize = max(8, min(18, int(min(cell_w, cell_h) / 4)))
+
+    draw = ['-stroke', 'rgba(0,128,255,0.3)', '-strokewidth', '1']
+    if cell_w >= 90 and cell_h >= 60:
+        for c in range(cols * 3):
+            if c % 3:
+                x = int(c * cell_w / 3)
+                draw += ['-draw', f'line {x},0 {x},{height}']
+        for r in range(rows * 3):
+            if r % 3:
+                y = int(r * cell_h / 3)
+                draw += ['-draw', f'line 0,{y} {width},{y}']
+
+    draw += ['-stroke', 'rgba(255,0,0,0.6)', '-strokewidth', '1']
+    for c in range(1, cols):
+        x = int(c * cell_w)
+        draw += ['-draw', f'line {x},0 {x},{height}']
+    for r in range(1, rows):
+        y = int(r * cell_h)
+        draw += ['-draw', f'line 0,{y} {width},{y}']
+
+    draw += ['-stroke', 'none', '-fill', 'rgba(255,0,0,0.9)', '-undercolor', 'rgba(255,255,255,0.7)',
+             '-pointsize', str(pointsize)]
+    for r in range(rows):
+        for c in range(cols):
+            label = f"{grid_column_label(c)}{r + 1}"
+            draw += ['-annotate', f'+{int(c * cell_w) + 2}+{int(r * cell_h) + pointsize}', label]
+
+    run_command(['convert', str(src_path)] + draw + [str(dst_path)], check=True, capture_output=True)
+
+
+IMAGE_FORMATS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+
+def encode_for_model(src_path: Path, max_edge: int = 0, image_format: str = "png",
+                     quality: int = 85, max_bytes: int = 0) -> Tuple[Path, dict]:
+    """
+    Downscale and re-encode an output image for vision-model consumption.
+
+    - max_edge: cap on the longer side in pixels (0 = keep full resolution)
+    - image_format: png, jpeg or webp (quality applies to jpeg/webp)
+    - max_bytes: byte budget; quality is lowered first, then the image shrinks
+
+    Returns (path, info) where info has the scale factor from source pixels to
+    image pixels, so image coordinates map back as: source = image / scale.
+    With the defaults (or without OpenCV) the source image is returned as-is.
+    """
+    src_path = Path(src_path)
+    info = {"format": "png", "scale": 1.0}
+    if not max_edge and image_format == "png" and not max_bytes:
+        return src_path, info
+    try:
+        import cv2
+    except ImportError:
+        return src_path, info
+
+    img = cv2.imread(str(src_path))
+    if img is None:
+        return src_path, info
+    src_h, src_w = img.shape[:2]
+    long_edge = max(src_w, src_h)
+    scale = min(1.0, max_edge / long_edge) if max_edge else 1.0
+    ext = IMAGE_FORMATS[image_format]
+
+    while True:
+        width = max(1, round(src_w * scale))
+        height = max(1, round(src_h * scale))
+        resized = img if (width, height) == (src_w, src_h) else cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+        params = []
+        if image_format == "jpeg":
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        elif image_format == "webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+        ok, data = cv2.imencode(ext, resized, params)
+        if not ok:
+            raise RuntimeError(f"Could not encode {src_path} as {image_format}")
+        if not max_bytes or len(data) <= max_bytes or max(width, height) <= 64:
+            break
+        if image_format != "png" and quality > 40:
+            quality -= 15
+        else:
+            scale *= 0.8
+
+    dst_path = src_path.with_name(f"{src_path.stem}_model{ext}")
+    dst_path.write_bytes(data.tobytes())
+    info = {
+        "format": image_format,
+        "scale": round(width / src_w, 6),
+        "width": width,
+        "height": height,
+        "source_width": src_w,
+        "source_height": src_h,
+        "bytes": len(data),
+    }
+    if image_format != "png":
+        info["quality"] = quality
+    return dst_path, info
+
+
+FRAMES_DIR = WORK_DIR / "frames"
+FRAMES_KEEP = 20           # Retained frames available to --since
+DIFF_THRESHOLD = 16        # Per-pixel channel difference that counts as changed
+NO_CHANGE_RATIO = 0.0005   # Below this changed-pixel ratio the frame is "unchanged"
+MAX_CHANGED_REGIONS = 8
+
+
+def retain_frame(path: Path) -> str:
+    """
+    Keep a raw capture so a later --since can diff against it.
+
+    Returns the artifact ID. Only the newest FRAMES_KEEP frames are kept.
+    """
+    import shutil
+    FRAMES_DIR.mkdir(exist_ok=True)
+    artifact_id = f"f{time.time_ns() // 1_000_000:x}"
+    shutil.copyfile(path, FRAMES_DIR / f"{artifact_id}.png")
+    frames = sorted(FRAMES_DIR.glob("f*.png"))
+    for old in frames[:-FRAMES_KEEP]:
+        old.unlink()
+    return artifact_id
+
+
+def diff_frames(artifact_id: str, new_path: Path, name: str = "delta") -> dict:
+    """
+    Diff a new capture against a retained frame and crop only what changed.
+
+    Returns a dict with change_ratio, no_visible_change, and regions (each a
+    bbox in image coordinates plus a cropped image path). full_frame is set
+    when too much changed for crops to be worth it.
+    """
+    import cv2
+
+    old_path = FRAMES_DIR / f"{artifact_id}.png"
+    if not old_path.exists():
+        raise ValueError(f"Unknown or expired artifact: {artifact_id} (only the last {FRAMES_KEEP} are kept)")
+    old = cv2.imread(str(old_path))
+    new = cv2.imread(str(new_path))
+    if old is None or new is None:
+        raise ValueError(f"Could not read frames for artifact {artifact_id}")
+    if old.shape != new.shape:
+        return {"since": artifact_id, "full_frame": True, "reason": "frame size changed"}
+
+    changed = cv2.absdiff(old, new).max(axis=2) > DIFF_THRESHOLD
+    ratio = float(changed.mean())
+    if ratio < NO_CHANGE_RATIO:
+        return {
+            "since": artifact_id,
+            "change_ratio": round(ratio, 5),
+            "no_visible_change": True,
+            "regions": [],
+            "message": "No visible change"
+        }
+
+    # Merge nearby changed pixels into regions
+    mask = cv2.dilate(changed.astype("uint8"), cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = sorted((tuple(int(v) for v in s[:4]) for s in stats[1:count]), key=lambda b: b[2] * b[3], reverse=True)
+    if ratio > 0.5 or len(boxes) > MAX_CHANGED_REGIONS:
+        return {"since": artifact_id, "change_ratio": round(ratio, 5), "full_frame": True,
+                "reason": "large change"}
+
+    height, width = new.shape[:2]
+    regions = []
+    stamp = time.time_ns() // 1_000_000
+    for i, (x, y, w, h) in enumerate(boxes):
+        x0, y0 = max(0, x - 4), max(0, y - 4)
+        x1, y1 = min(width, x + w + 4), min(height, y + h + 4)
+        crop_path = WORK_DIR / f"{name}_{stamp}_{i}.png"
+        cv2.imwrite(str(crop_path), new[y0:y1, x0:x1])
+        regions.append({"box": [x0, y0, x1 - x0, y1 - y0], "image": str(crop_path)})
+
+    return {
+        "since": artifact_id,
+        "change_ratio": round(ratio, 5),
+        "no_visible_change": False,
+        "regions": regions
+    }
+
+
 def get_screen_size():
     """Get screen dimensions using pyautogui."""
     import pyautogui
     return pyautogui.size()
+
+
+def image_hashes(path: Path) -> dict:
+    """
+    Hash an image for template deduplication.
+
+    Returns:
+    - content_hash: sha256 of the decoded pixels (identical crops hash equal
+      even if the PNG encoder produced different bytes)
+    - phash: 64-bit DCT perceptual hash as hex, for near-duplicate detection
+
+    Falls back to hashing the file bytes (and no phash) without OpenCV.
+    """
+    import hashlib
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        return {"content_hash": hashlib.sha256(Path(path).read_bytes()).hexdigest(), "phash": None}
+
+    img = cv2.imread(str(path))
+    if img is None:
+        return {"content_hash": hashlib.sha256(Path(path).read_bytes()).hexdigest(), "phash": None}
+
+    digest = hashlib.sha256()
+    digest.update(str(img.shape).encode())
+    digest.update(img.tobytes())
+
+    return {"content_hash": digest.hexdigest(), "phash": perceptual_hash(img)}
+
+
+def perceptual_hash(img) -> str:
+    """64-bit DCT perceptual hash of a BGR image (numpy array) as hex."""
+    import cv2
+    import numpy as np
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # skip the DC term when picking the median
+    phash = 0
+    for bit in bits:
+        phash = (phash << 1) | int(bit)
+    return f"{phash:016x}"
+
+
+def phash_distance(a: str, b: str) -> int:
+    """Hamming distance between two hex perceptual hashes (64 if either is missing)."""
+    if not a or not b:
+        return 64
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
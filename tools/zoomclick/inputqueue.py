@@ -0,0 +1,216 @@
+"""
+Cross-process input scheduler for zoomclick and vclick.
+
+Agents sharing one X display must not interleave pointer/keyboard actions:
+a moveTo from one agent between another's moveTo and click sends the click
+to the wrong place. Every action sequence (move + click, click + type, ...)
+therefore runs as one job holding a per-display input lock. Capture and
+matching never take the lock, so they still run in parallel.
+
+Ordering, per display, in INPUT_DIR/<display>/:
+
+- Waiters drop a ticket file "<pid>_<enqueued_ns>.json" holding their priority
+- The head of the queue (highest priority, then oldest) takes the flock on
+  "lock"; others poll. Waiting AGING_MS counts as one priority level, so low
+  priority jobs cannot starve
+- Tickets of dead processes are dropped; a dead holder's flock is released
+  by the kernel
+- A job starts no further actions once it has held the lock for max_hold_ms.
+  The cap is checked between actions: one action that runs long (or a hung
+  pyautogui call) is not interrupted, so callers split long input (typing)
+  into several actions
+
+Per-job metrics (queue wait, execution time) are returned to the caller and
+totals are kept in "stats.json" (see input_status), with the end time of the
+last job so background work can wait for the display to go idle
+(display_idle).
+"""
+
+import fcntl
+import json
+import os
+import time
+from pathlib import Path
+
+from helpers import WORK_DIR, DEADLINE, StageTimeout, call_timeout_s
+
+INPUT_DIR = WORK_DIR / "input"  # Shared with vclick (same layout)
+MAX_HOLD_MS = 10000  # After this long holding the display a job starts no further actions
+AGING_MS = 1000      # Queue wait that counts as one priority level
+POLL_S = 0.005
+
+# Set from the command line (--priority, --max-hold)
+INPUT_POLICY = {"priority": 0, "max_hold_ms": MAX_HOLD_MS}
+
+
+def set_input_policy(priority: int = None, max_hold_ms: int = None):
+    if priority is not None:
+        INPUT_POLICY["priority"] = priority
+    if max_hold_ms is not None:
+        INPUT_POLICY["max_hold_ms"] = max_hold_ms
+
+
+def queue_dir(display: str = None) -> Path:
+    display = display or os.environ.get("DISPLAY", ":99")
+    path = INPUT_DIR / "".join(ch if ch.isalnum() else "_" for ch in display)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def live_tickets(qdir: Path) -> list:
+    """Waiting tickets as (pid, enqueued_ns, priority, path); tickets of dead processes are removed."""
+    tickets = []
+    for path in qdir.glob("*_*.json"):
+        try:
+            pid, enqueued_ns = (int(part) for part in path.stem.split("_"))
+            priority = json.loads(path.read_text())["priority"]
+        except (ValueError, KeyError, OSError):
+            continue  # Being written or already gone
+        if not pid_alive(pid):
+            path.unlink(missing_ok=True)
+            continue
+        tickets.append((pid, enqueued_ns, priority, path))
+    return tickets
+
+
+def queue_order(ticket: tuple, now_ns: int) -> tuple:
+    """Sort key: effective priority (aged by waiting time) first, then FIFO."""
+    _, enqueued_ns, priority, _ = ticket
+    aged = priority + (now_ns - enqueued_ns) // (AGING_MS * 1_000_000)
+    return -aged, enqueued_ns
+
+
+def read_json(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def run_input(actions: list, priority: int = None, max_hold_ms: int = None) -> dict:
+    """
+    Run a sequence of input actions (callables) as one job with the display's input lock.
+
+    Waits in the display queue, bounded by the current stage's time budget
+    (StageTimeout otherwise). Raises RuntimeError if the job exceeds
+    max_hold_ms; checked between actions, so the remaining actions are
+    skipped but the one running is not interrupted. Returns per-job metrics:
+    queue_wait_ms, exec_ms, ahead (jobs queued in front on arrival), priority.
+    """
+    priority = INPUT_POLICY["priority"] if priority is None else priority
+    max_hold_ms = INPUT_POLICY["max_hold_ms"] if max_hold_ms is None else max_hold_ms
+    qdir = queue_dir()
+    lock_path, holder_path = qdir / "lock", qdir / "holder.json"
+
+    enqueued = time.monotonic()
+    enqueued_ns = time.time_ns()
+    ticket = qdir / f"{os.getpid()}_{enqueued_ns}.json"
+    staged = ticket.with_suffix(".tmp")
+    staged.write_text(json.dumps({"priority": priority}))
+    staged.rename(ticket)
+
+    lock = open(lock_path, "a+")
+    ahead = None
+    try:
+        wait_end = enqueued + call_timeout_s()
+        while True:
+            tickets = live_tickets(qdir)
+            now_ns = time.time_ns()
+            tickets.sort(key=lambda t: queue_order(t, now_ns))
+            position = next((i for i, t in enumerate(tickets) if t[3] == ticket), 0)
+            if ahead is None:
+                ahead = position
+            if position == 0:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    pass
+            if time.monotonic() >= wait_end:
+                holder = read_json(holder_path)
+                held_by = f"input lock held by pid {holder['pid']}" if holder.get("pid") else "input queue"
+                raise StageTimeout(DEADLINE["stage"], (wait_end - enqueued) * 1000,
+                                   (time.monotonic() - enqueued) * 1000, held_by)
+            time.sleep(POLL_S)
+    finally:
+        ticket.unlink(missing_ok=True)
+
+    try:
+        acquired = time.monotonic()
+        holder_path.write_text(json.dumps({"pid": os.getpid(), "since_ns": time.time_ns(), "priority": priority}))
+        done = 0
+        for action in actions:
+            if (time.monotonic() - acquired) * 1000 > max_hold_ms:
+                break
+            DEADLINE["input_sent"] = True  # Deadline overruns from here on must not ask for a retry
+            action()
+            done += 1
+        released = time.monotonic()
+        metrics = {
+            "queue_wait_ms": round((acquired - enqueued) * 1000, 1),
+            "exec_ms": round((released - acquired) * 1000, 1),
+            "ahead": ahead,
+            "priority": priority,
+        }
+
+        stats_path = qdir / "stats.json"
+        stats = read_json(stats_path)
+        stats["jobs"] = stats.get("jobs", 0) + 1
+        stats["aborted"] = stats.get("aborted", 0) + (done < len(actions))
+        for key in ("queue_wait_ms", "exec_ms"):
+            stats[f"{key}_total"] = round(stats.get(f"{key}_total", 0) + metrics[key], 1)
+            stats[f"{key}_max"] = max(stats.get(f"{key}_max", 0), metrics[key])
+        stats["last_ns"] = time.time_ns()
+        stats_path.write_text(json.dumps(stats))
+    finally:
+        holder_path.unlink(missing_ok=True)
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+
+    if done < len(actions):
+        raise RuntimeError(f"Input job held the display past {max_hold_ms} ms; "
+                           f"{len(actions) - done} of {len(actions)} actions not run")
+    return metrics
+
+
+def display_idle(idle_ms: int, display: str = None) -> bool:
+    """True when nobody holds or waits for the input lock and the last job ended idle_ms ago or more."""
+    qdir = queue_dir(display)
+    holder = read_json(qdir / "holder.json")
+    if holder and pid_alive(holder.get("pid", 0)):
+        return False
+    if live_tickets(qdir):
+        return False
+    last_ns = read_json(qdir / "stats.json").get("last_ns", 0)
+    return time.time_ns() - last_ns >= idle_ms * 1_000_000
+
+
+def input_status(display: str = None) -> dict:
+    """Queue length, current holder and job totals for a display."""
+    qdir = queue_dir(display)
+    stats = read_json(qdir / "stats.json")
+    holder = read_json(qdir / "holder.json")
+    if holder and not pid_alive(holder.get("pid", 0)):
+        holder = {}
+    jobs = stats.get("jobs", 0)
+    return {
+        "queued": len(live_tickets(qdir)),
+        "holder": {"pid": holder["pid"], "held_ms": round((time.time_ns() - holder["since_ns"]) / 1e6, 1),
+                   "priority": holder.get("priority")} if holder else None,
+        "jobs": jobs,
+        "aborted": stats.get("aborted", 0),
+        "queue_wait_ms_avg": round(stats.get("queue_wait_ms_total", 0) / jobs, 1) if jobs else None,
+        "queue_wait_ms_max": stats.get("queue_wait_ms_max"),
+        "exec_ms_avg": round(stats.get("exec_ms_total", 0) / jobs, 1) if jobs else None,
+        "exec_ms_max": stats.get("exec_ms_max"),
+    }
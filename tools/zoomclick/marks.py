@@ -0,0 +1,141 @@
+"""
+Set-of-marks element detection for zoomclick.
+
+Finds likely interactive elements (buttons, icons, text fields, links) in a
+single pass over a captured frame using edges and connected components, then
+numbers them so the AI can click one directly instead of zooming.
+
+Marks are cached in MARKS_FILE together with a hash of the frame they came
+from, so repeated --marks calls on an unchanged screen skip detection.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from helpers import WORK_DIR
+
+MARKS_FILE = WORK_DIR / "marks.json"
+
+MIN_SIDE = 8          # Smallest element side in pixels
+MAX_FRACTION = 0.5    # Largest element side as a fraction of the viewport
+MAX_MARKS = 200
+
+
+def frame_hash(image) -> str:
+    """Fast content hash of a decoded frame (numpy array)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(image.shape).encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def detect_marks(image) -> list:
+    """
+    Detect candidate interactive elements in a BGR image.
+
+    Returns a list of boxes (x, y, width, height) relative to the image,
+    sorted in reading order (top-to-bottom, left-to-right).
+    """
+    import cv2
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 50, 150)
+    # Merge letters into words and icon strokes into one blob
+    merged = cv2.dilate(edges, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 5)))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(merged, connectivity=8)
+
+    img_h, img_w = gray.shape
+    max_w = img_w * MAX_FRACTION
+    max_h = img_h * MAX_FRACTION
+    boxes = []
+    for x, y, w, h, area in stats[1:count]:
+        if w < MIN_SIDE or h < MIN_SIDE or w > max_w or h > max_h:
+            continue
+        if area < 0.15 * w * h:
+            continue  # Sparse outlines (large frames, separators)
+        boxes.append((int(x), int(y), int(w), int(h)))
+
+    # Drop boxes nested inside another box that is not much bigger (label inside its button)
+    boxes.sort(key=lambda b: b[2] * b[3], reverse=True)
+    kept = []
+    for box in boxes:
+        x, y, w, h = box
+        nested = any(
+            kx <= x and ky <= y and x + w <= kx + kw and y + h <= ky + kh and kw * kh <= 4 * w * h
+            for kx, ky, kw, kh in kept
+        )
+        if not nested:
+            kept.append(box)
+
+    kept.sort(key=lambda b: (b[1] // 10, b[0]))
+    return kept[:MAX_MARKS]
+
+
+def draw_marks(image, marks: list, dst_path: Path):
+    """
+    Draw numbered boxes onto a copy of the image for AI visualization.
+
+    Note: Like the quadrant overlay, marks are only drawn on the output image.
+    """
+    import cv2
+
+    canvas = image.copy()
+    for mark in marks:
+        x, y, w, h = mark["box"]
+        cv2.rectangle(canvas, (x, y), (x + w, y + h), (0, 0, 255), 1)
+        label = str(mark["id"])
+        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.4, 1)
+        ly = max(y, th + 2)
+        cv2.rectangle(canvas, (x, ly - th - 2), (x + tw + 2, ly), (0, 0, 255), -1)
+        cv2.putText(canvas, label, (x + 1, ly - 1), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+    cv2.imwrite(str(dst_path), canvas)
+
+
+def load_marks() -> dict:
+    """Load the cached marks (empty dict if none)."""
+    if MARKS_FILE.exists():
+        with open(MARKS_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def find_marks(image, offset_x: int = 0, offset_y: int = 0) -> dict:
+    """
+    Detect marks in an image whose top-left sits at (offset_x, offset_y) on screen.
+
+    Reuses the cached detection when the frame is unchanged. Returns the cache
+    record: frame_hash, created, cached flag, detect_ms and marks (each with
+    id, box relative to the image and screen-absolute center).
+    """
+    digest = frame_hash(image)
+    cached = load_marks()
+    if cached.get("frame_hash") == digest and cached.get("offset") == [offset_x, offset_y]:
+        cached["cached"] = True
+        return cached
+
+    start = time.perf_counter()
+    boxes = detect_marks(image)
+    detect_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    marks = [
+        {
+            "id": i + 1,
+            "box": list(box),
+            "screen_x": offset_x + box[0] + box[2] // 2,
+            "screen_y": offset_y + box[1] + box[3] // 2,
+        }
+        for i, box in enumerate(boxes)
+    ]
+    record = {
+        "frame_hash": digest,
+        "offset": [offset_x, offset_y],
+        "created": time.time(),
+        "detect_ms": detect_ms,
+        "marks": marks,
+    }
+    with open(MARKS_FILE, 'w') as f:
+        json.dump(record, f)
+    record["cached"] = False
+    return record
@@ -0,0 +1,118 @@
+"""
+Template match memoization for zoomclick.
+
+Results are keyed by (template content hash, match mode, ROI) and validated
+against per-tile hashes of the captured frame:
+
+- No tile changed            → the cached result is reused as-is
+- Only tiles away from the hit changed → only those dirty tiles are re-matched
+- Tiles under/around the hit changed   → full re-match
+
+The cache is a bounded LRU persisted in MATCH_CACHE_FILE, so a --no-click
+probe followed by the real click only pays for matching once.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from helpers import WORK_DIR
+
+MATCH_CACHE_FILE = WORK_DIR / "match_cache.json"
+MATCH_CACHE_MAX = 64   # Entries kept before least-recently-used eviction
+TILE = 128             # Tile size in pixels for change detection
+
+
+def tile_hashes(frame) -> list:
+    """Per-tile content hashes of a frame as a row-major list of lists."""
+    height, width = frame.shape[:2]
+    return [
+        [
+            hashlib.blake2b(frame[y:y + TILE, x:x + TILE].tobytes(), digest_size=8).hexdigest()
+            for x in range(0, width, TILE)
+        ]
+        for y in range(0, height, TILE)
+    ]
+
+
+class MatchCache:
+    """Bounded LRU of template match results validated by frame tile hashes."""
+
+    def __init__(self, path: Path = MATCH_CACHE_FILE):
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path.exists():
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                self.entries = OrderedDict(data.get("entries", {}))
+                self.hits = data.get("hits", 0)
+                self.misses = data.get("misses", 0)
+            except ValueError:
+                pass
+
+    @staticmethod
+    def key(template_hash: str, mode: str, roi: str) -> str:
+        return f"{template_hash}|{mode}|{roi}"
+
+    def lookup(self, key: str, shape: tuple, tiles: list) -> tuple:
+        """
+        Validate a cached entry against the current frame's tiles.
+
+        Returns (status, match, dirty) where status is "hit", "partial" or
+        "miss"; match is the cached [x, y, confidence] (or None if the template
+        was not found); dirty is the list of changed (row, col) tiles.
+        """
+        entry = self.entries.get(key)
+        if not entry or entry["shape"] != list(shape[:2]):
+            return "miss", None, []
+        self.entries.move_to_end(key)
+
+        old = entry["tiles"]
+        dirty = [
+            (r, c)
+            for r, row in enumerate(tiles)
+            for c, digest in enumerate(row)
+            if old[r][c] != digest
+        ]
+        if not dirty:
+            return "hit", entry["match"], []
+
+        match = entry["match"]
+        if match is None:
+            # A template that was nowhere can only have appeared in changed tiles
+            return "partial", None, dirty
+        tw, th = entry["template_size"]
+        left, top = match[0] - tw // 2, match[1] - th // 2
+        # Tiles under the hit plus a one-tile ring around it
+        r0, r1 = max(0, top // TILE - 1), (top + th) // TILE + 1
+        c0, c1 = max(0, left // TILE - 1), (left + tw) // TILE + 1
+        if any(r0 <= r <= r1 and c0 <= c <= c1 for r, c in dirty):
+            return "miss", None, dirty
+        return "partial", match, dirty
+
+    def store(self, key: str, shape: tuple, tiles: list, match, template_size: tuple):
+        self.entries[key] = {
+            "shape": list(shape[:2]),
+            "tiles": tiles,
+            "match": list(match) if match else None,
+            "template_size": list(template_size),
+        }
+        self.entries.move_to_end(key)
+        while len(self.entries) > MATCH_CACHE_MAX:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        """Replace the cache file atomically (several zoomclick processes share it)."""
+        staged = self.path.with_name(f"{self.path.name}.{os.getpid()}.{time.time_ns()}.tmp")
+        try:
+            with open(staged, 'w') as f:
+                json.dump({"entries": self.entries, "hits": self.hits, "misses": self.misses}, f)
+            staged.replace(self.path)
+        finally:
+            staged.unlink(missing_ok=True)  # Only left over if the write failed
@@ -0,0 +1,248 @@
+"""
+Incremental OCR for zoomclick --click-text.
+
+Uses the local Tesseract binary (sudo apt install tesseract-ocr) to find word
+boxes. The frame is split into overlapping tiles and OCR results are cached
+per tile, keyed by a hash of the tile's pixels, so between calls only tiles
+whose content changed are re-recognized.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers import WORK_DIR, run_command
+
+OCR_CACHE_FILE = WORK_DIR / "ocr_cache.json"
+OCR_CACHE_MAX = 2000       # Tile entries kept in the cache
+
+TILE_W, TILE_H = 800, 200  # Tile size in pixels (~21 tiles at 1080p)
+OVERLAP_X, OVERLAP_Y = 128, 48  # Words narrower than the overlap are never cut
+MIN_WORD_CONF = 30
+
+
+def tesseract_available() -> bool:
+    return shutil.which("tesseract") is not None
+
+
+def tile_grid(width: int, height: int) -> list:
+    """Overlapping tile rectangles (x, y, w, h) covering an image."""
+    def starts(size, tile, overlap):
+        if size <= tile:
+            return [0]
+        step = tile - overlap
+        points = list(range(0, size - tile, step))
+        return points + [size - tile]
+    return [
+        (x, y, min(TILE_W, width), min(TILE_H, height))
+        for y in starts(height, TILE_H, OVERLAP_Y)
+        for x in starts(width, TILE_W, OVERLAP_X)
+    ]
+
+
+def recognize_tile(tile) -> list:
+    """Run Tesseract on one tile. Returns words as [text, x, y, w, h, conf] relative to the tile."""
+    import cv2
+
+    ok, png = cv2.imencode(".png", tile)
+    if not ok:
+        return []
+    result = run_command(
+        ["tesseract", "stdin", "stdout", "--psm", "11", "tsv"],
+        input=png.tobytes(), capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Tesseract failed: {result.stderr.decode(errors='replace').strip()}")
+
+    words = []
+    for line in result.stdout.decode(errors="replace").splitlines()[1:]:
+        cols = line.split("\t")
+        if len(cols) < 12 or cols[0] != "5" or not cols[11].strip():
+            continue
+        conf = float(cols[10])
+        if conf < MIN_WORD_CONF:
+            continue
+        words.append([cols[11].strip(), int(cols[6]), int(cols[7]), int(cols[8]), int(cols[9]), round(conf, 1)])
+    return words
+
+
+def load_cache() -> dict:
+    if OCR_CACHE_FILE.exists():
+        try:
+            with open(OCR_CACHE_FILE) as f:
+                return json.load(f)
+        except ValueError:
+            pass
+    return {}
+
+
+def save_cache(cache: dict):
+    # Dicts keep insertion order; entries touched this call were moved to the end
+    while len(cache) > OCR_CACHE_MAX:
+        cache.pop(next(iter(cache)))
+    with open(OCR_CACHE_FILE, 'w') as f:
+        json.dump(cache, f)
+
+
+def ocr_words(image, offset_x: int = 0, offset_y: int = 0) -> tuple:
+    """
+    Recognize words in a BGR image whose top-left sits at (offset_x, offset_y) on screen.
+
+    Returns (words, stats). Each word is a dict with text, conf, box (relative
+    to the image) and screen-absolute center. stats reports tile counts,
+    cache hits and timing.
+    """
+    if not tesseract_available():
+        raise RuntimeError("Tesseract not found. Install: sudo apt install -y tesseract-ocr")
+
+    start = time.perf_counter()
+    height, width = image.shape[:2]
+    tiles = tile_grid(width, height)
+    cache = load_cache()
+
+    keys = []
+    pending = {}
+    for x, y, w, h in tiles:
+        tile = image[y:y + h, x:x + w]
+        key = hashlib.blake2b(tile.tobytes(), digest_size=16).hexdigest() + f":{w}x{h}"
+        keys.append(key)
+        if key in cache:
+            cache[key] = cache.pop(key)
+        elif key not in pending:
+            pending[key] = tile
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 2) as pool:
+            for key, words in zip(pending, pool.map(recognize_tile, pending.values())):
+                cache[key] = words
+        save_cache(cache)
+
+    whole, fragments = [], []
+    for (tx, ty, tw, th), key in zip(tiles, keys):
+        for text, x, y, w, h, conf in cache[key]:
+            # Words touching an interior tile edge may be cut by it
+            cut = (x <= 1 and tx > 0) or (y <= 1 and ty > 0) or \
+                (x + w >= tw - 1 and tx + tw < width) or (y + h >= th - 1 and ty + th < height)
+            (fragments if cut else whole).append((text, [tx + x, ty + y, w, h], conf))
+    # A cut word is normally seen whole by the neighbouring tile; only words
+    # wider/taller than the overlap are not, and their fragments are merged
+    fragments = [f for f in fragments if not any(overlaps(f[1], other[1]) for other in whole)]
+
+    words = []
+    for text, box, conf in whole + merge_fragments(fragments):
+        if any(text == other["text"] and overlaps(box, other["box"]) for other in words):
+            continue  # Same word seen by two overlapping tiles
+        words.append({
+            "text": text,
+            "conf": conf,
+            "box": box,
+            "screen_x": offset_x + box[0] + box[2] // 2,
+            "screen_y": offset_y + box[1] + box[3] // 2,
+        })
+
+    words.sort(key=lambda wd: (wd["box"][1] // 10, wd["box"][0]))
+    stats = {
+        "tiles": len(tiles),
+        "tiles_recognized": len(pending),
+        "tiles_cached": len(tiles) - len(pending),
+        "ocr_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    return words, stats
+
+
+def merge_fragments(fragments: list) -> list:
+    """
+    Join pieces of words cut by tile edges: (text, box, conf) fragments from
+    neighbouring tiles that share the overlap band become one word with the
+    union box. Side by side, the texts are joined where the left piece's end
+    repeats the right piece's start; otherwise the larger piece's text is kept.
+    """
+    merged = []
+    for text, box, conf in sorted(fragments, key=lambda f: (f[1][0], f[1][1])):
+        for i, (m_text, m_box, m_conf) in enumerate(merged):
+            ix = min(box[0] + box[2], m_box[0] + m_box[2]) - max(box[0], m_box[0])
+            iy = min(box[1] + box[3], m_box[1] + m_box[3]) - max(box[1], m_box[1])
+            if ix <= 0 or iy <= 0:
+                continue
+            overlap = next((k for k in range(min(len(m_text), len(text)), 0, -1)
+                            if m_text.endswith(text[:k])), 0)
+            if iy > 0.5 * min(box[3], m_box[3]) and box[0] > m_box[0] and overlap:
+                m_text = m_text + text[overlap:]
+            elif box[2] * box[3] > m_box[2] * m_box[3]:
+                m_text = text
+            x0, y0 = min(box[0], m_box[0]), min(box[1], m_box[1])
+            x1 = max(box[0] + box[2], m_box[0] + m_box[2])
+            y1 = max(box[1] + box[3], m_box[1] + m_box[3])
+            merged[i] = (m_text, [x0, y0, x1 - x0, y1 - y0], min(conf, m_conf))
+            break
+        else:
+            merged.append((text, list(box), conf))
+    return merged
+
+
+def overlaps(a: list, b: list) -> bool:
+    """True if two (x, y, w, h) boxes overlap by more than half the smaller one."""
+    ix = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    iy = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if ix <= 0 or iy <= 0:
+        return False
+    return ix * iy > 0.5 * min(a[2] * a[3], b[2] * b[3])
+
+
+def normalize(text: str) -> str:
+    return "".join(ch for ch in text.casefold() if ch.isalnum())
+
+
+def find_text(words: list, query: str) -> list:
+    """
+    Find a word or phrase among OCR words.
+
+    Multi-word queries match consecutive words on the same line. Returns
+    matches (text, box, screen center, conf, exact) with exact matches first,
+    then in reading order.
+    """
+    tokens = [normalize(t) for t in query.split() if normalize(t)]
+    if not tokens:
+        return []
+
+    matches = []
+    for first in words:
+        if tokens[0] not in normalize(first["text"]):
+            continue
+        chain = [first]
+        for token in tokens[1:]:
+            last = chain[-1]
+            lx, ly, lw, lh = last["box"]
+            nxt = next((
+                w for w in words
+                if w not in chain
+                and abs((w["box"][1] + w["box"][3] / 2) - (ly + lh / 2)) < lh / 2
+                and 0 <= w["box"][0] - (lx + lw) < 2 * lh
+            ), None)
+            if not nxt or token not in normalize(nxt["text"]):
+                break
+            chain.append(nxt)
+        if len(chain) != len(tokens):
+            continue
+
+        x0 = min(w["box"][0] for w in chain)
+        y0 = min(w["box"][1] for w in chain)
+        x1 = max(w["box"][0] + w["box"][2] for w in chain)
+        y1 = max(w["box"][1] + w["box"][3] for w in chain)
+        # Screen position of the image origin, recovered from the first word
+        origin_x = first["screen_x"] - (first["box"][0] + first["box"][2] // 2)
+        origin_y = first["screen_y"] - (first["box"][1] + first["box"][3] // 2)
+        matches.append({
+            "text": " ".join(w["text"] for w in chain),
+            "box": [x0, y0, x1 - x0, y1 - y0],
+            "screen_x": origin_x + (x0 + x1) // 2,
+            "screen_y": origin_y + (y0 + y1) // 2,
+            "conf": min(w["conf"] for w in chain),
+            "exact": [normalize(w["text"]) for w in chain] == tokens,
+        })
+
+    matches.sort(key=lambda m: not m["exact"])
+    return matches
@@ -0,0 +1,112 @@
+"""
+Template packs: saved templates moved between hosts as one archive.
+
+zoomclick --export-pack writes a zip with:
+
+- manifest.json: pack version and, per template, its metadata, content hash,
+  zoom chain levels and prefilter index entry (see scanindex.py), with every
+  file referenced by object key
+- objects/<key>.png: each file once, keyed by a digest of its bytes (an
+  image shared by several templates is stored once)
+
+zoomclick --import-pack adds the templates that are not present yet (same
+content hash) and verifies every object against its key, so a provisioned
+host clicks and scans without re-capturing or re-indexing anything. Names,
+hashes and levels from the manifest become file names, so a pack with one
+that could point outside the templates directory is rejected as a whole.
+"""
+
+import hashlib
+import json
+import re
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from helpers import TEMPLATES_DIR
+
+PACKS_DIR = TEMPLATES_DIR.parent / "packs"
+PACK_VERSION = 1
+
+# Metadata that only means something on the host that saved the template
+HOST_FIELDS = ("window_id", "health")
+
+
+def object_key(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def valid_name(name) -> bool:
+    """True for a template name that is a plain file name (no path separators or '..')."""
+    return (isinstance(name, str) and bool(name) and not Path(name).is_absolute()
+            and not any(part in name for part in ("/", "\\", "..", "\0")))
+
+
+def check_manifest(manifest: dict):
+    """Raise RuntimeError if an entry would be written outside the template directories."""
+    for item in manifest.get("templates", []):
+        name = item.get("name")
+        if not valid_name(name):
+            raise RuntimeError(f"Pack has an invalid template name: {name!r}")
+        if not re.fullmatch(r"[0-9a-f]+", str(item.get("content_hash", ""))):
+            raise RuntimeError(f"Pack has an invalid content hash for {name}")
+        for level in (item.get("meta") or {}).get("chain") or []:
+            if not isinstance(level.get("level"), int):
+                raise RuntimeError(f"Pack has an invalid zoom chain level for {name}")
+
+
+def pack_path(path: str) -> Path:
+    """A bare name means PACKS_DIR/<name>.zip."""
+    path = Path(path)
+    if path.parent == Path(".") and not path.suffix:
+        return PACKS_DIR / f"{path.name}.zip"
+    return path
+
+
+def write_pack(path: str, manifest: dict, objects: dict) -> dict:
+    """Write manifest and objects ({key: file path}) to a pack. Returns path and size."""
+    archive = pack_path(path)
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    staged = archive.with_suffix(".tmp")
+    with zipfile.ZipFile(staged, "w") as zf:
+        zf.writestr("manifest.json", json.dumps({"version": PACK_VERSION, "created": time.time(), **manifest},
+                                                indent=2), compress_type=zipfile.ZIP_DEFLATED)
+        for key, source in sorted(objects.items()):
+            zf.write(source, f"objects/{key}.png", compress_type=zipfile.ZIP_STORED)
+    staged.replace(archive)
+    return {"pack": str(archive), "bytes": archive.stat().st_size, "objects": len(objects)}
+
+
+class Pack:
+    """An open pack archive: manifest plus verified object reads."""
+
+    def __init__(self, zf: zipfile.ZipFile, manifest: dict):
+        self.zf = zf
+        self.manifest = manifest
+
+    def read(self, key: str) -> bytes:
+        data = self.zf.read(f"objects/{key}.png")
+        if object_key(data) != key:
+            raise RuntimeError(f"Pack object {key} is corrupt")
+        return data
+
+    def extract(self, key: str, dest: Path):
+        """Write an object to dest (through a temporary file, so readers never see a partial image)."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        staged = dest.with_suffix(".tmp")
+        staged.write_bytes(self.read(key))
+        staged.replace(dest)
+
+
+@contextmanager
+def open_pack(path: str):
+    archive = pack_path(path)
+    if not archive.exists():
+        raise RuntimeError(f"Pack not found: {archive}")
+    with zipfile.ZipFile(archive) as zf:
+        manifest = json.loads(zf.read("manifest.json"))
+        if manifest.get("version", 0) > PACK_VERSION:
+            raise RuntimeError(f"Pack version {manifest['version']} is newer than this zoomclick supports")
+        check_manifest(manifest)
+        yield Pack(zf, manifest)
@@ -0,0 +1,158 @@
+"""
+Session recording for offline replay of template matching.
+
+zoomclick --record-start opens a recording in RECORDING_DIR; while it is open,
+every template lookup (zoomclick --click, vclick --template) stores:
+
+- The captured frame, deduplicated by pixel hash (frames/<hash>.png)
+- The template and its zoom chain crops (templates/<hash>.png)
+- One line in events.jsonl: names, hashes, the location found, timings
+
+zoomclick --record-stop packs it into RECORDINGS_DIR/<name>.zip (PNGs are
+stored, the event log deflated). zoomclick --replay re-runs matching over an
+archive without a display and compares latencies and locations.
+"""
+
+import hashlib
+import json
+import shutil
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from helpers import WORK_DIR, TEMPLATES_DIR
+
+RECORDING_DIR = WORK_DIR / "recording"  # Open recording (vclick appends here too)
+RECORDINGS_DIR = TEMPLATES_DIR.parent / "recordings"
+RECORDING_VERSION = 1
+
+
+def recording_active() -> bool:
+    return (RECORDING_DIR / "session.json").exists()
+
+
+def pixel_hash(image) -> str:
+    """Hash of decoded pixels and shape: identical frames dedupe even if PNG bytes differ."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(image.shape).encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def start_recording(name: str = None) -> dict:
+    if recording_active():
+        session = json.loads((RECORDING_DIR / "session.json").read_text())
+        raise RuntimeError(f"Recording '{session['name']}' is already open. Stop it with: zoomclick --record-stop")
+    shutil.rmtree(RECORDING_DIR, ignore_errors=True)
+    (RECORDING_DIR / "frames").mkdir(parents=True)
+    (RECORDING_DIR / "templates").mkdir()
+    session = {"name": name or time.strftime("session_%Y%m%d_%H%M%S"), "version": RECORDING_VERSION,
+               "started": time.time()}
+    (RECORDING_DIR / "session.json").write_text(json.dumps(session))
+    return session
+
+
+def store_image(kind: str, image, source: Path = None) -> str:
+    """Store an image once under its pixel hash; copies source (already PNG) when given."""
+    import cv2
+
+    key = pixel_hash(image)
+    path = RECORDING_DIR / kind / f"{key}.png"
+    if not path.exists():
+        if source is not None and Path(source).suffix == ".png":
+            shutil.copyfile(source, path)
+        else:
+            cv2.imwrite(str(path), image)
+    return key
+
+
+def record_match(tool: str, name: str, frame, frame_path: Path, template, chain: list, roi: str,
+                 min_confidence: float, match, search: str, timing: dict):
+    """Append one template lookup to the open recording (no-op when none is open)."""
+    import cv2
+
+    if not recording_active():
+        return
+    event = {
+        "t": round(time.time(), 3),
+        "tool": tool,
+        "name": name,
+        "frame": store_image("frames", frame, frame_path),
+        "template": store_image("templates", template),
+        "chain": [],
+        "roi": roi,
+        "min_confidence": min_confidence,
+        "match": [int(match[0]), int(match[1]), round(float(match[2]), 4)] if match else None,
+        "search": search,
+        "timing": timing,
+    }
+    for level in chain or []:
+        crop = cv2.imread(level["path"])
+        if crop is None:
+            event["chain"] = []
+            break
+        event["chain"].append({**{k: v for k, v in level.items() if k != "path"},
+                               "crop": store_image("templates", crop)})
+    with open(RECORDING_DIR / "events.jsonl", "a") as f:
+        f.write(json.dumps(event) + "\n")
+
+
+def stop_recording() -> dict:
+    """Pack the open recording into RECORDINGS_DIR/<name>.zip and remove it."""
+    if not recording_active():
+        raise RuntimeError("No recording is open. Start one with: zoomclick --record-start NAME")
+    session = json.loads((RECORDING_DIR / "session.json").read_text())
+    events_path = RECORDING_DIR / "events.jsonl"
+    events = events_path.read_text().splitlines() if events_path.exists() else []
+    frames = sorted((RECORDING_DIR / "frames").glob("*.png"))
+    templates = sorted((RECORDING_DIR / "templates").glob("*.png"))
+    session.update(stopped=time.time(), events=len(events), frames=len(frames), templates=len(templates))
+
+    RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
+    archive = RECORDINGS_DIR / f"{session['name']}.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("session.json", json.dumps(session, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr("events.jsonl", "\n".join(events) + ("\n" if events else ""),
+                    compress_type=zipfile.ZIP_DEFLATED)
+        for path in frames + templates:
+            zf.write(path, f"{path.parent.name}/{path.name}", compress_type=zipfile.ZIP_STORED)
+    shutil.rmtree(RECORDING_DIR)
+    return {**session, "archive": str(archive), "bytes": archive.stat().st_size}
+
+
+@contextmanager
+def open_archive(path: Path):
+    """Extract a session archive to a temporary directory. Yields (root, session, events)."""
+    path = Path(path)
+    if not path.exists() and (RECORDINGS_DIR / f"{path.name}.zip").exists():
+        path = RECORDINGS_DIR / f"{path.name}.zip"
+    with tempfile.TemporaryDirectory(prefix="zoomclick_replay_") as tmp:
+        with zipfile.ZipFile(path) as zf:
+            zf.extractall(tmp)
+        root = Path(tmp)
+        session = json.loads((root / "session.json").read_text())
+        if session.get("version", 0) > RECORDING_VERSION:
+            raise RuntimeError(f"Archive version {session['version']} is newer than this zoomclick supports")
+        events = [json.loads(line) for line in (root / "events.jsonl").read_text().splitlines() if line]
+        yield root, session, events
+
+
+def latency_summary(values: list) -> dict:
+    """count/mean/p50/p90/p99/max of a list of milliseconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": round(percentile(50), 2),
+        "p90": round(percentile(90), 2),
+        "p99": round(percentile(99), 2),
+        "max": round(ordered[-1], 2),
+    }
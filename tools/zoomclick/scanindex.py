@@ -0,0 +1,283 @@
+"""
+Prefilter index for zoomclick --scan.
+
+Answers "which saved templates are on screen?" without a full-frame
+matchTemplate per template. Cheap descriptors are stored per template, keyed
+by content hash, in SCAN_INDEX_FILE (thumbnails in INDEX_DIR):
+
+- Color histogram (64 bins): pruned if no block of frame tiles holds the
+  template's colors
+- Perceptual hash: compared against the frame at the saved position first
+- Low-res thumbnail: coarse match on a downscaled frame to find candidate spots
+
+Only survivors get an exact full-resolution match, restricted to small regions
+around their candidate spots, spread over a worker pool.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers import TEMPLATES_DIR, perceptual_hash, phash_distance
+from frames import as_frame
+
+INDEX_DIR = TEMPLATES_DIR / "index"
+SCAN_INDEX_FILE = INDEX_DIR / "index.json"
+
+HIST_TILE = 32               # Frame tile size for histogram containment
+MIN_CONTAINMENT = 0.8        # Share of template pixels whose color bin must be present nearby
+THUMB_MIN_SIDE = 8           # Thumbnails are the smallest of 1/4, 1/2, 1x keeping this side
+COARSE_MIN_CONFIDENCE = 0.5  # Thumbnail match score that makes a spot a candidate
+COARSE_PEAKS = 3             # Candidate spots kept per template
+PHASH_MAX_DISTANCE = 6       # Saved-position check: perceptual hash distance
+SCAN_MIN_CONFIDENCE = 0.8    # Exact match score that counts as visible
+
+
+def color_codes(image):
+    """Quantize a BGR image to 64 color bins (2 bits per channel)."""
+    b, g, r = image[..., 0] >> 6, image[..., 1] >> 6, image[..., 2] >> 6
+    return (b << 4) | (g << 2) | r
+
+
+def thumb_scale(width: int, height: int) -> float:
+    for scale in (0.25, 0.5):
+        if min(width, height) * scale >= THUMB_MIN_SIDE:
+            return scale
+    return 1.0
+
+
+def describe_template(template, content_hash: str) -> dict:
+    """Compute the index entry for a template image (and write its thumbnail)."""
+    import cv2
+    import numpy as np
+
+    height, width = template.shape[:2]
+    scale = thumb_scale(width, height)
+    thumb_path = INDEX_DIR / f"{content_hash[:32]}.png"
+    if scale < 1.0:
+        thumb = cv2.resize(template, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    else:
+        thumb = template
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(thumb_path), thumb)
+    return {
+        "width": width,
+        "height": height,
+        "hist": np.bincount(color_codes(template).ravel(), minlength=64).tolist(),
+        "phash": perceptual_hash(template),
+        "thumb": str(thumb_path),
+        "thumb_scale": scale,
+    }
+
+
+def load_index() -> dict:
+    if SCAN_INDEX_FILE.exists():
+        try:
+            with open(SCAN_INDEX_FILE) as f:
+                return json.load(f)
+        except ValueError:
+            pass
+    return {}
+
+
+def save_index(index: dict):
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    with open(SCAN_INDEX_FILE, 'w') as f:
+        json.dump(index, f)
+
+
+def update_index(templates: list) -> tuple:
+    """
+    Bring the index in line with the saved templates.
+
+    templates: load_templates() entries. Missing entries are computed, entries
+    for templates that no longer exist are dropped. Returns (index, added).
+    """
+    import cv2
+    from helpers import image_hashes
+
+    index = load_index()
+    live = set()
+    added = 0
+    for entry in templates:
+        content_hash = entry["meta"].get("content_hash") or image_hashes(entry["path"])["content_hash"]
+        entry["content_hash"] = content_hash
+        live.add(content_hash)
+        if content_hash in index:
+            continue
+        template = cv2.imread(str(entry["path"]))
+        if template is None:
+            continue
+        index[content_hash] = describe_template(template, content_hash)
+        added += 1
+
+    stale = set(index) - live
+    for content_hash in stale:
+        thumb = index.pop(content_hash).get("thumb")
+        if thumb and os.path.exists(thumb):
+            os.unlink(thumb)
+    if added or stale:
+        save_index(index)
+    return index, added
+
+
+def tile_histogram_integral(frame):
+    """Per-tile 64-bin color counts of a frame as a 2D prefix sum (rows+1, cols+1, 64)."""
+    import numpy as np
+
+    height, width = frame.shape[:2]
+    rows, cols = -(-height // HIST_TILE), -(-width // HIST_TILE)
+    codes = color_codes(frame).astype(np.int64)
+    tile_ids = (np.arange(height) // HIST_TILE)[:, None] * cols + (np.arange(width) // HIST_TILE)[None, :]
+    counts = np.bincount((tile_ids * 64 + codes).ravel(), minlength=rows * cols * 64)
+    counts = counts.reshape(rows, cols, 64)
+    integral = np.zeros((rows + 1, cols + 1, 64), dtype=np.int64)
+    integral[1:, 1:] = counts.cumsum(0).cumsum(1)
+    return integral
+
+
+def containment(integral, hist: list, width: int, height: int) -> float:
+    """
+    Best share of template pixels whose color bin is available in any block of
+    tiles large enough to hold the template at any alignment.
+    """
+    import numpy as np
+
+    rows, cols = integral.shape[0] - 1, integral.shape[1] - 1
+    kh = min(rows, -(-height // HIST_TILE) + 1)
+    kw = min(cols, -(-width // HIST_TILE) + 1)
+    blocks = (integral[kh:, kw:] - integral[:-kh, kw:] - integral[kh:, :-kw] + integral[:-kh, :-kw])
+    wanted = np.asarray(hist, dtype=np.int64)
+    covered = np.minimum(blocks, wanted).sum(axis=2)
+    return float(covered.max()) / max(1, int(wanted.sum()))
+
+
+def coarse_candidates(small_frame, thumb, scale: float) -> list:
+    """Top thumbnail match spots on a downscaled frame as full-res (center_x, center_y)."""
+    import cv2
+
+    th, tw = thumb.shape[:2]
+    if small_frame.shape[0] < th or small_frame.shape[1] < tw:
+        return []
+    scores = cv2.matchTemplate(small_frame, thumb, cv2.TM_CCOEFF_NORMED)
+    spots = []
+    for _ in range(COARSE_PEAKS):
+        _, best, _, (x, y) = cv2.minMaxLoc(scores)
+        if best < COARSE_MIN_CONFIDENCE:
+            break
+        spots.append((round((x + tw / 2) / scale), round((y + th / 2) / scale)))
+        # Suppress this peak before looking for the next one
+        scores[max(0, y - th // 2):y + th // 2 + 1, max(0, x - tw // 2):x + tw // 2 + 1] = -1
+    return spots
+
+
+def confirm(frame, template, spots: list, margin: int) -> tuple:
+    """Exact match restricted to regions around candidate spots. Returns (x, y, confidence) or None."""
+    import cv2
+
+    frame_h, frame_w = frame.shape[:2]
+    th, tw = template.shape[:2]
+    best = None
+    for cx, cy in spots:
+        x0, y0 = max(0, cx - tw // 2 - margin), max(0, cy - th // 2 - margin)
+        x1, y1 = min(frame_w, cx + tw - tw // 2 + margin), min(frame_h, cy + th - th // 2 + margin)
+        region = frame[y0:y1, x0:x1]
+        if region.shape[0] < th or region.shape[1] < tw:
+            continue
+        scores = cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (x, y) = cv2.minMaxLoc(scores)
+        if score >= SCAN_MIN_CONFIDENCE and (best is None or score > best[2]):
+            best = (x0 + x + tw // 2, y0 + y + th // 2, float(score))
+    return best
+
+
+def scan_frame(frame, templates: list, saved_centers: dict) -> tuple:
+    """
+    Find which indexed templates are visible in a BGR frame (or frames.Frame).
+
+    templates: load_templates() entries. saved_centers maps template name to
+    its saved (center_x, center_y) in frame coordinates, checked first.
+    Returns (visible, stats): visible is a list of {name, x, y, confidence,
+    stage} with frame-relative template centers, strongest first.
+    """
+    import cv2
+
+    shared = as_frame(frame)
+    frame = shared.image
+    stats = {"templates": len(templates)}
+    started = time.perf_counter()
+    index, added = update_index(templates)
+    stats["index_added"] = added
+    stats["index_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    integral = shared.tile_histograms()
+    frame_h, frame_w = frame.shape[:2]
+    jobs = []
+    pruned_hist = pruned_coarse = 0
+
+    def coarse_job(entry, desc):
+        thumb = cv2.imread(desc["thumb"])
+        scale = desc["thumb_scale"]
+        spots = coarse_candidates(shared.scaled(scale), thumb, scale) if thumb is not None else []
+        return (entry, spots, round(2 / scale) + 2, "coarse", desc) if spots else None
+
+    for entry in templates:
+        desc = index.get(entry.get("content_hash"))
+        if not desc or desc["width"] > frame_w or desc["height"] > frame_h:
+            pruned_hist += 1
+            continue
+        if containment(integral, desc["hist"], desc["width"], desc["height"]) < MIN_CONTAINMENT:
+            pruned_hist += 1
+            continue
+
+        # Cheapest positive: the template still sits where it was saved
+        saved = saved_centers.get(entry["name"])
+        if saved:
+            x0 = saved[0] - desc["width"] // 2
+            y0 = saved[1] - desc["height"] // 2
+            if 0 <= x0 and 0 <= y0 and x0 + desc["width"] <= frame_w and y0 + desc["height"] <= frame_h:
+                patch = frame[y0:y0 + desc["height"], x0:x0 + desc["width"]]
+                if phash_distance(perceptual_hash(patch), desc["phash"]) <= PHASH_MAX_DISTANCE:
+                    jobs.append((entry, [tuple(saved)], 4, "saved_position", desc))
+                    continue
+
+        job = coarse_job(entry, desc)
+        if job is None:
+            pruned_coarse += 1
+            continue
+        jobs.append(job)
+    stats["pruned_histogram"] = pruned_hist
+    stats["pruned_coarse"] = pruned_coarse
+    stats["candidates"] = len(jobs)
+    stats["prefilter_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    def run(job):
+        entry, spots, margin, stage, _ = job
+        template = cv2.imread(str(entry["path"]))
+        if template is None:
+            return None
+        found = confirm(frame, template, spots, margin)
+        if not found:
+            return None
+        return {"name": entry["name"], "x": found[0], "y": found[1],
+                "confidence": round(found[2], 3), "stage": stage}
+
+    started = time.perf_counter()
+    visible = []
+    if jobs:
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 2) as pool:
+            hits = list(pool.map(run, jobs))
+            visible = [hit for hit in hits if hit]
+            # Looked like it was still at its saved position but did not confirm
+            # there (moved a little, or a lookalike): search the whole frame
+            retry = [coarse_job(job[0], job[4]) for job, hit in zip(jobs, hits)
+                     if not hit and job[3] == "saved_position"]
+            retry = [job for job in retry if job]
+            stats["saved_position_retries"] = len(retry)
+            visible += [hit for hit in pool.map(run, retry) if hit]
+    stats["confirm_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    visible.sort(key=lambda hit: hit["confidence"], reverse=True)
+    stats["frame"] = shared.stats()
+    return visible, stats
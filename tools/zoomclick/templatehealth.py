@@ -0,0 +1,122 @@
+"""
+Template health: when each saved template was last seen on screen.
+
+Kept in the template's metadata under "health" and updated by both
+zoomclick --revalidate (background checks against current frames) and
+zoomclick --click (every real lookup):
+
+- last_checked / last_seen: Unix times of the last check and last hit
+- best_score / last_score: highest and latest TM_CCOEFF_NORMED score
+- drift_px: distance of the last hit from the saved click point, relative
+  to the capture origin (window or page moves are not drift)
+- checks, misses: checks so far and consecutive misses
+
+A template is stale after STALE_MISSES consecutive misses and STALE_AFTER_S
+without a hit (since it was saved if it never was). --click refuses stale
+templates instead of falling back to saved coordinates that almost certainly
+point at the wrong thing; a hit in a later --revalidate clears the flag.
+
+Confirmed hits (clicks that went through, and reacted with --verify) also
+keep their scores in meta["hit_scores"]. Once MIN_HITS are known, they give
+the template its own thresholds instead of the fixed 0.5 descent
+(learned_thresholds): "accept" rejects weak false matches of templates that
+always score high, "early_exit" lets --click stop at a probe around the last
+hit. Unlike health, scores travel with the template in packs.
+"""
+
+import json
+import math
+import os
+import time
+from pathlib import Path
+
+STALE_MISSES = 3
+STALE_AFTER_S = 3600
+
+HIT_HISTORY = 20         # Confirmed hit scores kept per template
+MIN_HITS = 5             # Hits needed before thresholds are learned
+ACCEPT_MARGIN = 0.15     # Accept at least this far below the median hit
+EARLY_EXIT_MARGIN = 0.02
+DEFAULT_ACCEPT = 0.5     # Learned accept never goes below the default
+MAX_ACCEPT = 0.95
+
+
+def update_health(meta: dict, score: float, seen: bool, drift_px: float = None) -> dict:
+    """Record one check in meta["health"] (in place). Returns the health dict."""
+    now = round(time.time(), 1)
+    health = meta.setdefault("health", {})
+    health["last_checked"] = now
+    health["checks"] = health.get("checks", 0) + 1
+    if score is not None:
+        health["last_score"] = round(float(score), 4)
+        health["best_score"] = max(health.get("best_score", -1.0), health["last_score"])
+    if seen:
+        health["last_seen"] = now
+        health["misses"] = 0
+        if drift_px is not None:
+            health["drift_px"] = round(drift_px, 1)
+    else:
+        health["misses"] = health.get("misses", 0) + 1
+    health["stale"] = is_stale(meta)
+    return health
+
+
+def record_hit(meta: dict, score: float, x: int, y: int, roi: str):
+    """Record a confirmed hit (in place): its score and where it was found in the capture."""
+    scores = meta.setdefault("hit_scores", [])
+    scores.append(round(float(score), 4))
+    del scores[:-HIT_HISTORY]
+    meta.setdefault("health", {})["last_hit"] = {"x": int(x), "y": int(y), "roi": roi}
+
+
+def learned_thresholds(meta: dict) -> dict:
+    """
+    Per-template thresholds from the confirmed hit scores, or None before MIN_HITS.
+
+    accept: median minus the larger of ACCEPT_MARGIN and twice the spread
+    down to the 10th percentile (one outlier does not move it), within
+    DEFAULT_ACCEPT..MAX_ACCEPT. early_exit: just under the median hit.
+    """
+    scores = sorted(meta.get("hit_scores") or [])
+    if len(scores) < MIN_HITS:
+        return None
+    median = scores[len(scores) // 2]
+    low = scores[len(scores) // 10]
+    accept = min(MAX_ACCEPT, max(DEFAULT_ACCEPT, median - max(ACCEPT_MARGIN, 2 * (median - low))))
+    early_exit = min(0.99, max(accept, median - EARLY_EXIT_MARGIN))
+    return {"accept": round(accept, 3), "early_exit": round(early_exit, 3), "hits": len(scores)}
+
+
+def is_stale(meta: dict) -> bool:
+    health = meta.get("health") or {}
+    if health.get("misses", 0) < STALE_MISSES:
+        return False
+    last_seen = health.get("last_seen") or meta.get("created") or 0
+    return time.time() - last_seen >= STALE_AFTER_S
+
+
+def drift(meta: dict, x: float, y: float, relative: bool) -> float:
+    """
+    Distance of a hit's click point from the saved one. (x, y) is relative to
+    the capture; relative says the capture was the saved window/page rather
+    than the whole screen.
+    """
+    if meta.get("center_x") is None or meta.get("center_y") is None:
+        return None
+    saved_x, saved_y = meta["center_x"], meta["center_y"]
+    if relative:
+        saved_x -= meta.get("window_offset_x", 0)
+        saved_y -= meta.get("window_offset_y", 0)
+    return math.hypot(x - saved_x, y - saved_y)
+
+
+def write_meta(meta_path: Path, meta: dict):
+    """Replace a metadata file atomically (--click and --revalidate may write concurrently)."""
+    # Each writer stages its own file: a shared staging name could interleave two writes
+    staged = meta_path.with_name(f"{meta_path.name}.{os.getpid()}.{time.time_ns()}.tmp")
+    try:
+        with open(staged, "w") as f:
+            json.dump(meta, f, indent=2)
+        staged.replace(meta_path)
+    finally:
+        staged.unlink(missing_ok=True)  # Only left over if the write failed
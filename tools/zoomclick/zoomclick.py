@@ -31,20 +31,46 @@ Usage Examples:
   zoomclick --zoom top-left            # Zoom into top-left quadrant
   zoomclick --zoom center              # Zoom into center region
   zoomclick --zoom center              # Keep zooming until element is big
+  zoomclick --back                     # Wrong region: back one level (cached image)
+  zoomclick --goto-level 1             # Jump to any level of this session's zoom stack
+  zoomclick --start --grid 8x6         # Screenshot with labeled grid A1..H6
+  zoomclick --zoom-to B4.3             # Jump straight to sub-cell 3 of B4
+  zoomclick --start --max-edge 1024 --image-format jpeg --quality 70
+                                       # Smaller images for the vision model
   zoomclick --save "submit_button"     # Save current zoomed region as template
+  zoomclick --save "submit_button" --anchor  # Save a small unique anchor patch instead
   zoomclick --click "submit_button"    # Find and click the saved template
+  zoomclick --marks                    # Number interactive elements in view
+  zoomclick --click-mark 17            # Click element 17 from --marks
+  zoomclick --click-text "Submit"      # OCR the screen and click the text
+  zoomclick --start --since f18c2a9b3e0  # Only what changed since that capture
+  zoomclick --start --cdp              # Capture the Chrome page over DevTools (port 9222)
+  zoomclick --click "submit_button" --verify  # Click and confirm the UI reacted
+  zoomclick --click "load_more" --scroll-search  # Scroll until an off-screen template shows up
+  zoomclick --click "new_tab" -w "Chrome" --all-windows  # Search every Chrome window at once
+  zoomclick --click "new_tab" --all-screens --all-hits   # Every monitor, report all hits
+  zoomclick --click "submit_button" --deadline 1500  # Give up (exit 124) after 1.5 s
+  zoomclick --scan                     # Which saved templates are on screen now
+  zoomclick --revalidate               # Idle-time check; records last seen/score/drift, reports stale
   zoomclick --list                     # List all saved templates
   zoomclick --reset                    # Reset zoom state (start fresh)
+  zoomclick --compact                  # Drop duplicate template versions
+  zoomclick --export-pack fleet        # Templates + prebuilt artifacts in one archive
+  zoomclick --import-pack fleet.zip    # Add what's missing on another host (warm first click)
+  zoomclick --capture-service &        # Keep frames ready in shared memory
+  zoomclick --click "submit_button" --priority 5  # Go first when agents share the display
+  zoomclick --record-start demo        # Record lookups; --record-stop writes the archive
+  zoomclick --replay demo --engine full  # Re-run matching offline, compare speed/locations
 """
 
 import argparse
 import json
 import os
-import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from typing import Optional, Tuple
 
 # Set display before importing pyautogui
@@ -53,19 +79,87 @@ os.environ.setdefault('DISPLAY', ':99')
 # Suppress mouseinfo tkinter warning  
 sys.modules['mouseinfo'] = type(sys)('mouseinfo')
 
-import pyautogui
-
-pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.1
+try:
+    import pyautogui
+    pyautogui.FAILSAFE = True
+    pyautogui.PAUSE = 0.1
+except Exception as e:
+    # No display (e.g. --replay on a build machine); only input commands need one
+    pyautogui = None
+    PYAUTOGUI_ERROR = str(e)
 
 # Import helpers
 from helpers import (
     WORK_DIR, TEMPLATES_DIR, STATE_FILE,
     find_window_by_name, find_window_by_class, get_window_geometry, list_windows,
     take_screenshot, take_screenshot_window, take_screenshot_screen,
-    crop_image, add_quadrant_overlay, get_screen_size
+    crop_image, add_quadrant_overlay, add_grid_overlay, grid_column_label, get_screen_size,
+    image_hashes, phash_distance, encode_for_model, retain_frame, diff_frames,
+    grab_region, grab_screen, list_screens, DIFF_THRESHOLD, StageTimeout, DEADLINE, stage, set_deadline
 )
 
+from marks import find_marks, draw_marks, load_marks
+from ocr import ocr_words, find_text
+from matchcache import MatchCache, TILE
+from scanindex import scan_frame, update_index, save_index, INDEX_DIR
+from frames import Frame, as_frame, pixels
+from framebuffer import run_service, attach, service_stats, shared_frame, DEFAULT_RATE, DEFAULT_IDLE_RATE
+from cdp import take_screenshot_page, page_geometry, viewport_clip, DEFAULT_CDP_PORT
+from inputqueue import run_input, set_input_policy, input_status, display_idle
+from templatehealth import update_health, is_stale, drift, write_meta, record_hit, learned_thresholds
+from packs import write_pack, open_pack, object_key, HOST_FIELDS
+from recording import (start_recording, stop_recording, record_match, recording_active, open_archive,
+                       latency_summary)
+
+REPLAY_ENGINES = ("default", "full", "hierarchical", "cached")
+REPLAY_TOLERANCE_PX = 2  # Replayed locations further than this from the recorded one count as changed
+
+# Perceptual hashes within this many bits are treated as the same element
+NEAR_DUPLICATE_DISTANCE = 6
+
+# Anchor templates: candidate patch sizes (smallest first) and required uniqueness
+ANCHOR_SIZES = (24, 32, 48, 64, 96, 128, 192)
+ANCHOR_MIN_GAP = 0.1      # Best self-match must beat the runner-up peak by this
+ANCHOR_MAX_RUNNER_UP = 0.9
+ANCHOR_MIN_STD = 8.0      # Skip featureless patches
+
+# Full viewport crops kept for debugging when an anchor is saved instead
+CROPS_DIR = TEMPLATES_DIR / "crops"
+
+# --scroll-search: scroll the target step by step, matching only the newly revealed strip
+SCROLL_STEP_CLICKS = 5      # Wheel clicks per step
+SCROLL_MAX_STEPS = 20
+SCROLL_MAX_MS = 15000
+SCROLL_BAND = 48            # Height of the band tracked between frames to measure the scroll
+SCROLL_MIN_OVERLAP = 0.9    # Band match score needed to trust the measured distance
+
+# Hierarchical templates: low-res crops of the zoom chain's ancestor viewports
+CHAIN_DIR = TEMPLATES_DIR / "chain"
+CHAIN_SCALE = 0.25          # Ancestor crops are stored and matched at this scale
+CHAIN_MAX_FRACTION = 0.6    # Skip ancestors covering most of the capture (no narrowing)
+CHAIN_MIN_CONFIDENCE = 0.6
+
+# Zoom history: every level's crop and rendered image, for --back/--forward/--goto-level
+HISTORY_DIR = WORK_DIR / "history"
+HISTORY_MAX_CHANGE = 0.001  # Fraction of changed pixels up to which a cached level is reused
+
+# Region captures: pixels of context kept around the viewport in the --click-center screenshot
+VIEWPORT_MARGIN = 32
+
+# Click verification: region watched around the target and how often it is polled
+VERIFY_REGION_W, VERIFY_REGION_H = 240, 160
+VERIFY_POLL_S = 0.05
+VERIFY_MIN_RATIO = 0.001  # Fraction of the region that must change to count as a reaction
+
+# Early exit for templates with learned thresholds: pixels searched around the last hit first
+PROBE_MARGIN = 16
+
+# Background revalidation (--revalidate)
+REVALIDATE_DUTY = 0.25       # Most of the wall time spent capturing and matching
+REVALIDATE_IDLE_MS = 2000    # The display counts as idle this long after the last input job
+REVALIDATE_MAX_WAIT_S = 60   # Stop (remaining templates deferred) if it stays busy longer
+REVALIDATE_NICE = 10
+
 @dataclass
 class ViewportState:
     """Tracks the current viewport region on screen."""
@@ -79,6 +173,17 @@ class ViewportState:
     window_id: int = 0   # Window ID if targeting a window (0 = full screen)
     window_offset_x: int = 0  # Window X position on screen
     window_offset_y: int = 0  # Window Y position on screen
+    grid_cols: int = 0   # Addressing grid columns (0 = quadrant overlay)
+    grid_rows: int = 0   # Addressing grid rows
+    max_edge: int = 0    # Output image policy: cap on the long edge (0 = full size)
+    image_format: str = "png"
+    image_quality: int = 85
+    max_bytes: int = 0   # Output image byte budget (0 = unlimited)
+    history: list = field(default_factory=list)  # Ancestor viewports [x, y, w, h], outermost first
+    cdp_port: int = 0    # Capture the browser page over DevTools on this port (0 = X11 capture)
+    levels: list = field(default_factory=list)  # Zoom stack: {rect, label, crop, image, image_info} per level
+    position: int = 0    # Index of the current viewport in levels (back/forward move it)
+    capture_ms: float = 0.0  # Full capture time at --start (region captures report savings against it)
     
     def to_dict(self):
         return asdict(self)
@@ -197,8 +302,151 @@ def get_quadrant_bounds(state: ViewportState, direction: str) -> Tuple[int, int,
         ]
         raise ValueError(f"Unknown direction: {direction}. Valid: {', '.join(valid)}")
 
-def start_session(window_id: int = None, screen_num: int = None) -> dict:
-    """Start a new zoom session with full screenshot or window/screen capture."""
+def parse_grid_spec(spec: str) -> Tuple[int, int]:
+    """Parse a grid spec like "8x6" into (cols, rows)."""
+    try:
+        cols, rows = (int(v) for v in spec.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid grid: {spec}. Use COLSxROWS, e.g. 8x6")
+    if not (1 <= cols <= 26 and 1 <= rows <= 99):
+        raise ValueError(f"Invalid grid: {spec}. Columns must be 1-26, rows 1-99")
+    return cols, rows
+
+def get_grid_cell_bounds(state: ViewportState, address: str) -> Tuple[int, int, int, int]:
+    """
+    Get the bounds (x, y, width, height) of a grid address within current viewport.
+    Returns coordinates relative to the SCREEN (not the cropped image).
+    
+    Address format: <column letter><row number>[.<sub-cell>]...
+    - B4      → column B, row 4 of the session grid
+    - B4.3    → sub-cell 3 of B4 (cells split 3x3, numbered 1-9 like a keypad)
+    - B4.3.5  → sub-cells nest to any depth
+    """
+    if not state.grid_cols or not state.grid_rows:
+        raise ValueError("No grid in this session. Run: zoomclick --start --grid 8x6")
+    
+    parts = address.strip().upper().split(".")
+    cell = parts[0]
+    if len(cell) < 2 or not cell[0].isalpha() or not cell[1:].isdigit():
+        raise ValueError(f"Invalid grid address: {address}. Example: B4 or B4.3")
+    col = ord(cell[0]) - ord("A")
+    row = int(cell[1:]) - 1
+    if not (0 <= col < state.grid_cols and 0 <= row < state.grid_rows):
+        last = f"{grid_column_label(state.grid_cols - 1)}{state.grid_rows}"
+        raise ValueError(f"Grid cell {cell} out of range. Valid: A1..{last}")
+    
+    def split(x, y, w, h, cols, rows, c, r):
+        x0 = x + c * w // cols
+        y0 = y + r * h // rows
+        return (x0, y0, x + (c + 1) * w // cols - x0, y + (r + 1) * h // rows - y0)
+    
+    bounds = split(state.x, state.y, state.width, state.height, state.grid_cols, state.grid_rows, col, row)
+    for sub in parts[1:]:
+        if not sub.isdigit() or not 1 <= int(sub) <= 9:
+            raise ValueError(f"Invalid sub-cell: {sub}. Sub-cells are 1-9 (keypad layout)")
+        index = int(sub) - 1
+        bounds = split(*bounds, 3, 3, index % 3, index // 3)
+        if bounds[2] < 1 or bounds[3] < 1:
+            raise ValueError(f"Grid address {address} is smaller than one pixel")
+    return bounds
+
+def render_overlay(state: ViewportState, src_path: Path, dst_path: Path) -> Tuple[Path, dict]:
+    """
+    Draw the session's navigation overlay (grid or quadrant guides) onto an output
+    image, then apply the session's output image policy.
+    
+    Returns (path, image_info) where image_info carries the scale factor and the
+    screen position of the image's top-left, so a point read from the image maps
+    back as: screen = origin + image / scale.
+    """
+    if state.grid_cols and state.grid_rows:
+        add_grid_overlay(src_path, dst_path, state.width, state.height, state.grid_cols, state.grid_rows)
+    else:
+        add_quadrant_overlay(src_path, dst_path, state.width, state.height)
+    
+    out_path, info = encode_for_model(dst_path, state.max_edge, state.image_format, state.image_quality, state.max_bytes)
+    info["origin"] = {"x": state.x + state.window_offset_x, "y": state.y + state.window_offset_y}
+    return out_path, info
+
+GRID_INSTRUCTIONS = """
+Analyze the screenshot. The image shows a labeled grid (A1, B1, ...).
+Each cell is split into 3x3 sub-cells numbered like a keypad:
+  1 2 3
+  4 5 6
+  7 8 9
+
+Jump straight to the target in ONE step at any depth:
+  zoomclick --zoom-to B4      (whole cell)
+  zoomclick --zoom-to B4.3    (top-right sub-cell of B4)
+  zoomclick --zoom-to B4.3.5  (center of that sub-cell)
+
+Then save it: zoomclick --save "button_name"
+Or click it:  zoomclick --click-center
+""".strip()
+
+def take_session_screenshot(state: ViewportState, name: str) -> Path:
+    """Fresh capture of what the session covers: browser page (CDP), window or full screen."""
+    if state.cdp_port:
+        return take_screenshot_page(state.cdp_port, name)[0]
+    if state.window_id:
+        return take_screenshot_window(state.window_id, name)
+    return take_screenshot(name)
+
+def capture_size(state: ViewportState) -> Tuple[int, int]:
+    """Width and height of the session's full capture (the --start viewport)."""
+    if state.history:
+        return state.history[0][2], state.history[0][3]
+    return state.x + state.width, state.y + state.height
+
+def viewport_rect(state: ViewportState, margin: int = 0) -> Tuple[int, int, int, int]:
+    """The current viewport grown by margin on every side, clipped to the capture."""
+    full_w, full_h = capture_size(state)
+    x0, y0 = max(0, state.x - margin), max(0, state.y - margin)
+    x1 = min(full_w, state.x + state.width + margin)
+    y1 = min(full_h, state.y + state.height + margin)
+    return x0, y0, x1 - x0, y1 - y0
+
+def capture_region(state: ViewportState, rect: Tuple[int, int, int, int], name: str) -> Tuple[Path, dict]:
+    """
+    Capture only rect (x, y, w, h in capture coordinates) of what the session
+    covers, to a PNG: a clipped DevTools capture, or a root window region at
+    the window/screen offset (sliced from the capture service when it runs).
+    
+    Returns (path, timing): capture_ms, the region, its raw pixel bytes and
+    saved_bytes / saved_ms against the session's full capture at --start.
+    """
+    import cv2
+    
+    x, y, w, h = rect
+    started = time.perf_counter()
+    if state.cdp_port:
+        path, _ = take_screenshot_page(state.cdp_port, name, clip=viewport_clip(state.cdp_port, x, y, w, h))
+    else:
+        image = grab_region(x + state.window_offset_x, y + state.window_offset_y, w, h)
+        path = WORK_DIR / f"{name}_{int(time.time())}.png"
+        cv2.imwrite(str(path), image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    capture_ms = round((time.perf_counter() - started) * 1000, 1)
+    
+    full_w, full_h = capture_size(state)
+    return path, {
+        "capture_ms": capture_ms,
+        "region": [x, y, w, h],
+        "bytes": w * h * 3,
+        "saved_bytes": (full_w * full_h - w * h) * 3,
+        "saved_ms": round(state.capture_ms - capture_ms, 1) if state.capture_ms else None,
+    }
+
+def start_session(window_id: int = None, screen_num: int = None, grid: Optional[Tuple[int, int]] = None,
+                  image_policy: Optional[dict] = None, since: Optional[str] = None,
+                  cdp_port: int = 0) -> dict:
+    """
+    Start a new zoom session with full screenshot or window/screen capture.
+    
+    With since (an artifact_id from an earlier result), only the regions that
+    changed since that capture are returned instead of the full screenshot.
+    With cdp_port, the Chrome page viewport is captured over DevTools and its
+    screen position becomes the capture offset.
+    """
     screen_w, screen_h = get_screen_size()
     
     window_offset_x = 0
@@ -206,40 +454,39 @@ def start_session(window_id: int = None, screen_num: int = None) -> dict:
     capture_width = screen_w
     capture_height = screen_h
     
-    if window_id:
-        # Capture specific window
-        screenshot_path = take_screenshot_window(window_id, "window")
-        geo = get_window_geometry(window_id)
-        window_offset_x = geo.get("X", 0)
-        window_offset_y = geo.get("Y", 0)
-        capture_width = geo.get("WIDTH", screen_w)
-        capture_height = geo.get("HEIGHT", screen_h)
-    elif screen_num is not None:
-        # Capture specific screen
-        screenshot_path = take_screenshot_screen(screen_num, "screen")
-        # Get screen geometry for offset tracking
-        import re
-        result = subprocess.run(['xrandr'], capture_output=True, text=True)
-        screens = []
-        for line in result.stdout.split('\n'):
-            if ' connected' in line:
-                match = re.search(r'(\d+)x(\d+)\+(\d+)\+(\d+)', line)
-                if match:
-                    screens.append({
-                        'width': int(match.group(1)),
-                        'height': int(match.group(2)),
-                        'x': int(match.group(3)),
-                        'y': int(match.group(4))
-                    })
-        if screen_num < len(screens):
-            s = screens[screen_num]
-            window_offset_x = s['x']
-            window_offset_y = s['y']
-            capture_width = s['width']
-            capture_height = s['height']
-    else:
-        # Full screen capture
-        screenshot_path = take_screenshot("full")
+    started = time.perf_counter()
+    with stage("capture"):
+        if cdp_port:
+            # Capture the page viewport straight from the browser
+            screenshot_path, _ = take_screenshot_page(cdp_port, "page")
+            page = page_geometry(cdp_port, get_window_geometry(window_id) if window_id else None)
+            window_offset_x = page["origin_x"]
+            window_offset_y = page["origin_y"]
+            capture_width = round(page["width"] * page["scale"])
+            capture_height = round(page["height"] * page["scale"])
+        elif window_id:
+            # Capture specific window
+            screenshot_path = take_screenshot_window(window_id, "window")
+            geo = get_window_geometry(window_id)
+            window_offset_x = geo.get("X", 0)
+            window_offset_y = geo.get("Y", 0)
+            capture_width = geo.get("WIDTH", screen_w)
+            capture_height = geo.get("HEIGHT", screen_h)
+        elif screen_num is not None:
+            # Capture specific screen
+            screenshot_path = take_screenshot_screen(screen_num, "screen")
+            # Get screen geometry for offset tracking
+            screens = list_screens()
+            if screen_num < len(screens):
+                s = screens[screen_num]
+                window_offset_x = s['x']
+                window_offset_y = s['y']
+                capture_width = s['width']
+                capture_height = s['height']
+        else:
+            # Full screen capture
+            screenshot_path = take_screenshot("full")
+    capture_ms = round((time.perf_counter() - started) * 1000, 1)
     
     # Initialize viewport state
     state = ViewportState(
@@ -249,18 +496,52 @@ def start_session(window_id: int = None, screen_num: int = None) -> dict:
         zoom_level=0,
         window_id=window_id or 0,
         window_offset_x=window_offset_x,
-        window_offset_y=window_offset_y
+        window_offset_y=window_offset_y,
+        grid_cols=grid[0] if grid else 0,
+        grid_rows=grid[1] if grid else 0,
+        cdp_port=cdp_port,
+        capture_ms=capture_ms,
+        **(image_policy or {})
     )
+    import shutil
+    shutil.rmtree(HISTORY_DIR, ignore_errors=True)
     state.save()
     
+    # Diff before retaining: pruning could otherwise expire the frame being diffed against
+    changes = diff_frames(since, screenshot_path, "delta") if since else None
+    artifact_id = retain_frame(screenshot_path)
+    
+    if since:
+        if not changes.get("full_frame"):
+            for region in changes["regions"]:
+                x, y, w, h = region["box"]
+                region["screen_box"] = [x + window_offset_x, y + window_offset_y, w, h]
+            result = {
+                "success": True,
+                "action": "start",
+                "artifact_id": artifact_id,
+                "changes": changes,
+                "viewport": state.to_dict(),
+                "instructions": "No visible change since " + since if changes["no_visible_change"] else
+                    "Only the changed regions are returned (box is capture-relative, screen_box is screen-absolute). "
+                    "Run --start without --since for the full screenshot."
+            }
+            if window_id:
+                result["window_id"] = window_id
+            return result
+    
     # Create overlay version
     overlay_path = WORK_DIR / f"overlay_{int(time.time())}.png"
-    add_quadrant_overlay(screenshot_path, overlay_path, capture_width, capture_height)
+    overlay_path, image_info = render_overlay(state, screenshot_path, overlay_path)
+    record_level(state, 0, "start", screenshot_path, overlay_path, image_info)
+    state.save()
     
     result = {
         "success": True,
         "action": "start",
         "screenshot": str(overlay_path),
+        "artifact_id": artifact_id,
+        "image": image_info,
         "viewport": state.to_dict(),
         "instructions": """
 Analyze the screenshot. The image shows:
@@ -286,12 +567,49 @@ Then save it: zoomclick --save "button_name"
 """.strip()
     }
     
+    if since:
+        result["changes"] = changes
+    
+    if grid:
+        result["instructions"] = GRID_INSTRUCTIONS
+    
     if window_id:
         result["window_id"] = window_id
         result["window_position"] = {"x": window_offset_x, "y": window_offset_y}
+    if cdp_port:
+        result["page_origin"] = {"x": window_offset_x, "y": window_offset_y}
     
     return result
 
+def record_level(state: ViewportState, level: int, label: str, crop_path: Path, image_path: Path,
+                 image_info: dict, replace: bool = False):
+    """
+    Store the current viewport as zoom stack entry `level` with copies of its
+    crop and rendered image. Entries from `level` on (e.g. left by --back) are
+    dropped, or with replace only entry `level` is swapped (re-rendered).
+    """
+    import shutil
+    
+    HISTORY_DIR.mkdir(exist_ok=True)
+    dropped = state.levels[level:level + 1] if replace else state.levels[level:]
+    for entry in dropped:
+        Path(entry["crop"]).unlink(missing_ok=True)
+        Path(entry["image"]).unlink(missing_ok=True)
+    stamp = time.time_ns()
+    crop_copy = HISTORY_DIR / f"L{level}_{stamp}_crop.png"
+    image_copy = HISTORY_DIR / f"L{level}_{stamp}{Path(image_path).suffix}"
+    shutil.copyfile(crop_path, crop_copy)
+    shutil.copyfile(image_path, image_copy)
+    entry = {
+        "rect": [state.x, state.y, state.width, state.height],
+        "label": label,
+        "crop": str(crop_copy),
+        "image": str(image_copy),
+        "image_info": image_info,
+    }
+    state.levels[level:level + 1 if replace else len(state.levels)] = [entry]
+    state.position = level
+
 def zoom_to_quadrant(quadrant: str) -> dict:
     """Zoom into a quadrant of the current viewport."""
     state = ViewportState.load()
@@ -300,28 +618,35 @@ def zoom_to_quadrant(quadrant: str) -> dict:
     
     # Get new viewport bounds
     new_x, new_y, new_w, new_h = get_quadrant_bounds(state, quadrant)
+    return zoom_to_bounds(state, new_x, new_y, new_w, new_h, quadrant)
+
+def zoom_to_cell(address: str) -> dict:
+    """Zoom straight to a grid cell (e.g. B4.3) of the current viewport in one step."""
+    state = ViewportState.load()
+    if not state:
+        return {"success": False, "error": "No active session. Run: zoomclick --start --grid 8x6"}
     
-    # Take fresh screenshot (window or full screen based on session)
-    if state.window_id:
-        screenshot_path = take_screenshot_window(state.window_id, "window")
-    else:
-        screenshot_path = take_screenshot("full")
-    
-    # Crop to new viewport
-    cropped_path = WORK_DIR / f"zoom_{state.zoom_level + 1}_{int(time.time())}.png"
-    crop_image(screenshot_path, new_x, new_y, new_w, new_h, cropped_path)
+    new_x, new_y, new_w, new_h = get_grid_cell_bounds(state, address)
+    return zoom_to_bounds(state, new_x, new_y, new_w, new_h, address.upper())
+
+def zoom_to_bounds(state: ViewportState, new_x: int, new_y: int, new_w: int, new_h: int, quadrant: str) -> dict:
+    """Capture only the new bounds (window-relative), update state and render the overlay."""
+    with stage("capture"):
+        cropped_path, capture = capture_region(state, (new_x, new_y, new_w, new_h), f"zoom_{state.zoom_level + 1}")
     
-    # Update state (preserve window tracking)
+    # Update state (preserve window tracking and the zoom chain)
+    state.history.append([state.x, state.y, state.width, state.height])
     state.x = new_x
     state.y = new_y
     state.width = new_w
     state.height = new_h
     state.zoom_level += 1
-    state.save()
     
     # Add overlay to cropped image
     overlay_path = WORK_DIR / f"overlay_{state.zoom_level}_{int(time.time())}.png"
-    add_quadrant_overlay(cropped_path, overlay_path, new_w, new_h)
+    overlay_path, image_info = render_overlay(state, cropped_path, overlay_path)
+    record_level(state, state.zoom_level, quadrant, cropped_path, overlay_path, image_info)
+    state.save()
     
     # Calculate actual screen coordinates (accounting for window offset)
     screen_center_x = new_x + new_w // 2 + state.window_offset_x
@@ -332,12 +657,14 @@ def zoom_to_quadrant(quadrant: str) -> dict:
         "action": "zoom",
         "direction": quadrant,
         "screenshot": str(overlay_path),
+        "image": image_info,
         "viewport": state.to_dict(),
         "screen_coords": {
             "center_x": screen_center_x,
             "center_y": screen_center_y,
             "description": "If you clicked now, this would be the screen coordinate"
         },
+        "timing": capture,
         "instructions": f"""
 Zoomed to {quadrant}. Zoom level {state.zoom_level}.
 Viewport: {new_w}x{new_h} at ({new_x}, {new_y})
@@ -352,22 +679,370 @@ EXCLUSIONS: center-n (exclude bottom), center-s (exclude top), center-e (exclude
 """.strip()
     }
     
+    if state.grid_cols and state.grid_rows:
+        result["instructions"] = f"Zoomed to {quadrant}. Zoom level {state.zoom_level}.\n" \
+            f"Viewport: {new_w}x{new_h} at ({new_x}, {new_y})\n\n" + GRID_INSTRUCTIONS
+    
     if state.window_id:
         result["window_id"] = state.window_id
     
     return result
 
-def save_template(name: str) -> dict:
-    """Save current viewport as a reusable template."""
+def goto_level(level: int, action: str = "goto_level") -> dict:
+    """
+    Return to a level of the zoom stack (0 = the --start view).
+    
+    The level's cached image is reused if a region grab of its viewport still
+    matches the cached crop; otherwise it is re-rendered from one fresh capture.
+    """
+    import cv2
+    
     state = ViewportState.load()
     if not state:
         return {"success": False, "error": "No active session. Run: zoomclick --start"}
+    if not state.levels:
+        return {"success": False, "error": "No zoom history in this session. Run: zoomclick --start"}
+    if not 0 <= level < len(state.levels):
+        return {"success": False, "error": f"No zoom level {level}. Levels: 0-{len(state.levels) - 1}"}
+    
+    entry = state.levels[level]
+    x, y, w, h = entry["rect"]
+    started = time.perf_counter()
+    check_path = None
+    with stage("capture"):
+        if state.cdp_port:
+            # Cached crops of --cdp sessions are page pixels: check against the page too
+            check_path, _ = capture_region(state, (x, y, w, h), f"zoom_{level}")
+            current = cv2.imread(str(check_path))
+        else:
+            current = grab_region(x + state.window_offset_x, y + state.window_offset_y, w, h)
+    cached = cv2.imread(entry["crop"])
+    unchanged = bool(
+        cached is not None and current is not None and cached.shape == current.shape
+        and Path(entry["image"]).exists()
+        and (cv2.absdiff(cached, current).max(axis=2) > DIFF_THRESHOLD).mean() <= HISTORY_MAX_CHANGE
+    )
+    check_ms = round((time.perf_counter() - started) * 1000, 1)
+    
+    state.x, state.y, state.width, state.height = x, y, w, h
+    state.history = [list(lv["rect"]) for lv in state.levels[:level]]
+    state.zoom_level = level
+    state.position = level
+    if not unchanged:
+        # The screen changed under this level: re-render it from a capture of just its viewport
+        cropped_path = check_path
+        if cropped_path is None:
+            with stage("capture"):
+                cropped_path, _ = capture_region(state, (x, y, w, h), f"zoom_{level}")
+        overlay_path = WORK_DIR / f"overlay_{level}_{int(time.time())}.png"
+        overlay_path, image_info = render_overlay(state, cropped_path, overlay_path)
+        record_level(state, level, entry["label"], cropped_path, overlay_path, image_info, replace=True)
+        entry = state.levels[level]
+    state.save()
     
-    # Take fresh screenshot (window or full screen based on session)
-    if state.window_id:
-        screenshot_path = take_screenshot_window(state.window_id, "window")
+    return {
+        "success": True,
+        "action": action,
+        "level": level,
+        "levels": len(state.levels),
+        "label": entry["label"],
+        "screenshot": entry["image"],
+        "image": entry["image_info"],
+        "viewport": state.to_dict(),
+        "cached": unchanged,
+        "timing": {"check_ms": check_ms, "total_ms": round((time.perf_counter() - started) * 1000, 1)},
+        "instructions": f"At zoom level {level} of {len(state.levels) - 1} ({entry['label']}). "
+                        "Zoom again, or use --back / --forward / --goto-level N."
+    }
+
+def go_back() -> dict:
+    state = ViewportState.load()
+    if state and state.levels and state.position == 0:
+        return {"success": False, "error": "Already at the --start view (level 0)"}
+    return goto_level((state.position if state else 0) - 1, "back")
+
+def go_forward() -> dict:
+    state = ViewportState.load()
+    if state and state.position >= len(state.levels) - 1:
+        return {"success": False, "error": "No forward history (zoom again instead)"}
+    return goto_level((state.position if state else 0) + 1, "forward")
+
+def resolve_window_id(window: str = None, window_class: str = None, window_id: int = None) -> Optional[int]:
+    """Resolve --window/--window-class/--window-id targeting to a window ID (None = no window)."""
+    if window_id:
+        return window_id
+    if window:
+        windows = find_window_by_name(window)
+        if not windows:
+            raise ValueError(f"No window found matching: {window}")
+        return windows[0]
+    if window_class:
+        windows = find_window_by_class(window_class)
+        if not windows:
+            raise ValueError(f"No window found with class: {window_class}")
+        return windows[0]
+    return None
+
+def load_templates() -> list:
+    """Load all saved templates (newest first) as dicts of name, path, meta_path, meta."""
+    templates = []
+    for png in sorted(TEMPLATES_DIR.glob("*.png"), key=lambda p: p.stat().st_mtime, reverse=True):
+        meta_path = TEMPLATES_DIR / f"{png.stem}.json"
+        meta = {}
+        if meta_path.exists():
+            with open(meta_path) as f:
+                meta = json.load(f)
+        templates.append({"name": png.stem, "path": png, "meta_path": meta_path, "meta": meta})
+    return templates
+
+def template_files(name: str) -> list:
+    """All files belonging to a saved template (image, metadata, debug crop, chain crops)."""
+    return [TEMPLATES_DIR / f"{name}.png", TEMPLATES_DIR / f"{name}.json", CROPS_DIR / f"{name}.png"] + \
+        sorted(CHAIN_DIR.glob(f"{name}_L*.png"))
+
+def chain_rects(state: ViewportState) -> list:
+    """
+    Ancestor viewports worth a zoom chain level, as (level, x, y, w, h) in
+    capture coordinates snapped to the downscale grid, outermost first.
+    """
+    frame_w, frame_h = capture_size(state)
+    step = round(1 / CHAIN_SCALE)
+    rects = []
+    for level, (x, y, w, h) in enumerate(state.history):
+        if w >= CHAIN_MAX_FRACTION * frame_w and h >= CHAIN_MAX_FRACTION * frame_h:
+            continue
+        # Snap to the downscale grid so stored and searched pixels average the same blocks
+        x1, y1 = min(frame_w, x + w), min(frame_h, y + h)
+        x, y = x - x % step, y - y % step
+        w, h = (x1 - x) // step * step, (y1 - y) // step * step
+        if w // step < 8 or h // step < 8:
+            continue
+        rects.append((level, x, y, w, h))
+    return rects
+
+def save_chain(frame, state: ViewportState, full_name: str, origin: Tuple[int, int] = (0, 0)) -> list:
+    """
+    Save low-res crops of the session's ancestor viewports for coarse-to-fine matching.
+    
+    frame may be a region of the capture whose top-left is at origin; it must
+    cover every chain_rects() rectangle.
+    Returns chain metadata (outermost first): level, rect (capture coordinates)
+    and the crop path.
+    """
+    import cv2
+    
+    step = round(1 / CHAIN_SCALE)
+    chain = []
+    for level, x, y, w, h in chain_rects(state):
+        CHAIN_DIR.mkdir(exist_ok=True)
+        path = CHAIN_DIR / f"{full_name}_L{level}.png"
+        crop = frame[y - origin[1]:y - origin[1] + h, x - origin[0]:x - origin[0] + w]
+        cv2.imwrite(str(path), cv2.resize(crop, (w // step, h // step), interpolation=cv2.INTER_AREA))
+        chain.append({"level": level, "x": x, "y": y, "width": w, "height": h, "path": str(path)})
+    return chain
+
+def locate_hierarchical(screen, template, chain: list, min_confidence: float = 0.5,
+                        floor: Optional[float] = None) -> Optional[Tuple[int, int, float]]:
+    """
+    Replay a saved zoom chain coarse-to-fine.
+    
+    Each ancestor crop is found at CHAIN_SCALE inside the region found for its
+    parent, then the template is matched only inside the innermost region
+    (against floor, a learned threshold, when given). Returns (center_x, center_y, confidence) in screen-image coordinates, or
+    None if any level is not found.
+    """
+    import cv2
+    
+    frame = as_frame(screen)
+    screen = frame.image
+    frame_h, frame_w = screen.shape[:2]
+    step = round(1 / CHAIN_SCALE)
+    rx, ry, rw, rh = 0, 0, frame_w, frame_h
+    for level in chain:
+        parent = cv2.imread(level["path"])
+        if parent is None:
+            return None
+        if (rw, rh) == (frame_w, frame_h):
+            small = frame.scaled(CHAIN_SCALE)  # Whole frame: shared with every other chain
+        else:
+            region = screen[ry:ry + rh, rx:rx + rw]
+            small = cv2.resize(region, (max(1, round(rw * CHAIN_SCALE)), max(1, round(rh * CHAIN_SCALE))),
+                               interpolation=cv2.INTER_AREA)
+        found = match_template(small, parent, CHAIN_MIN_CONFIDENCE)
+        if not found:
+            return None
+        center_x = rx + round(found[0] / CHAIN_SCALE)
+        center_y = ry + round(found[1] / CHAIN_SCALE)
+        # Next search region: the found ancestor plus a margin for layout drift
+        margin_x = level["width"] // 10 + 8
+        margin_y = level["height"] // 10 + 8
+        x0 = max(0, center_x - level["width"] // 2 - margin_x)
+        y0 = max(0, center_y - level["height"] // 2 - margin_y)
+        x0, y0 = x0 - x0 % step, y0 - y0 % step
+        x1 = min(frame_w, center_x + level["width"] // 2 + margin_x)
+        y1 = min(frame_h, center_y + level["height"] // 2 + margin_y)
+        rx, ry, rw, rh = x0, y0, x1 - x0, y1 - y0
+    
+    found = match_template(screen[ry:ry + rh, rx:rx + rw], template, min_confidence, floor)
+    if not found:
+        return None
+    return (found[0] + rx, found[1] + ry, found[2])
+
+def scroll_offset(prev, cur) -> Optional[int]:
+    """
+    How far content moved up between two frames (negative: down), from the best
+    textured band in the middle half of prev found again in cur. The middle
+    avoids sticky headers and footers. None if the band is not found confidently.
+    """
+    import cv2
+    import numpy as np
+    
+    prev, cur = as_frame(prev), pixels(cur)
+    height = prev.shape[0]
+    if cur.shape != prev.shape or height < SCROLL_BAND * 4:
+        return None
+    starts = range(height // 4, 3 * height // 4 - SCROLL_BAND, SCROLL_BAND // 2)
+    gray = prev.gray()
+    top = max(starts, key=lambda y: float(np.std(gray[y:y + SCROLL_BAND])))
+    scores = cv2.matchTemplate(cur, prev.image[top:top + SCROLL_BAND], cv2.TM_CCOEFF_NORMED)
+    _, best, _, (_, found_y) = cv2.minMaxLoc(scores)
+    if best < SCROLL_MIN_OVERLAP:
+        return None
+    return top - found_y
+
+def scroll_search(frame, template, recapture, scroll, min_confidence: float = 0.5,
+                  max_steps: int = SCROLL_MAX_STEPS, max_ms: int = SCROLL_MAX_MS,
+                  floor: Optional[float] = None) -> tuple:
+    """
+    Scroll until the template appears, matching only what each step revealed.
+    
+    recapture() returns a fresh frame path; scroll(clicks) scrolls the target
+    (negative: down). Scrolls down first; if the page is already at the end,
+    turns around once and scrolls up. Stops when found, at the end of the page,
+    or after max_steps / max_ms. floor (a learned threshold) replaces the
+    confidence descent, as in match_template.
+    Returns (match, frame_path, image, info): match is (x, y, confidence) in
+    the last frame, captured to frame_path and decoded as image (both None if
+    no step ran); info has steps, scrolled_px, end_of_page and per-step strip sizes.
+    """
+    import cv2
+    
+    th = template.shape[0]
+    started = time.perf_counter()
+    direction = -1
+    turned = False
+    info = {"steps": 0, "scrolled_px": 0, "end_of_page": False, "strips": []}
+    frame_path = image = None
+    while info["steps"] < max_steps and (time.perf_counter() - started) * 1000 < max_ms:
+        with stage("input"):
+            scroll(direction * SCROLL_STEP_CLICKS)
+        with stage("capture"):
+            frame_path = recapture()
+        current = as_frame(cv2.imread(str(frame_path)))
+        image = current.image
+        info["steps"] += 1
+        moved = scroll_offset(frame, current)
+        
+        if moved == 0:
+            if info["scrolled_px"] == 0 and not turned:
+                turned, direction = True, 1  # Started at the bottom: look above instead
+                continue
+            info["end_of_page"] = True
+            break
+        height = current.shape[0]
+        if moved is None:
+            y0, y1 = 0, height  # Unknown distance: search the whole frame
+        elif moved > 0:
+            y0, y1 = max(0, height - moved - th), height  # New rows at the bottom
+        else:
+            y0, y1 = 0, min(height, -moved + th)           # New rows at the top
+        info["scrolled_px"] += abs(moved or 0)
+        info["strips"].append([y0, y1])
+        with stage("match"):
+            found = match_template(current.image[y0:y1], template, min_confidence, floor)
+        if found:
+            info["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return (found[0], found[1] + y0, found[2]), frame_path, image, info
+        frame = current
+    info["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return None, frame_path, image, info
+
+def find_anchor(frame, x: int, y: int, width: int, height: int) -> Optional[dict]:
+    """
+    Pick the smallest distinctive patch around the center of a viewport.
+    
+    Candidate squares of ANCHOR_SIZES, centered on the viewport center and
+    clipped to it, are self-correlated against the whole frame; the first one
+    whose runner-up peak is clearly below its own match is unique enough.
+    Candidates are screened on a half-resolution grayscale frame and only the
+    winner is confirmed at full resolution.
+    Returns the anchor rect (frame coordinates) plus the offset from the anchor
+    center to the viewport center, or None if nothing smaller is unique.
+    """
+    import cv2
+    
+    def runner_up_gap(image, patch):
+        scores = cv2.matchTemplate(image, patch, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+        # Suppress the best peak's neighbourhood, then look for a runner-up
+        ph, pw = patch.shape[:2]
+        scores[max(0, by - ph // 2):by + ph // 2 + 1, max(0, bx - pw // 2):bx + pw // 2 + 1] = -1
+        runner_up = float(scores.max())
+        return best - runner_up >= ANCHOR_MIN_GAP and runner_up <= ANCHOR_MAX_RUNNER_UP, runner_up
+    
+    small = as_frame(frame).pyramid(1)
+    frame = pixels(frame)
+    center_x = x + width // 2
+    center_y = y + height // 2
+    for size in ANCHOR_SIZES:
+        aw, ah = min(size, width), min(size, height)
+        if aw == width and ah == height:
+            break  # No smaller than the full viewport
+        ax = min(max(x, center_x - aw // 2), x + width - aw)
+        ay = min(max(y, center_y - ah // 2), y + height - ah)
+        patch = frame[ay:ay + ah, ax:ax + aw]
+        if patch.std() < ANCHOR_MIN_STD:
+            continue
+        
+        unique, _ = runner_up_gap(small, small[ay // 2:(ay + ah) // 2, ax // 2:(ax + aw) // 2])
+        if not unique:
+            continue
+        unique, runner_up = runner_up_gap(frame, patch)
+        if unique:
+            return {
+                "x": ax, "y": ay, "width": aw, "height": ah,
+                "offset_x": center_x - (ax + aw // 2),
+                "offset_y": center_y - (ay + ah // 2),
+                "runner_up": round(runner_up, 3)
+            }
+    return None
+
+def save_template(name: str, anchor: bool = False) -> dict:
+    """
+    Save current viewport as a reusable template.
+    
+    With anchor, the template is the smallest distinctive patch around the
+    viewport center (plus the offset from it to the target); the full viewport
+    crop is kept in CROPS_DIR for debugging.
+    """
+    state = ViewportState.load()
+    if not state:
+        return {"success": False, "error": "No active session. Run: zoomclick --start"}
+    
+    # Capture only what the save needs: the viewport and the zoom chain's
+    # ancestors (nested, so the outermost covers the rest). An anchor must be
+    # unique in the whole capture, so that still takes everything.
+    if anchor:
+        region = (0, 0) + capture_size(state)
     else:
-        screenshot_path = take_screenshot("full")
+        x0, y0, w, h = viewport_rect(state)
+        x1, y1 = x0 + w, y0 + h
+        for _, cx, cy, cw, ch in chain_rects(state):
+            x0, y0, x1, y1 = min(x0, cx), min(y0, cy), max(x1, cx + cw), max(y1, cy + ch)
+        region = (x0, y0, x1 - x0, y1 - y0)
+    with stage("capture"):
+        screenshot_path, capture = capture_region(state, region, "save")
+    rx, ry = region[:2]
     
     # Add timestamp to avoid name collisions
     timestamp = int(time.time())
@@ -376,7 +1051,22 @@ def save_template(name: str) -> dict:
     template_path = TEMPLATES_DIR / f"{full_name}.png"
     meta_path = TEMPLATES_DIR / f"{full_name}.json"
     
-    crop_image(screenshot_path, state.x, state.y, state.width, state.height, template_path)
+    # Crop into the work dir first so a duplicate never touches the templates dir
+    crop_path = WORK_DIR / f"save_{full_name}.png"
+    crop_image(screenshot_path, state.x - rx, state.y - ry, state.width, state.height, crop_path)
+    
+    anchor_rect = None
+    if anchor:
+        import cv2
+        frame = cv2.imread(str(screenshot_path))
+        anchor_rect = find_anchor(frame, state.x, state.y, state.width, state.height)
+        if anchor_rect:
+            full_crop_path = crop_path
+            crop_path = WORK_DIR / f"save_{full_name}_anchor.png"
+            ax, ay = anchor_rect["x"], anchor_rect["y"]
+            cv2.imwrite(str(crop_path), frame[ay:ay + anchor_rect["height"], ax:ax + anchor_rect["width"]])
+    
+    hashes = image_hashes(crop_path)
     
     # Save metadata - viewport center + screen-absolute coordinates
     viewport_center_x = state.x + state.width // 2
@@ -384,6 +1074,60 @@ def save_template(name: str) -> dict:
     screen_center_x = viewport_center_x + state.window_offset_x
     screen_center_y = viewport_center_y + state.window_offset_y
     
+    # Deduplicate against earlier saves of the same element
+    near_duplicates = []
+    for existing in load_templates():
+        existing_meta = existing["meta"]
+        if existing_meta.get("base_name") != name:
+            continue
+        if existing_meta.get("content_hash") == hashes["content_hash"]:
+            # Identical pixels: keep the existing pair, refresh its fallback coordinates
+            crop_path.unlink()
+            if anchor_rect:
+                full_crop_path.unlink()
+            existing_meta.update({
+                "viewport_x": viewport_center_x,
+                "viewport_y": viewport_center_y,
+                "center_x": screen_center_x,
+                "center_y": screen_center_y,
+                "window_id": state.window_id,
+                "window_offset_x": state.window_offset_x,
+                "window_offset_y": state.window_offset_y,
+                "viewport": state.to_dict(),
+                "last_saved": timestamp,
+            })
+            with open(existing["meta_path"], 'w') as f:
+                json.dump(existing_meta, f, indent=2)
+            return {
+                "success": True,
+                "action": "save",
+                "deduplicated": True,
+                "name": existing["name"],
+                "base_name": name,
+                "template_path": str(existing["path"]),
+                "viewport_coords": {"x": viewport_center_x, "y": viewport_center_y},
+                "screen_coords": {"x": screen_center_x, "y": screen_center_y},
+                "timing": capture,
+                "instructions": f'Identical template already saved as "{existing["name"]}". Use: zoomclick --click "{existing["name"]}"'
+            }
+        if phash_distance(existing_meta.get("phash"), hashes["phash"]) <= NEAR_DUPLICATE_DISTANCE:
+            near_duplicates.append(existing["name"])
+    
+    crop_path.replace(template_path)
+    if anchor_rect:
+        CROPS_DIR.mkdir(exist_ok=True)
+        full_crop_path.replace(CROPS_DIR / f"{full_name}.png")
+    
+    chain = []
+    if state.history:
+        try:
+            import cv2
+            frame = cv2.imread(str(screenshot_path))
+            if frame is not None:
+                chain = save_chain(frame, state, full_name, (rx, ry))
+        except ImportError:
+            pass
+    
     meta = {
         "name": full_name,
         "base_name": name,
@@ -395,6 +1139,11 @@ def save_template(name: str) -> dict:
         "window_offset_x": state.window_offset_x,
         "window_offset_y": state.window_offset_y,
         "viewport": state.to_dict(),
+        "content_hash": hashes["content_hash"],
+        "phash": hashes["phash"],
+        "anchor": anchor_rect,
+        "chain": chain,
+        "cdp_port": state.cdp_port,
         "created": timestamp,
         "note": "Template saved for future clicking. Use: zoomclick --click " + full_name
     }
@@ -410,6 +1159,7 @@ def save_template(name: str) -> dict:
         "template_path": str(template_path),
         "viewport_coords": {"x": viewport_center_x, "y": viewport_center_y},
         "screen_coords": {"x": screen_center_x, "y": screen_center_y},
+        "timing": capture,
         "instructions": f"""
 Template "{full_name}" saved!
 - Image: {template_path}
@@ -422,11 +1172,73 @@ The tool will find the template on screen and click its center.
 """.strip()
     }
     
+    if anchor:
+        result["anchor"] = anchor_rect
+        if anchor_rect:
+            result["full_crop_path"] = str(CROPS_DIR / f"{full_name}.png")
+        else:
+            result["note"] = "No smaller unique anchor found; saved the full viewport"
+    
+    if near_duplicates:
+        result["near_duplicates"] = near_duplicates
+        # Own key: "note" may already explain the anchor
+        result["compact_note"] = "Near-identical versions exist. Run: zoomclick --compact"
+    
     if state.window_id:
         result["window_id"] = state.window_id
     
     return result
 
+def confidence_floor(min_confidence: float) -> Optional[float]:
+    """
+    Lowest threshold the adaptive descent (1.0, 0.9, 0.8, ...) reaches before
+    dropping below min_confidence. None if even 1.0 is below it.
+    """
+    floor = None
+    confidence = 1.0
+    while confidence >= min_confidence:
+        floor = confidence
+        confidence -= 0.1
+    return floor
+
+def match_template(screen, template, min_confidence: float = 0.5,
+                   floor: Optional[float] = None) -> Optional[Tuple[int, int, float]]:
+    """
+    Match a template against a screen image (numpy arrays) with TM_CCOEFF_NORMED.
+    
+    One matchTemplate pass: the best score is compared against the floor of the
+    adaptive confidence descent, which accepts exactly what the descent would.
+    An explicit floor (a template's learned threshold) replaces the descent.
+    Returns (center_x, center_y, confidence) relative to screen, or None.
+    """
+    import cv2
+    
+    screen = pixels(screen)
+    h, w = template.shape[:2]
+    if screen.shape[0] < h or screen.shape[1] < w:
+        return None
+    result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+    
+    if floor is None:
+        floor = confidence_floor(min_confidence)
+    if floor is None or max_val < floor:
+        return None
+    return (max_loc[0] + w // 2, max_loc[1] + h // 2, float(max_val))
+
+def probe_last_hit(screen, template, last_hit: dict, early_exit: float) -> Optional[Tuple[int, int, float]]:
+    """Match only around where the template was last clicked, accepting at its early-exit score."""
+    screen = pixels(screen)
+    h, w = template.shape[:2]
+    x0 = max(0, last_hit["x"] - w // 2 - PROBE_MARGIN)
+    y0 = max(0, last_hit["y"] - h // 2 - PROBE_MARGIN)
+    x1 = min(screen.shape[1], last_hit["x"] + w - w // 2 + PROBE_MARGIN)
+    y1 = min(screen.shape[0], last_hit["y"] + h - h // 2 + PROBE_MARGIN)
+    found = match_template(screen[y0:y1, x0:x1], template, floor=early_exit)
+    if not found:
+        return None
+    return (found[0] + x0, found[1] + y0, found[2])
+
 def find_template_on_screen(template_path: Path, screenshot_path: Path, min_confidence: float = 0.5) -> Optional[Tuple[int, int, float]]:
     """Find template on screen using OpenCV. Returns (center_x, center_y, confidence) or None."""
     try:
@@ -441,24 +1253,85 @@ def find_template_on_screen(template_path: Path, screenshot_path: Path, min_conf
     if screen is None or template is None:
         return None
     
-    # Adaptive confidence matching
-    confidence = 1.0
-    while confidence >= min_confidence:
-        result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-        
-        if max_val >= confidence:
-            h, w = template.shape[:2]
-            center_x = max_loc[0] + w // 2
-            center_y = max_loc[1] + h // 2
-            return (center_x, center_y, max_val)
-        
-        confidence -= 0.1
+    return match_template(screen, template, min_confidence)
+
+def dirty_regions(dirty: list, shape: tuple, template_size: Tuple[int, int]) -> list:
+    """
+    Merge dirty tiles into row runs and expand each by the template size, so any
+    placement of the template overlapping a changed tile is searched.
+    Returns (x, y, w, h) regions in frame coordinates.
+    """
+    height, width = shape[:2]
+    tw, th = template_size
+    rows = {}
+    for r, c in sorted(dirty):
+        runs = rows.setdefault(r, [])
+        if runs and runs[-1][1] == c - 1:
+            runs[-1][1] = c
+        else:
+            runs.append([c, c])
+    
+    regions = []
+    for r, runs in rows.items():
+        for c0, c1 in runs:
+            x0 = max(0, c0 * TILE - tw)
+            y0 = max(0, r * TILE - th)
+            x1 = min(width, (c1 + 1) * TILE + tw)
+            y1 = min(height, (r + 1) * TILE + th)
+            regions.append((x0, y0, x1 - x0, y1 - y0))
+    return regions
+
+def find_template_cached(screen, template, template_hash: str, min_confidence: float = 0.5,
+                         roi: str = "root", cache: Optional[MatchCache] = None,
+                         floor: Optional[float] = None) -> Tuple[Optional[Tuple[int, int, float]], str]:
+    """
+    match_template with memoization keyed by (template hash, mode, ROI).
     
-    return None
+    Returns (match, status) where status is "hit" (reused), "partial" (only
+    changed tiles re-matched) or "miss" (full match).
+    """
+    cache = cache or MatchCache()
+    th, tw = template.shape[:2]
+    if floor is None:
+        floor = confidence_floor(min_confidence)
+    key = MatchCache.key(template_hash, f"ccoeff_normed>={floor}", roi)
+    frame = as_frame(screen)
+    tiles = frame.tile_hashes()
+    screen = frame.image
+    status, match, dirty = cache.lookup(key, screen.shape, tiles)
+    
+    if status == "partial" and len(dirty) * 2 > len(tiles) * len(tiles[0]):
+        status = "miss"  # Most of the frame changed; a full pass is cheaper
+    
+    if status == "partial":
+        for x, y, w, h in dirty_regions(dirty, screen.shape, (tw, th)):
+            found = match_template(screen[y:y + h, x:x + w], template, min_confidence, floor)
+            if found and (match is None or found[2] > match[2]):
+                match = (found[0] + x, found[1] + y, found[2])
+    elif status == "miss":
+        match = match_template(screen, template, min_confidence, floor)
+    
+    if status == "hit":
+        cache.hits += 1
+    else:
+        cache.misses += 1
+        cache.store(key, screen.shape, tiles, match, (tw, th))
+    cache.save()
+    return (tuple(match) if match else None), status
 
-def click_template(name: str, no_click: bool = False) -> dict:
-    """Find saved template on screen and click it."""
+def click_template(name: str, no_click: bool = False, verify: Optional[dict] = None,
+                   scroll: Optional[dict] = None) -> dict:
+    """
+    Find saved template on screen and click it.
+    
+    Templates saved from a window are searched only inside that window, at its
+    live position and size (so moved/resized windows still click correctly).
+    The full screen is searched only if the window no longer exists.
+    
+    verify: optional {"timeout_ms": int, "retry": bool} to confirm the UI reacted.
+    scroll: optional {"max_steps": int} to scroll the target looking for a
+    template that is not visible (instead of falling back to saved coordinates).
+    """
     template_path = TEMPLATES_DIR / f"{name}.png"
     meta_path = TEMPLATES_DIR / f"{name}.json"
     
@@ -471,19 +1344,142 @@ def click_template(name: str, no_click: bool = False) -> dict:
         with open(meta_path) as f:
             meta = json.load(f)
     
-    # Take screenshot
-    screenshot_path = take_screenshot("click")
-    
-    # Try to find template
-    match = find_template_on_screen(template_path, screenshot_path)
+    # Missed repeatedly and not seen for a long time: don't pay for another miss
+    if not scroll and is_stale(meta):
+        return {
+            "success": False,
+            "error": f"Template is stale: {name} ({meta['health']['misses']} misses in a row). "
+                     f"Save it again, or check it with: zoomclick --revalidate",
+            "health": {**meta["health"], "stale": True}
+        }
+    
+    timing = {}
+    started = time.perf_counter()
+    
+    with stage("capture"):
+        # Re-read the saved window's geometry live; empty if the window is gone
+        window_id = meta.get("window_id") or 0
+        window_geo = get_window_geometry(window_id) if window_id else {}
+        offset_x, offset_y = window_geo.get("X", 0), window_geo.get("Y", 0)
+    
+        # Templates saved in a --cdp session are searched in a fresh page capture
+        page = None
+        cdp_port = meta.get("cdp_port") or 0
+        if cdp_port:
+            try:
+                screenshot_path, _ = take_screenshot_page(cdp_port, "click")
+                page = page_geometry(cdp_port, window_geo or None)
+                offset_x, offset_y = page["origin_x"], page["origin_y"]
+                roi = f"cdp:{cdp_port}"
+            except StageTimeout:
+                raise
+            except (RuntimeError, OSError):
+                page = None  # Browser gone or DevTools closed: capture from X instead
+    
+        # Otherwise take screenshot (only the template's window when it still exists)
+        if not page:
+            if window_geo:
+                screenshot_path = take_screenshot_window(window_id, "click")
+                roi = f"window:{window_id}"
+            else:
+                screenshot_path = take_screenshot("click")
+                roi = "root"
+    timing["capture_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    
+    # Try to find template (memoized against unchanged screen tiles), with its
+    # learned thresholds once it has enough confirmed hits
+    match = None
+    search = None
+    learned = learned_thresholds(meta)
+    accept = learned["accept"] if learned else None
+    try:
+        import cv2
+        screen = cv2.imread(str(screenshot_path))
+        template = cv2.imread(str(template_path))
+    except ImportError:
+        screen = template = None
+    if screen is not None and template is not None:
+        # One Frame for probe, chain and full search: derived images are built once
+        screen = Frame(screen)
+        with stage("match"):
+            match_started = time.perf_counter()
+            cache = MatchCache()
+            template_hash = meta.get("content_hash") or image_hashes(template_path)["content_hash"]
+            last_hit = (meta.get("health") or {}).get("last_hit")
+            if learned and last_hit and last_hit.get("roi") == roi:
+                # Still where it was last clicked, scoring as usual: no wider search needed
+                match = probe_last_hit(screen, template, last_hit, learned["early_exit"])
+                search = "probe"
+            if not match and meta.get("chain"):
+                # Coarse-to-fine through the saved zoom chain disambiguates repeated elements
+                match = locate_hierarchical(screen, template, meta["chain"], floor=accept)
+                search = "hierarchical"
+            if not match:
+                match, cache_status = find_template_cached(screen, template, template_hash, roi=roi, cache=cache,
+                                                           floor=accept)
+                search = "full"
+                timing["cache"] = cache_status
+            timing["match_ms"] = round((time.perf_counter() - match_started) * 1000, 1)
+            timing["search"] = search
+            timing["cache_hits"] = cache.hits
+            timing["cache_misses"] = cache.misses
+            timing["frame"] = screen.stats()
+        if not match and scroll:
+            def recapture():
+                if page:
+                    return take_screenshot_page(cdp_port, "scroll")[0]
+                if window_geo:
+                    return take_screenshot_window(window_id, "scroll")
+                return take_screenshot("scroll")
+            
+            frame_h, frame_w = screen.shape[:2]
+            scroll_x, scroll_y = offset_x + frame_w // 2, offset_y + frame_h // 2
+            if pyautogui is None:
+                raise RuntimeError(f"Input needs a display: {PYAUTOGUI_ERROR}")
+            match, last_path, last_image, timing["scroll"] = scroll_search(
+                screen, template, recapture,
+                lambda clicks: run_input([lambda: pyautogui.scroll(clicks, x=scroll_x, y=scroll_y)]),
+                max_steps=scroll["max_steps"], floor=accept)
+            if last_path:
+                # The match (or miss) refers to the last scrolled frame: record that one
+                screenshot_path, screen = last_path, Frame(last_image)
+            search = "scroll" if match else search
+        if recording_active():
+            record_match("zoomclick", name, screen.image, screenshot_path, template, meta.get("chain"), roi,
+                         accept or 0.5, match, search, {"capture_ms": timing["capture_ms"], "match_ms": timing["match_ms"]})
+        if meta_path.exists():
+            anchor_rect = meta.get("anchor") or {}
+            moved = None
+            if match and search != "scroll":
+                moved = drift(meta, match[0] + anchor_rect.get("offset_x", 0),
+                              match[1] + anchor_rect.get("offset_y", 0), bool(window_geo or page))
+            update_health(meta, match[2] if match else None, bool(match), moved)
+            write_meta(meta_path, meta)
     
     if match:
         x, y, conf = match
-        method = "template_match"
+        x, y = x + offset_x, y + offset_y
+        if meta.get("anchor"):
+            # Anchor templates click at the saved offset from the anchor center
+            x += meta["anchor"]["offset_x"]
+            y += meta["anchor"]["offset_y"]
+        method = {"hierarchical": "hierarchical_match", "scroll": "scroll_search",
+                  "probe": "last_hit_probe"}.get(search, "template_match")
+    elif scroll:
+        # Scrolled through without finding it: saved coordinates would be stale
+        return {
+            "success": False,
+            "error": f"Template not found while scrolling: {name}",
+            "screenshot": str(screenshot_path),
+            "timing": timing
+        }
     else:
-        # Fallback to saved coordinates
+        # Fallback to saved coordinates (shifted with the window/page if it moved)
         x = meta.get("center_x")
         y = meta.get("center_y")
+        if (window_geo or page) and x is not None and y is not None:
+            x += offset_x - meta.get("window_offset_x", 0)
+            y += offset_y - meta.get("window_offset_y", 0)
         conf = 0.0
         method = "saved_coords"
         
@@ -494,11 +1490,21 @@ def click_template(name: str, no_click: bool = False) -> dict:
                 "screenshot": str(screenshot_path)
             }
     
+    verification = None
+    input_metrics = None
     if not no_click:
-        pyautogui.moveTo(x, y, duration=0.25)
-        pyautogui.click(x, y)
+        if verify:
+            with stage("verify"):
+                verification = click_and_verify(x, y, **verify)
+        else:
+            with stage("input"):
+                input_metrics = click_input(x, y)
+        if match and meta_path.exists() and (verification is None or verification.get("reacted")):
+            # A confirmed hit: its score feeds the template's learned thresholds
+            record_hit(meta, match[2], match[0], match[1], roi)
+            write_meta(meta_path, meta)
     
-    return {
+    result = {
         "success": True,
         "action": "click" if not no_click else "locate",
         "name": name,
@@ -506,11 +1512,360 @@ def click_template(name: str, no_click: bool = False) -> dict:
         "y": y,
         "confidence": round(conf, 3) if conf else None,
         "method": method,
-        "screenshot": str(screenshot_path)
+        "screenshot": str(screenshot_path),
+        "timing": timing
     }
+    if window_id:
+        result["window_id"] = window_id
+        if window_geo:
+            result["window_position"] = {"x": offset_x, "y": offset_y}
+        else:
+            result["note"] = "Saved window no longer exists; searched the full screen"
+    if page:
+        result["page_origin"] = {"x": offset_x, "y": offset_y}
+    if verification:
+        result["verify"] = verification
+    if input_metrics:
+        result["input"] = input_metrics
+    if learned:
+        result["thresholds"] = learned
+    return result
 
-def click_center(no_click: bool = False) -> dict:
-    """Click the center of current viewport without saving."""
+def click_template_across(name: str, window: str = None, window_class: str = None, all_screens: bool = False,
+                          all_hits: bool = False, no_click: bool = False, verify: Optional[dict] = None) -> dict:
+    """
+    Search a saved template in several windows and/or monitors at once.
+    
+    Every window matching window/window_class (not just the first) and, with
+    all_screens, every monitor is a target. Windows are captured concurrently;
+    monitors are sliced from one capture of the whole screen. Each target is
+    matched in its own worker (OpenCV releases the GIL) and hits are mapped to
+    screen coordinates with the target's offset. The best hit is clicked;
+    all_hits reports every target's hit, strongest first.
+    
+    Like --click, a stale template is refused, each target's lookup goes into
+    the open recording, and the template's health is updated once with the
+    best hit (a template missing from some of the targets is not a miss).
+    """
+    import cv2
+    
+    template_path = TEMPLATES_DIR / f"{name}.png"
+    meta_path = TEMPLATES_DIR / f"{name}.json"
+    template = cv2.imread(str(template_path))
+    if template is None:
+        return {"success": False, "error": f"Template not found: {name}. Run: zoomclick --list"}
+    meta = {}
+    if meta_path.exists():
+        with open(meta_path) as f:
+            meta = json.load(f)
+    if is_stale(meta):
+        return {
+            "success": False,
+            "error": f"Template is stale: {name} ({meta['health']['misses']} misses in a row). "
+                     f"Save it again, or check it with: zoomclick --revalidate",
+            "health": {**meta["health"], "stale": True}
+        }
+    learned = learned_thresholds(meta)
+    accept = learned["accept"] if learned else None
+    anchor_rect = meta.get("anchor") or {}
+    
+    started = time.perf_counter()
+    with stage("capture"):
+        window_ids = []
+        if window:
+            window_ids += find_window_by_name(window)
+        if window_class:
+            window_ids += [wid for wid in find_window_by_class(window_class) if wid not in window_ids]
+        screens = list_screens() if all_screens else []
+    if not window_ids and not screens:
+        target = f"window matching: {window}" if window else f"window with class: {window_class}" if window_class \
+            else "target: use --window/--window-class with --all-windows, or --all-screens"
+        return {"success": False, "error": f"No {target}"}
+    
+    def search(target: dict) -> dict:
+        target_started = time.perf_counter()
+        if "window_id" in target:
+            geo = get_window_geometry(target["window_id"])
+            if not geo:
+                return {**target, "error": "window not found"}
+            try:
+                frame_path = take_screenshot_window(target["window_id"], f"across_{target['window_id']}")
+            except RuntimeError as e:
+                return {**target, "error": str(e)}  # Unmapped windows cannot be captured
+            frame = cv2.imread(str(frame_path))
+            offset_x, offset_y = geo.get("X", 0), geo.get("Y", 0)
+        else:
+            frame, frame_path = target.pop("frame"), None
+            offset_x, offset_y = target.pop("origin")
+        capture_ms = round((time.perf_counter() - target_started) * 1000, 1)
+        match_started = time.perf_counter()
+        found = match_template(frame, template, floor=accept) if frame is not None else None
+        hit = {**target, "capture_ms": capture_ms, "match_ms": round((time.perf_counter() - match_started) * 1000, 1)}
+        if recording_active() and frame is not None:
+            # Recorded after the workers finish, one event per target
+            hit["recorded"] = (frame, frame_path, found)
+        if found:
+            hit.update(x=found[0] + offset_x + anchor_rect.get("offset_x", 0),
+                       y=found[1] + offset_y + anchor_rect.get("offset_y", 0),
+                       confidence=round(found[2], 3))
+            # Position in the capture --click uses for this roi (the window, or the whole screen)
+            hit["local"] = (found[0], found[1]) if "window_id" in target else (found[0] + offset_x, found[1] + offset_y)
+        return hit
+    
+    with stage("match"):
+        targets = [{"window_id": wid} for wid in window_ids]
+        if screens:
+            shared = shared_frame()
+            full = shared[0] if shared else grab_screen()
+            for number, s in enumerate(screens):
+                targets.append({"screen": number, "origin": (s["x"], s["y"]),
+                                "frame": full[s["y"]:s["y"] + s["height"], s["x"]:s["x"] + s["width"]]})
+        with ThreadPoolExecutor(max_workers=min(len(targets), os.cpu_count() or 2)) as pool:
+            results = list(pool.map(search, targets))
+    for r in results:
+        if "recorded" in r:
+            frame, frame_path, found = r.pop("recorded")
+            roi = f"window:{r['window_id']}" if "window_id" in r else f"screen:{r['screen']}"
+            record_match("zoomclick", name, frame, frame_path, template, meta.get("chain"), roi, accept or 0.5,
+                         found, "across", {"capture_ms": r["capture_ms"], "match_ms": r["match_ms"]})
+    hits = sorted((r for r in results if "confidence" in r), key=lambda r: r["confidence"], reverse=True)
+    timing = {
+        "wall_ms": round((time.perf_counter() - started) * 1000, 1),
+        "targets_ms": round(sum(r.get("capture_ms", 0) + r.get("match_ms", 0) for r in results), 1),
+        "targets": len(results)
+    }
+    if meta_path.exists():
+        moved = None
+        if hits and hits[0].get("window_id", 0) == (meta.get("window_id") or 0):
+            # Drift only means something in the capture the template was saved from
+            local_x, local_y = hits[0]["local"]
+            moved = drift(meta, local_x + anchor_rect.get("offset_x", 0), local_y + anchor_rect.get("offset_y", 0),
+                          "window_id" in hits[0])
+        update_health(meta, hits[0]["confidence"] if hits else None, bool(hits), moved)
+        write_meta(meta_path, meta)
+    if not hits:
+        return {"success": False, "error": f"Template not found in any target: {name}",
+                "searched": results, "timing": timing}
+    
+    best = hits[0]
+    verification = None
+    input_metrics = None
+    if not no_click:
+        if verify:
+            with stage("verify"):
+                verification = click_and_verify(best["x"], best["y"], **verify)
+        else:
+            with stage("input"):
+                input_metrics = click_input(best["x"], best["y"])
+        if meta_path.exists() and (verification is None or verification.get("reacted")):
+            roi = f"window:{best['window_id']}" if "window_id" in best else "root"
+            record_hit(meta, best["confidence"], *best["local"], roi)
+            write_meta(meta_path, meta)
+    for hit in hits:
+        del hit["local"]
+    
+    result = {
+        "success": True,
+        "action": "click" if not no_click else "locate",
+        "name": name,
+        "x": best["x"],
+        "y": best["y"],
+        "confidence": best["confidence"],
+        "method": "multi_target_match",
+        "target": {k: v for k, v in best.items() if k in ("window_id", "screen")},
+        "timing": timing
+    }
+    if all_hits:
+        result["hits"] = hits
+        result["misses"] = [r for r in results if "confidence" not in r]
+    if verification:
+        result["verify"] = verification
+    if input_metrics:
+        result["input"] = input_metrics
+    return result
+
+def click_input(x: int, y: int) -> dict:
+    """Move to and click screen (x, y) as one input job. Returns the job's queue metrics."""
+    if pyautogui is None:
+        raise RuntimeError(f"Input needs a display: {PYAUTOGUI_ERROR}")
+    return run_input([lambda: pyautogui.moveTo(x, y, duration=0.25), lambda: pyautogui.click(x, y)])
+
+def click_and_verify(x: int, y: int, timeout_ms: int = 2000, retry: bool = False) -> dict:
+    """
+    Click at screen (x, y) and watch a small region around it for a UI reaction.
+    
+    The region is snapshotted after the pointer arrives (so hover effects are
+    not mistaken for a reaction), then polled with cheap diffs until it changes
+    or timeout_ms passes. With retry, clicks once more if nothing reacted.
+    
+    Returns: reacted, latency_ms (click to first change), changed_box
+    (screen-absolute), attempts, input (queue metrics per click job).
+    
+    The hover snapshot is taken inside the first input job so no other agent
+    can move the pointer between it and the click; polling runs outside it.
+    """
+    import numpy as np
+    import cv2
+    
+    if pyautogui is None:
+        raise RuntimeError(f"Input needs a display: {PYAUTOGUI_ERROR}")
+    screen_w, screen_h = get_screen_size()
+    rw, rh = min(VERIFY_REGION_W, screen_w), min(VERIFY_REGION_H, screen_h)
+    rx = min(max(0, x - rw // 2), screen_w - rw)
+    ry = min(max(0, y - rh // 2), screen_h - rh)
+    
+    snapshot = {}
+    jobs = []
+    
+    def hover():
+        pyautogui.moveTo(x, y, duration=0.25)
+        snapshot["before"] = grab_region(rx, ry, rw, rh)
+    
+    def click():
+        pyautogui.click(x, y)
+        snapshot["clicked_at"] = time.perf_counter()
+        snapshot["clicked_ns"] = time.time_ns()
+    
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            jobs.append(run_input([hover, click] if attempts == 1 else [lambda: pyautogui.moveTo(x, y), click]))
+        except StageTimeout as e:
+            if not jobs:
+                raise  # Nothing clicked yet: safe to retry
+            # The first click went through: report it rather than fail the command
+            return {"reacted": False, "latency_ms": None, "changed_box": None, "attempts": attempts - 1,
+                    "input": jobs, "warning": str(e)}
+        before = snapshot["before"]
+        clicked_at = snapshot["clicked_at"]
+        clicked_ns = snapshot["clicked_ns"]
+        deadline = clicked_at + timeout_ms / 1000
+        while True:
+            try:
+                after = grab_region(rx, ry, rw, rh, newer_than_ns=clicked_ns)
+            except StageTimeout as e:
+                # Out of time after the click: it happened, so report it instead of failing
+                return {"reacted": None, "latency_ms": None, "changed_box": None,
+                        "attempts": attempts, "input": jobs, "warning": str(e)}
+            changed = cv2.absdiff(before, after).max(axis=2) > DIFF_THRESHOLD
+            if changed.mean() >= VERIFY_MIN_RATIO:
+                ys, xs = np.nonzero(changed)
+                return {
+                    "reacted": True,
+                    "latency_ms": round((time.perf_counter() - clicked_at) * 1000, 1),
+                    "changed_box": [rx + int(xs.min()), ry + int(ys.min()),
+                                    int(xs.max() - xs.min()) + 1, int(ys.max() - ys.min()) + 1],
+                    "change_ratio": round(float(changed.mean()), 4),
+                    "attempts": attempts,
+                    "input": jobs
+                }
+            if time.perf_counter() >= deadline:
+                break
+            time.sleep(VERIFY_POLL_S)
+        if not retry or attempts >= 2:
+            return {"reacted": False, "latency_ms": None, "changed_box": None,
+                    "timeout_ms": timeout_ms, "attempts": attempts, "input": jobs}
+
+def replay_session(archive: str, engine: str = "default") -> dict:
+    """
+    Re-run template matching over a recorded session archive (no display needed).
+    
+    engine: default (as --click: zoom chain first, then the memoized full
+    search), full (one plain matchTemplate pass), hierarchical (zoom chain
+    when recorded, else full) or cached (memoized full search, cache starting
+    empty and carried across the archive's events).
+    Reports match latency distributions (replayed and recorded) and every event
+    whose location moved more than REPLAY_TOLERANCE_PX or whose found/not-found
+    outcome changed. Events recorded against the same frame share its derived
+    images (frames.py), as lookups against one capture do live.
+    """
+    import cv2
+    
+    if engine not in REPLAY_ENGINES:
+        return {"success": False, "error": f"Unknown engine: {engine}. Use one of: {', '.join(REPLAY_ENGINES)}"}
+    with open_archive(Path(archive)) as (root, session, events):
+        cache = MatchCache(root / "replay_cache.json")
+        images = {}
+        
+        def load(kind, key):
+            if key not in images:
+                image = cv2.imread(str(root / kind / f"{key}.png"))
+                images[key] = Frame(image) if kind == "frames" and image is not None else image
+            return images[key]
+        
+        replayed_ms, recorded_ms, changed = [], [], []
+        skipped = 0
+        for index, event in enumerate(events):
+            screen, template = load("frames", event["frame"]), load("templates", event["template"])
+            if screen is None or template is None:
+                skipped += 1
+                continue
+            chain = [{**level, "path": str(root / "templates" / f"{level['crop']}.png")} for level in event["chain"]]
+            min_confidence = event.get("min_confidence", 0.5)
+            template_hash = event["template"]
+            
+            started = time.perf_counter()
+            match = None
+            if chain and engine in ("default", "hierarchical"):
+                match = locate_hierarchical(screen, template, chain, min_confidence)
+            if not match and engine in ("default", "cached"):
+                match, _ = find_template_cached(screen, template, template_hash, min_confidence,
+                                                roi=event["roi"], cache=cache)
+            elif not match:
+                match = match_template(screen, template, min_confidence)
+            replayed_ms.append((time.perf_counter() - started) * 1000)
+            if event["timing"].get("match_ms") is not None:
+                recorded_ms.append(event["timing"]["match_ms"])
+            
+            recorded = event["match"]
+            moved = (match is None) != (recorded is None) or (
+                match is not None and max(abs(match[0] - recorded[0]), abs(match[1] - recorded[1])) > REPLAY_TOLERANCE_PX)
+            if moved:
+                changed.append({
+                    "event": index,
+                    "name": event["name"],
+                    "tool": event["tool"],
+                    "recorded": recorded,
+                    "replayed": [int(match[0]), int(match[1]), round(float(match[2]), 4)] if match else None,
+                })
+        shared = [image for image in images.values() if isinstance(image, Frame)]
+        frame_stats = {"count": len(shared),
+                       **{key: sum(frame.stats()[key] for frame in shared) for key in ("computed", "reused", "evicted")}}
+    
+    return {
+        "success": True,
+        "action": "replay",
+        "archive": str(archive),
+        "session": session["name"],
+        "engine": engine,
+        "events": len(events),
+        "skipped": skipped,
+        "latency_ms": latency_summary(replayed_ms),
+        "recorded_latency_ms": latency_summary(recorded_ms),
+        "cache": {"hits": cache.hits, "misses": cache.misses},
+        "frames": frame_stats,
+        "unchanged": len(events) - skipped - len(changed),
+        "changed": changed,
+    }
+
+def record_start(name: Optional[str] = None) -> dict:
+    """Open a recording; template lookups are stored until --record-stop."""
+    session = start_recording(name)
+    return {"success": True, "action": "record_start", "name": session["name"],
+            "message": "Recording template lookups. Stop with: zoomclick --record-stop"}
+
+def record_stop() -> dict:
+    """Close the open recording into a session archive."""
+    return {"success": True, "action": "record_stop", **stop_recording()}
+
+def click_center(no_click: bool = False, verify: Optional[dict] = None) -> dict:
+    """
+    Click the center of current viewport without saving.
+    
+    verify: optional {"timeout_ms": int, "retry": bool}. Replaces the full
+    after-click screenshot with a bounded check that the UI reacted.
+    """
     state = ViewportState.load()
     if not state:
         return {"success": False, "error": "No active session. Run: zoomclick --start"}
@@ -523,63 +1878,604 @@ def click_center(no_click: bool = False) -> dict:
     screen_x = viewport_x + state.window_offset_x
     screen_y = viewport_y + state.window_offset_y
     
-    if not no_click:
-        pyautogui.moveTo(screen_x, screen_y, duration=0.25)
-        pyautogui.click(screen_x, screen_y)
+    result = {
+        "success": True,
+        "action": "click" if not no_click else "locate",
+        "viewport_coords": {"x": viewport_x, "y": viewport_y},
+        "screen_coords": {"x": screen_x, "y": screen_y},
+        "viewport": state.to_dict()
+    }
+    
+    if not no_click and verify:
+        with stage("verify"):
+            result["verify"] = click_and_verify(screen_x, screen_y, **verify)
+    else:
+        if not no_click:
+            with stage("input"):
+                result["input"] = click_input(screen_x, screen_y)
+        
+        # Screenshot of the viewport (and a little context) after the click
+        with stage("capture"):
+            screenshot_path, result["timing"] = capture_region(state, viewport_rect(state, VIEWPORT_MARGIN),
+                                                               "after_click")
+        result["screenshot"] = str(screenshot_path)
+    
+    if state.window_id:
+        result["window_id"] = state.window_id
+    
+    return result
+
+def show_marks() -> dict:
+    """Detect and number likely interactive elements in the current viewport."""
+    try:
+        import cv2
+    except ImportError:
+        return {"success": False, "error": "OpenCV is required for --marks (pip install opencv-python)"}
+    
+    state = ViewportState.load()
+    capture = None
+    with stage("capture"):
+        if state:
+            # Only the current viewport is marked: capture just that
+            screenshot_path, capture = capture_region(state, viewport_rect(state), "marks_viewport")
+        else:
+            # No session: mark the whole screen
+            screen_w, screen_h = get_screen_size()
+            state = ViewportState(width=screen_w, height=screen_h, screen_width=screen_w, screen_height=screen_h)
+            screenshot_path = take_session_screenshot(state, "full")
+    
+    viewport = cv2.imread(str(screenshot_path))
+    if viewport is None:
+        return {"success": False, "error": f"Could not read screenshot: {screenshot_path}"}
+    
+    record = find_marks(viewport, state.x + state.window_offset_x, state.y + state.window_offset_y)
+    marks_path = WORK_DIR / f"marks_{int(time.time())}.png"
+    draw_marks(viewport, record["marks"], marks_path)
+    
+    result = {
+        "success": True,
+        "action": "marks",
+        "screenshot": str(marks_path),
+        "count": len(record["marks"]),
+        "cached": record["cached"],
+        "detect_ms": record["detect_ms"],
+        "marks": [
+            {"id": m["id"], "box": m["box"], "screen_coords": {"x": m["screen_x"], "y": m["screen_y"]}}
+            for m in record["marks"]
+        ],
+        "viewport": state.to_dict(),
+        "instructions": """
+Each likely interactive element has a red box with a number.
+Boxes are relative to the screenshot; screen_coords are screen-absolute.
+
+Click one directly:  zoomclick --click-mark 17
+Or zoom in instead:  zoomclick --zoom <dir>
+""".strip()
+    }
+    if capture:
+        result["timing"] = capture
     
-    # Take screenshot after click
     if state.window_id:
-        screenshot_path = take_screenshot_window(state.window_id, "after_click")
+        result["window_id"] = state.window_id
+    
+    return result
+
+def click_mark(mark_id: int, no_click: bool = False) -> dict:
+    """Click the center of a numbered mark from the last --marks run."""
+    record = load_marks()
+    if not record:
+        return {"success": False, "error": "No marks detected yet. Run: zoomclick --marks"}
+    
+    mark = next((m for m in record["marks"] if m["id"] == mark_id), None)
+    if not mark:
+        return {"success": False, "error": f"Mark {mark_id} not found. Valid: 1-{len(record['marks'])}"}
+    
+    x, y = mark["screen_x"], mark["screen_y"]
+    result = {
+        "success": True,
+        "action": "click" if not no_click else "locate",
+        "mark": mark_id,
+        "x": x,
+        "y": y,
+        "box": mark["box"],
+        "marks_age_s": round(time.time() - record["created"], 1)
+    }
+    if not no_click:
+        with stage("input"):
+            result["input"] = click_input(x, y)
+    return result
+
+def click_text(text: str, window_id: int = None, no_click: bool = False) -> dict:
+    """
+    Find text on screen with local OCR and click its center.
+    
+    Scope: the given window, else the active session's viewport, else the full screen.
+    """
+    try:
+        import cv2
+    except ImportError:
+        return {"success": False, "error": "OpenCV is required for --click-text (pip install opencv-python)"}
+    
+    if window_id:
+        geo = get_window_geometry(window_id)
+        state = ViewportState(
+            width=geo.get("WIDTH", 0), height=geo.get("HEIGHT", 0),
+            window_id=window_id,
+            window_offset_x=geo.get("X", 0), window_offset_y=geo.get("Y", 0)
+        )
+        session = False
     else:
-        screenshot_path = take_screenshot("after_click")
+        state = ViewportState.load()
+        session = state is not None
+        if not state:
+            screen_w, screen_h = get_screen_size()
+            state = ViewportState(width=screen_w, height=screen_h, screen_width=screen_w, screen_height=screen_h)
+    
+    with stage("capture"):
+        if session:
+            screenshot_path, _ = capture_region(state, viewport_rect(state), "text")  # Just the viewport
+        else:
+            screenshot_path = take_session_screenshot(state, "text")
+    
+    frame = cv2.imread(str(screenshot_path))
+    if frame is None:
+        return {"success": False, "error": f"Could not read screenshot: {screenshot_path}"}
+    if not state.width or not state.height:
+        state.height, state.width = frame.shape[:2]
+    viewport = frame if session else frame[state.y:state.y + state.height, state.x:state.x + state.width]
+    
+    with stage("ocr"):
+        words, stats = ocr_words(viewport, state.x + state.window_offset_x, state.y + state.window_offset_y)
+    matches = find_text(words, text)
+    
+    if not matches:
+        return {
+            "success": False,
+            "error": f"Text not found on screen: {text}",
+            "words_seen": [w["text"] for w in words][:50],
+            "ocr": stats,
+            "screenshot": str(screenshot_path)
+        }
+    
+    best = matches[0]
+    x, y = best["screen_x"], best["screen_y"]
+    input_metrics = None
+    if not no_click:
+        with stage("input"):
+            input_metrics = click_input(x, y)
     
     result = {
         "success": True,
         "action": "click" if not no_click else "locate",
-        "viewport_coords": {"x": viewport_x, "y": viewport_y},
-        "screen_coords": {"x": screen_x, "y": screen_y},
-        "viewport": state.to_dict(),
+        "text": best["text"],
+        "x": x,
+        "y": y,
+        "box": best["box"],
+        "ocr_confidence": best["conf"],
+        "method": "ocr",
+        "other_matches": [
+            {"text": m["text"], "screen_coords": {"x": m["screen_x"], "y": m["screen_y"]}}
+            for m in matches[1:]
+        ],
+        "ocr": stats,
         "screenshot": str(screenshot_path)
     }
-    
     if state.window_id:
         result["window_id"] = state.window_id
+    if input_metrics:
+        result["input"] = input_metrics
+    return result
+
+def scan_templates(window_id: int = None) -> dict:
+    """
+    Report which saved templates are visible right now, and where.
+    
+    Uses the prefilter index (scanindex.py) so only plausible templates get an
+    exact match. Coordinates are screen-absolute click points (anchor offsets
+    applied), strongest match first.
+    """
+    import cv2
+    
+    started = time.perf_counter()
+    with stage("capture"):
+        if window_id:
+            geo = get_window_geometry(window_id)
+            if not geo:
+                return {"success": False, "error": f"Window not found: {window_id}"}
+            screenshot_path = take_screenshot_window(window_id, "scan")
+            offset_x, offset_y = geo.get("X", 0), geo.get("Y", 0)
+        else:
+            screenshot_path = take_screenshot("scan")
+            offset_x = offset_y = 0
+    frame = cv2.imread(str(screenshot_path))
+    if frame is None:
+        return {"success": False, "error": "Could not read screenshot", "screenshot": str(screenshot_path)}
+    capture_ms = round((time.perf_counter() - started) * 1000, 1)
+    
+    templates = load_templates()
+    saved_centers = {}
+    for entry in templates:
+        meta = entry["meta"]
+        if meta.get("center_x") is None or meta.get("center_y") is None:
+            continue
+        anchor_rect = meta.get("anchor") or {}
+        saved_centers[entry["name"]] = (
+            meta["center_x"] - anchor_rect.get("offset_x", 0) - offset_x,
+            meta["center_y"] - anchor_rect.get("offset_y", 0) - offset_y,
+        )
+    
+    with stage("match"):
+        visible, stats = scan_frame(frame, templates, saved_centers)
+    metas = {entry["name"]: entry["meta"] for entry in templates}
+    for hit in visible:
+        anchor_rect = metas[hit["name"]].get("anchor") or {}
+        hit["x"] += offset_x + anchor_rect.get("offset_x", 0)
+        hit["y"] += offset_y + anchor_rect.get("offset_y", 0)
+        hit["base_name"] = metas[hit["name"]].get("base_name", hit["name"])
+    stats["capture_ms"] = capture_ms
     
+    result = {
+        "success": True,
+        "action": "scan",
+        "visible": visible,
+        "count": len(visible),
+        "screenshot": str(screenshot_path),
+        "timing": stats
+    }
+    if window_id:
+        result["window_id"] = window_id
     return result
 
-def list_templates() -> dict:
-    """List all saved templates."""
-    templates = []
+def wait_for_idle(timing: dict) -> Optional[bool]:
+    """
+    Wait until the display's input queue is idle. Returns False if it was idle
+    right away, True if it had to wait, None if it stayed busy past
+    REVALIDATE_MAX_WAIT_S.
+    """
+    started = time.monotonic()
+    waited = False
+    while not display_idle(REVALIDATE_IDLE_MS):
+        if time.monotonic() - started > REVALIDATE_MAX_WAIT_S:
+            return None
+        waited = True
+        time.sleep(0.1)
+    if waited:
+        timing["idle_wait_ms"] += round((time.monotonic() - started) * 1000, 1)
+    return waited
+
+def revalidate_templates() -> dict:
+    """
+    Check every saved template against current frames, as background work.
+    
+    Runs niced with one OpenCV thread and only while the display's input
+    queue is idle (nothing held or queued, last job REVALIDATE_IDLE_MS ago),
+    so it never competes with foreground clicks. After each capture or match
+    it sleeps long enough to keep its share of wall time at REVALIDATE_DUTY.
+    Templates are grouped by where --click would search them (saved window,
+    DevTools page, full screen); each source is captured once, and again
+    only after waiting for the display. Results go into each template's
+    health metadata (templatehealth.py); stale templates are reported.
+    """
+    import cv2
     
-    for png in sorted(TEMPLATES_DIR.glob("*.png"), key=lambda p: p.stat().st_mtime, reverse=True):
-        name = png.stem
-        meta_path = TEMPLATES_DIR / f"{name}.json"
+    try:
+        os.nice(REVALIDATE_NICE)
+    except OSError:
+        pass
+    cv2.setNumThreads(1)
+    
+    timing = {"idle_wait_ms": 0.0, "capture_ms": 0.0, "match_ms": 0.0, "throttle_ms": 0.0}
+    
+    def throttle(started: float):
+        work = time.perf_counter() - started
+        pause = work * (1 - REVALIDATE_DUTY) / REVALIDATE_DUTY
+        time.sleep(pause)
+        timing["throttle_ms"] += round(pause * 1000, 1)
+    
+    frames = {}
+    
+    def capture(meta: dict):
+        """(frame, relative) from the source --click would use for this template."""
+        window_id = meta.get("window_id") or 0
+        cdp_port = meta.get("cdp_port") or 0
+        key = (cdp_port, window_id)
+        if key not in frames:
+            started = time.perf_counter()
+            with stage("capture"):
+                path = None
+                if cdp_port:
+                    try:
+                        path = take_screenshot_page(cdp_port, "revalidate")[0]
+                    except StageTimeout:
+                        raise
+                    except (RuntimeError, OSError):
+                        path = None
+                if path is None and window_id and get_window_geometry(window_id):
+                    path = take_screenshot_window(window_id, "revalidate")
+                relative = path is not None
+                if path is None:
+                    path = take_screenshot("revalidate")
+                frames[key] = (cv2.imread(str(path)), relative)
+            timing["capture_ms"] += round((time.perf_counter() - started) * 1000, 1)
+            throttle(started)
+        return frames[key]
+    
+    entries = sorted(load_templates(), key=lambda e: (e["meta"].get("cdp_port") or 0, e["meta"].get("window_id") or 0))
+    results = []
+    deferred = []
+    for i, entry in enumerate(entries):
+        waited = wait_for_idle(timing)
+        if waited is None:
+            deferred = [e["name"] for e in entries[i:]]
+            break
+        if waited:
+            frames.clear()  # Foreground input ran meanwhile; the screen may have changed
         
-        meta = {}
-        if meta_path.exists():
-            with open(meta_path) as f:
-                meta = json.load(f)
+        meta = entry["meta"]
+        frame, relative = capture(meta)
+        template = cv2.imread(str(entry["path"]))
+        score = loc = None
+        started = time.perf_counter()
+        with stage("match"):
+            if frame is not None and template is not None and \
+                    frame.shape[0] >= template.shape[0] and frame.shape[1] >= template.shape[1]:
+                _, score, _, loc = cv2.minMaxLoc(cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED))
+        timing["match_ms"] += round((time.perf_counter() - started) * 1000, 1)
+        throttle(started)
         
+        learned = learned_thresholds(meta)
+        seen = score is not None and score >= (learned["accept"] if learned else confidence_floor(0.5))
+        moved = None
+        if seen:
+            anchor_rect = meta.get("anchor") or {}
+            h, w = template.shape[:2]
+            moved = drift(meta, loc[0] + w // 2 + anchor_rect.get("offset_x", 0),
+                          loc[1] + h // 2 + anchor_rect.get("offset_y", 0), relative)
+        health = update_health(meta, score, seen, moved)
+        write_meta(entry["meta_path"], meta)
+        results.append({
+            "name": entry["name"],
+            "seen": seen,
+            "score": health.get("last_score"),
+            "drift_px": round(moved, 1) if moved is not None else None,
+            "misses": health["misses"],
+            "stale": health["stale"]
+        })
+    
+    return {
+        "success": True,
+        "action": "revalidate",
+        "checked": len(results),
+        "seen": sum(r["seen"] for r in results),
+        "templates": results,
+        "stale": [e["name"] for e in entries if is_stale(e["meta"])],
+        "deferred": deferred,
+        "timing": {key: round(value, 1) for key, value in timing.items()}
+    }
+
+def list_templates() -> dict:
+    """List all saved templates, with health from --revalidate/--click and the stale ones."""
+    templates = []
+    stale = []
+    
+    for entry in load_templates():
+        meta = entry["meta"]
         templates.append({
-            "name": name,
-            "base_name": meta.get("base_name", name),
-            "path": str(png),
+            "name": entry["name"],
+            "base_name": meta.get("base_name", entry["name"]),
+            "path": str(entry["path"]),
             "click_coords": {"x": meta.get("center_x"), "y": meta.get("center_y")},
-            "created": meta.get("created")
+            "created": meta.get("created"),
+            "health": meta.get("health"),
+            "thresholds": learned_thresholds(meta),
+            "stale": is_stale(meta)
         })
+        if templates[-1]["stale"]:
+            stale.append(entry["name"])
     
     return {
         "success": True,
         "action": "list",
         "templates": templates,
         "count": len(templates),
+        "stale": stale,
+        "templates_dir": str(TEMPLATES_DIR)
+    }
+
+def compact_templates(keep: Optional[int] = None) -> dict:
+    """
+    Collapse the saved versions of each base_name to the newest distinct ones.
+    
+    A version is dropped when its pixels match a newer version exactly or its
+    perceptual hash is within NEAR_DUPLICATE_DISTANCE bits of one. With keep,
+    at most that many distinct versions survive per base_name.
+    """
+    if keep is not None and keep < 1:
+        # keep=0 would delete every version of every template
+        return {"success": False, "error": f"--keep must be at least 1 (got {keep})"}
+    groups = {}
+    for entry in load_templates():
+        meta = entry["meta"]
+        if not meta.get("content_hash"):
+            # Templates saved before deduplication existed
+            meta.update(image_hashes(entry["path"]))
+            if entry["meta_path"].exists():
+                with open(entry["meta_path"], 'w') as f:
+                    json.dump(meta, f, indent=2)
+        base_name = meta.get("base_name", entry["name"])
+        groups.setdefault(base_name, []).append(entry)
+    
+    removed = []
+    bytes_reclaimed = 0
+    summary = {}
+    for base_name, entries in groups.items():
+        entries.sort(key=lambda e: e["meta"].get("created") or 0, reverse=True)
+        kept = []
+        for entry in entries:
+            meta = entry["meta"]
+            duplicate = any(
+                k["meta"].get("content_hash") == meta.get("content_hash")
+                or phash_distance(k["meta"].get("phash"), meta.get("phash")) <= NEAR_DUPLICATE_DISTANCE
+                for k in kept
+            )
+            if not duplicate and (keep is None or len(kept) < keep):
+                kept.append(entry)
+                continue
+            for path in template_files(entry["name"]):
+                if path.exists():
+                    bytes_reclaimed += path.stat().st_size
+                    path.unlink()
+            removed.append(entry["name"])
+        summary[base_name] = {"kept": [k["name"] for k in kept], "removed": len(entries) - len(kept)}
+    
+    return {
+        "success": True,
+        "action": "compact",
+        "entries_removed": len(removed),
+        "bytes_reclaimed": bytes_reclaimed,
+        "removed": removed,
+        "base_names": summary,
+        "templates_dir": str(TEMPLATES_DIR)
+    }
+
+def export_pack(path: str) -> dict:
+    """
+    Write all saved templates to one pack archive (a bare name goes to ~/.zoomclick/packs/).
+    
+    Besides image and metadata, each template carries its debug crop, zoom
+    chain crops and prefilter index entry (descriptors and thumbnail), so
+    importing hosts neither re-capture nor re-index. Host-specific metadata
+    (window id, health) is left out.
+    """
+    templates = load_templates()
+    index, _ = update_index(templates)  # Also sets entry["content_hash"]
+    objects = {}
+    
+    def add(file_path) -> Optional[str]:
+        file_path = Path(file_path)
+        if not file_path.exists():
+            return None
+        key = object_key(file_path.read_bytes())
+        objects[key] = file_path
+        return key
+    
+    items = []
+    for entry in templates:
+        meta = {key: value for key, value in entry["meta"].items() if key not in HOST_FIELDS}
+        meta["content_hash"] = entry["content_hash"]
+        chain = []
+        for level in meta.get("chain") or []:
+            crop = add(level["path"])
+            if crop is None:
+                chain = []  # Incomplete chain: the importing host falls back to a full search
+                break
+            chain.append({**{k: v for k, v in level.items() if k != "path"}, "crop": crop})
+        meta["chain"] = chain
+        item = {
+            "name": entry["name"],
+            "content_hash": entry["content_hash"],
+            "image": add(entry["path"]),
+            "crop": add(CROPS_DIR / f"{entry['name']}.png"),
+            "meta": meta,
+        }
+        indexed = index.get(entry["content_hash"])
+        thumb = add(indexed["thumb"]) if indexed else None
+        if thumb:
+            item["index"] = {**indexed, "thumb": thumb}
+        items.append(item)
+    
+    written = write_pack(path, {"templates": items}, objects)
+    return {"success": True, "action": "export_pack", "templates": len(items), **written}
+
+def import_pack(path: str) -> dict:
+    """
+    Add the templates of a pack that are not saved here yet.
+    
+    A template whose content hash is already saved (under any name) is
+    skipped; one whose name is taken by different content is reported as a
+    conflict and left alone. Zoom chain crops and prefilter index entries
+    come from the pack, so the first --click/--scan does no extra work.
+    """
+    templates = load_templates()
+    index, _ = update_index(templates)
+    present = {entry["content_hash"] for entry in templates}
+    names = {entry["name"] for entry in templates}
+    imported, skipped, conflicts = [], [], []
+    
+    with open_pack(path) as pack:
+        for item in pack.manifest.get("templates", []):
+            name = item["name"]
+            if item["content_hash"] in present:
+                skipped.append(name)
+                continue
+            if name in names:
+                conflicts.append(name)
+                continue
+            
+            meta = dict(item["meta"])
+            chain = []
+            for level in meta.get("chain") or []:
+                chain_path = CHAIN_DIR / f"{name}_L{level['level']}.png"
+                pack.extract(level["crop"], chain_path)
+                chain.append({**{k: v for k, v in level.items() if k != "crop"}, "path": str(chain_path)})
+            meta["chain"] = chain
+            meta["imported"] = {"pack": str(path), "at": int(time.time())}
+            if item.get("crop"):
+                pack.extract(item["crop"], CROPS_DIR / f"{name}.png")
+            if item.get("index") and item["content_hash"] not in index:
+                thumb_path = INDEX_DIR / f"{item['content_hash'][:32]}.png"
+                pack.extract(item["index"]["thumb"], thumb_path)
+                index[item["content_hash"]] = {**item["index"], "thumb": str(thumb_path)}
+            
+            # Metadata before the image: a template is only listed once its .png exists
+            write_meta(TEMPLATES_DIR / f"{name}.json", meta)
+            pack.extract(item["image"], TEMPLATES_DIR / f"{name}.png")
+            present.add(item["content_hash"])
+            names.add(name)
+            imported.append(name)
+    
+    if imported:
+        save_index(index)
+    return {
+        "success": True,
+        "action": "import_pack",
+        "imported": imported,
+        "skipped": skipped,
+        "conflicts": conflicts,
         "templates_dir": str(TEMPLATES_DIR)
     }
 
+def capture_service(rate: float = DEFAULT_RATE, idle_rate: float = DEFAULT_IDLE_RATE) -> dict:
+    """
+    Run the background capture service in the foreground until interrupted.
+    
+    While it runs, every zoomclick/vclick capture of the full screen reads its
+    shared-memory ring instead of spawning a screenshot process.
+    """
+    stats = run_service(rate, idle_rate)
+    return {"success": True, "action": "capture_service", "stopped": True, **stats}
+
+def capture_status() -> dict:
+    """Report the capture service's frame counters (dropped frames, current rate)."""
+    ring = attach()
+    if ring is None:
+        return {"success": True, "action": "capture_status", "running": False,
+                "hint": "Start with: zoomclick --capture-service &"}
+    stats = service_stats(ring)
+    ring.close()
+    return {"success": True, "action": "capture_status", "running": True, **stats}
+
+def show_input_status() -> dict:
+    """Report the display's input queue: waiting jobs, current holder, wait/exec times."""
+    return {"success": True, "action": "input_status", "display": os.environ.get("DISPLAY"), **input_status()}
+
 def reset_session() -> dict:
     """Reset zoom state."""
+    import shutil
+    
     if STATE_FILE.exists():
         STATE_FILE.unlink()
+    shutil.rmtree(HISTORY_DIR, ignore_errors=True)
     
     return {
         "success": True,
@@ -589,16 +2485,11 @@ def reset_session() -> dict:
 
 def delete_template(name: str) -> dict:
     """Delete a saved template."""
-    template_path = TEMPLATES_DIR / f"{name}.png"
-    meta_path = TEMPLATES_DIR / f"{name}.json"
-    
     deleted = []
-    if template_path.exists():
-        template_path.unlink()
-        deleted.append(str(template_path))
-    if meta_path.exists():
-        meta_path.unlink()
-        deleted.append(str(meta_path))
+    for path in template_files(name):
+        if path.exists():
+            path.unlink()
+            deleted.append(str(path))
     
     if deleted:
         return {"success": True, "action": "delete", "name": name, "deleted": deleted}
@@ -615,18 +2506,60 @@ def main():
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("--start", "-s", action="store_true", help="Start new session with full screenshot")
     group.add_argument("--zoom", "-z", metavar="QUADRANT", help="Zoom into quadrant (top-left, top-right, bottom-left, bottom-right, center)")
+    group.add_argument("--zoom-to", metavar="CELL", help="Zoom straight to a grid cell, e.g. B4 or B4.3.5 (needs --start --grid)")
+    group.add_argument("--back", action="store_true", help="Return to the previous zoom level (cached image if unchanged)")
+    group.add_argument("--forward", action="store_true", help="Redo a zoom undone with --back")
+    group.add_argument("--goto-level", type=int, metavar="N", help="Jump to zoom level N of this session (0 = start view)")
     group.add_argument("--save", metavar="NAME", help="Save current view as named template")
     group.add_argument("--click", "-c", metavar="NAME", help="Find and click saved template")
     group.add_argument("--click-center", action="store_true", help="Click center of current viewport")
+    group.add_argument("--marks", action="store_true", help="Detect and number interactive elements in the current viewport")
+    group.add_argument("--click-text", metavar="TEXT", help="Find text on screen with OCR (Tesseract) and click it")
+    group.add_argument("--click-mark", type=int, metavar="N", help="Click numbered element N from the last --marks")
     group.add_argument("--list", "-l", action="store_true", help="List saved templates")
+    group.add_argument("--scan", action="store_true", help="Report which saved templates are visible on screen")
+    group.add_argument("--revalidate", action="store_true", help="Check saved templates against the screen while it is idle (low priority)")
     group.add_argument("--reset", "-r", action="store_true", help="Reset zoom session")
     group.add_argument("--delete", "-d", metavar="NAME", help="Delete saved template")
     group.add_argument("--list-windows", action="store_true", help="List all visible windows")
+    group.add_argument("--export-pack", metavar="PACK", help="Write all templates with prebuilt artifacts to a pack (~/.zoomclick/packs/PACK.zip)")
+    group.add_argument("--import-pack", metavar="PACK", help="Add the templates of a pack that are not saved here yet")
+    group.add_argument("--compact", action="store_true", help="Remove duplicate template versions, keeping the newest distinct ones")
+    group.add_argument("--capture-service", action="store_true", help="Run the shared-memory capture service (foreground)")
+    group.add_argument("--capture-status", action="store_true", help="Report capture service counters")
+    group.add_argument("--input-status", action="store_true", help="Report the display's input queue and wait/exec times")
+    group.add_argument("--record-start", nargs="?", const="", metavar="NAME", help="Record frames, templates and matches of template lookups")
+    group.add_argument("--record-stop", action="store_true", help="Close the recording into ~/.zoomclick/recordings/NAME.zip")
+    group.add_argument("--replay", metavar="ARCHIVE", help="Re-run matching over a recorded session (no display needed)")
     
     parser.add_argument("--no-click", action="store_true", help="Don't click, just locate")
+    parser.add_argument("--all-windows", action="store_true", help="With --click, search every window matching --window/--window-class in parallel")
+    parser.add_argument("--all-screens", action="store_true", help="With --click, search every monitor in parallel")
+    parser.add_argument("--all-hits", action="store_true", help="With --all-windows/--all-screens, report every hit (the best is clicked)")
+    parser.add_argument("--scroll-search", action="store_true", help="With --click, scroll the target to find a template that is off-screen")
+    parser.add_argument("--max-scrolls", type=int, default=SCROLL_MAX_STEPS, metavar="N", help="With --scroll-search, most scroll steps (default 20)")
+    parser.add_argument("--anchor", action="store_true", help="With --save, store the smallest unique patch around the center")
+    parser.add_argument("--verify", action="store_true", help="With --click/--click-center, confirm the UI reacted to the click")
+    parser.add_argument("--verify-timeout", type=int, default=2000, metavar="MS", help="How long --verify waits for a reaction (default 2000)")
+    parser.add_argument("--retry", action="store_true", help="With --verify, click once more if nothing reacted")
     parser.add_argument("--display", default=":99", help="X display (default :99)")
-    
-    # Window/screen targeting options (used with --start)
+    parser.add_argument("--grid", metavar="COLSxROWS", help="With --start, draw a labeled addressing grid (e.g. 8x6)")
+    parser.add_argument("--max-edge", type=int, help="With --start, downscale output images to this long edge (px)")
+    parser.add_argument("--image-format", choices=["png", "jpeg", "webp"], help="With --start, output image format")
+    parser.add_argument("--quality", type=int, help="With --start, JPEG/WebP quality (1-100, default 85)")
+    parser.add_argument("--max-bytes", type=int, help="With --start, output image byte budget")
+    parser.add_argument("--since", metavar="ARTIFACT_ID", help="With --start, return only regions changed since that capture")
+    parser.add_argument("--cdp", type=int, nargs="?", const=DEFAULT_CDP_PORT, metavar="PORT",
+                        help="With --start, capture the Chrome page over DevTools (default port 9222)")
+    parser.add_argument("--priority", type=int, default=0, help="Input queue priority when agents share the display (higher goes first)")
+    parser.add_argument("--max-hold", type=int, metavar="MS", help="Stop an input job once it has held the display this long, checked between actions (default 10000)")
+    parser.add_argument("--deadline", type=int, metavar="MS", help="Total time budget for the command; stages and external calls share it")
+    parser.add_argument("--engine", choices=REPLAY_ENGINES, default="default", help="With --replay, matching engine to replay with")
+    parser.add_argument("--keep", type=int, help="With --compact, max distinct versions to keep per name (at least 1)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="With --capture-service, frames per second while the screen changes")
+    parser.add_argument("--idle-rate", type=float, default=DEFAULT_IDLE_RATE, help="With --capture-service, frames per second once the screen is idle")
+    
+    # Window/screen targeting options (used with --start, --click-text and --scan)
     parser.add_argument("--window", "-w", help="Capture window by title (substring match)")
     parser.add_argument("--window-class", help="Capture window by class name")
     parser.add_argument("--window-id", type=int, help="Capture specific window ID")
@@ -635,6 +2568,10 @@ def main():
     args = parser.parse_args()
     
     os.environ['DISPLAY'] = args.display
+    verify = {"timeout_ms": args.verify_timeout, "retry": args.retry} if args.verify else None
+    if args.deadline:
+        set_deadline(args.deadline)
+    set_input_policy(args.priority, args.max_hold)
     
     try:
         # Handle list-windows first (doesn't need session)
@@ -650,45 +2587,85 @@ def main():
             return 0
         
         if args.start:
-            # Resolve window targeting
-            window_id = None
-            if args.window_id:
-                window_id = args.window_id
-            elif args.window:
-                windows = find_window_by_name(args.window)
-                if not windows:
-                    print(json.dumps({"success": False, "error": f"No window found matching: {args.window}"}))
-                    return 1
-                window_id = windows[0]
-            elif args.window_class:
-                windows = find_window_by_class(args.window_class)
-                if not windows:
-                    print(json.dumps({"success": False, "error": f"No window found with class: {args.window_class}"}))
-                    return 1
-                window_id = windows[0]
-            
-            result = start_session(window_id=window_id, screen_num=args.screen)
+            window_id = resolve_window_id(args.window, args.window_class, args.window_id)
+            grid = parse_grid_spec(args.grid) if args.grid else None
+            image_policy = {
+                key: value for key, value in (
+                    ("max_edge", args.max_edge), ("image_format", args.image_format),
+                    ("image_quality", args.quality), ("max_bytes", args.max_bytes)
+                ) if value is not None
+            }
+            result = start_session(window_id=window_id, screen_num=args.screen, grid=grid,
+                                   image_policy=image_policy, since=args.since, cdp_port=args.cdp or 0)
         elif args.zoom:
             result = zoom_to_quadrant(args.zoom)
+        elif args.zoom_to:
+            result = zoom_to_cell(args.zoom_to)
+        elif args.back:
+            result = go_back()
+        elif args.forward:
+            result = go_forward()
+        elif args.goto_level is not None:
+            result = goto_level(args.goto_level)
         elif args.save:
-            result = save_template(args.save)
+            result = save_template(args.save, args.anchor)
+        elif args.click and (args.all_windows or args.all_screens):
+            result = click_template_across(args.click, args.window if args.all_windows else None,
+                                           args.window_class if args.all_windows else None,
+                                           args.all_screens, args.all_hits, args.no_click, verify)
         elif args.click:
-            result = click_template(args.click, args.no_click)
+            scroll = {"max_steps": args.max_scrolls} if args.scroll_search else None
+            result = click_template(args.click, args.no_click, verify, scroll)
         elif args.click_center:
-            result = click_center(args.no_click)
+            result = click_center(args.no_click, verify)
+        elif args.click_text:
+            window_id = resolve_window_id(args.window, args.window_class, args.window_id)
+            result = click_text(args.click_text, window_id, args.no_click)
+        elif args.marks:
+            result = show_marks()
+        elif args.click_mark is not None:
+            result = click_mark(args.click_mark, args.no_click)
+        elif args.scan:
+            window_id = resolve_window_id(args.window, args.window_class, args.window_id)
+            result = scan_templates(window_id)
+        elif args.revalidate:
+            result = revalidate_templates()
         elif args.list:
             result = list_templates()
         elif args.reset:
             result = reset_session()
         elif args.delete:
             result = delete_template(args.delete)
+        elif args.export_pack:
+            result = export_pack(args.export_pack)
+        elif args.import_pack:
+            result = import_pack(args.import_pack)
+        elif args.compact:
+            result = compact_templates(args.keep)
+        elif args.capture_service:
+            result = capture_service(args.rate, args.idle_rate)
+        elif args.capture_status:
+            result = capture_status()
+        elif args.input_status:
+            result = show_input_status()
+        elif args.record_start is not None:
+            result = record_start(args.record_start or None)
+        elif args.record_stop:
+            result = record_stop()
+        elif args.replay:
+            result = replay_session(args.replay, args.engine)
         else:
             parser.print_help()
             return 1
         
+        if DEADLINE["warnings"]:
+            result["deadline_warnings"] = DEADLINE["warnings"]  # Overruns after input was sent
         print(json.dumps(result, indent=2))
         return 0 if result.get("success", True) else 1
         
+    except StageTimeout as e:
+        print(json.dumps(e.to_dict()))
+        return 124
     except Exception as e:
         print(json.dumps({"success": False, "error": str(e)}))
         return 1